@@ -25,8 +25,8 @@ import holidays
 from discord.ext import commands, tasks
 from sentry_sdk import capture_exception
 
-from bot.core import evict_media, send_bird
-from bot.data import GenericError, database, logger
+from bot.core import evict_cold_media, evict_media, send_bird
+from bot.data import GenericError, async_database, logger
 from bot.data_functions import channel_setup, user_setup
 from bot.filters import Filter, MediaType
 from bot.functions import (
@@ -36,6 +36,9 @@ from bot.functions import (
     handle_error,
     prune_user_cache,
 )
+from bot.http_client import http_client
+from bot.prefetch import plan, prefetcher
+from bot.scanner import scanner
 
 # The channel id that the backups send to
 BACKUPS_CHANNEL = os.getenv("SCIOLY_ID_BOT_BACKUPS_CHANNEL", "")
@@ -62,6 +65,8 @@ class CustomBot(commands.Bot):
         self.on_message_handler.append(handler)
 
     async def setup_hook(self):
+        await http_client.start()
+
         # Here we load our extensions(cogs) that are located in the cogs directory, each cog is a collection of commands
         core_extensions = [
             "bot.cogs.get_birds",
@@ -95,6 +100,12 @@ class CustomBot(commands.Bot):
                     raise e
                 logger.error(f"Failed to load extension {extension}.", e)
 
+    async def close(self):
+        prefetcher.stop()
+        await http_client.close()
+        await async_database.close()
+        await super().close()
+
 
 if __name__ == "__main__":
     # Initialize bot
@@ -128,8 +139,11 @@ if __name__ == "__main__":
         # Change discord activity
         await bot.change_presence(activity=discord.Activity(type=3, name="birds"))
         refresh_cache.start()
+        scan_cache.start()
         refresh_user_cache.start()
         evict_user_cache.start()
+        prefetcher.start()
+        refresh_prefetch.start()
         if os.getenv("SCIOLY_ID_BOT_ENABLE_BACKUPS") != "false":
             refresh_backup.start()
 
@@ -151,20 +165,23 @@ if __name__ == "__main__":
         ).predicate(ctx)
 
         logger.info("global check: checking banned")
-        if database.zscore("ignore:global", str(ctx.channel.id)) is not None:
+        if (
+            await async_database.zscore("ignore:global", str(ctx.channel.id))
+            is not None
+        ):
             if ctx.interaction is not None:
                 await ctx.send(
                     "The owner of the server has disabled commands in this channel.",
                     ephemeral=True,
                 )
             raise GenericError(code=192)
-        if database.zscore("banned:global", str(ctx.author.id)) is not None:
+        if await async_database.zscore("banned:global", str(ctx.author.id)) is not None:
             if ctx.interaction is not None:
                 await ctx.send("You cannot use this command!", ephemeral=True)
             raise GenericError(code=842)
 
         logger.info("global check: logging command frequency")
-        database.zincrby("frequency.command:global", 1, str(ctx.command))
+        await async_database.zincrby("frequency.command:global", 1, str(ctx.command))
 
         logger.info("global check: database setup")
         await channel_setup(ctx)
@@ -181,7 +198,7 @@ if __name__ == "__main__":
         logger.info("global check: checking holiday")
         if ctx.command.name == "noholiday":
             return True
-        if database.sismember(
+        if await async_database.sismember(
             "noholiday:global",
             str(ctx.channel.id if ctx.guild is None else ctx.guild.id),
         ):
@@ -227,11 +244,32 @@ if __name__ == "__main__":
 
     @tasks.loop(minutes=10.0)
     async def refresh_cache():
-        """Task to delete a random selection of cached birds to ensure freshness."""
+        """Task to delete frequently used cached birds to ensure freshness,
+        and delete the coldest cached birds to limit disk usage."""
         logger.info("TASK: Refreshing some cache items")
         event_loop = asyncio.get_event_loop()
         with concurrent.futures.ThreadPoolExecutor(1) as executor:
             await event_loop.run_in_executor(executor, evict_media)
+            await event_loop.run_in_executor(executor, evict_cold_media)
+
+    @tasks.loop(minutes=15.0)
+    async def scan_cache():
+        """Task to check cached media for bad files and empty directories."""
+        logger.info("TASK: Scanning media cache")
+        event_loop = asyncio.get_event_loop()
+        with concurrent.futures.ThreadPoolExecutor(1) as executor:
+            await event_loop.run_in_executor(executor, scanner.run)
+
+    @tasks.loop(minutes=5.0)
+    async def refresh_prefetch():
+        """Task to queue media for likely-next birds to download in the background."""
+        logger.info("TASK: Planning media prefetch")
+        event_loop = asyncio.get_event_loop()
+        with concurrent.futures.ThreadPoolExecutor(1) as executor:
+            items = await event_loop.run_in_executor(executor, plan)
+        prefetcher.put(items)
+        prefetcher.refill()
+        logger.info(f"prefetch stats: {prefetcher.stats()}")
 
     @tasks.loop(hours=3.0)
     async def refresh_user_cache():
@@ -0,0 +1,168 @@
+# breaker.py | circuit breakers for upstream APIs
+# Copyright (C) 2019-2021  EraserBird, person_v1.32, hmmm
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import asyncio
+import collections
+import contextlib
+import enum
+import os
+import random
+import time
+
+import aiohttp
+
+from bot.data import GenericError, logger
+from bot.ratelimit import upstream_limiter
+
+# consecutive failures before a breaker opens
+BREAKER_FAILURES = int(os.getenv("SCIOLY_ID_BOT_BREAKER_FAILURES", "5"))
+# seconds a breaker stays open before trying again, doubles each failed trial
+BREAKER_RESET = float(os.getenv("SCIOLY_ID_BOT_BREAKER_RESET", "30"))
+BREAKER_MAX_RESET = 600.0
+
+BACKOFF_BASE = 1.5
+BACKOFF_MAX = 30.0
+
+
+class CircuitState(enum.Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+def backoff(retries: int) -> float:
+    """Returns seconds to sleep before a retry, with jitter so retries don't line up."""
+    delay = min(BACKOFF_MAX, BACKOFF_BASE**retries)
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+class CircuitBreaker:
+    """Stops requests to an upstream while it is failing.
+
+    The breaker opens after `failures` consecutive failed requests
+    (connection errors, timeouts, 429s, and 5xx responses), and requests
+    fail immediately with a `GenericError` (code 201) while open. After
+    `reset` seconds a single trial request is let through (half open).
+    If it succeeds the breaker closes, otherwise it opens again for twice
+    as long, up to `BREAKER_MAX_RESET`.
+    """
+
+    def __init__(
+        self, name: str, failures: int = BREAKER_FAILURES, reset: float = BREAKER_RESET
+    ):
+        self.name = name
+        self.failure_threshold = failures
+        self.base_reset = reset
+        self.reset = reset
+        self.state = CircuitState.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial = False
+        self.transitions = collections.Counter()
+        self.rejected = 0
+
+    def _transition(self, state: CircuitState):
+        logger.info(f"breaker {self.name}: {self.state.value} -> {state.value}")
+        self.transitions[f"{self.state.value}->{state.value}"] += 1
+        self.state = state
+
+    def retry_after(self) -> float:
+        """Returns seconds until the breaker lets a request through."""
+        if self.state is not CircuitState.OPEN:
+            return 0.0
+        return max(0.0, self.opened_at + self.reset - time.monotonic())
+
+    @property
+    def is_open(self) -> bool:
+        return self.state is CircuitState.OPEN and self.retry_after() > 0
+
+    def check(self):
+        """Raises a `GenericError` if requests to the upstream shouldn't be made."""
+        if self.state is CircuitState.OPEN and self.retry_after() == 0:
+            self._transition(CircuitState.HALF_OPEN)
+        if self.state is CircuitState.OPEN or (
+            self.state is CircuitState.HALF_OPEN and self._trial
+        ):
+            self.rejected += 1
+            raise GenericError(
+                f"{self.name} is unavailable, retrying in {self.retry_after():.0f}s",
+                code=201,
+            )
+        if self.state is CircuitState.HALF_OPEN:
+            self._trial = True
+
+    def record_success(self):
+        self.failures = 0
+        self._trial = False
+        if self.state is not CircuitState.CLOSED:
+            self.reset = self.base_reset
+            self._transition(CircuitState.CLOSED)
+
+    def record_failure(self):
+        self.failures += 1
+        trial = self._trial
+        self._trial = False
+        if self.state is CircuitState.HALF_OPEN and trial:
+            self.reset = min(self.reset * 2, BREAKER_MAX_RESET)
+            self.opened_at = time.monotonic()
+            self._transition(CircuitState.OPEN)
+        elif (
+            self.state is CircuitState.CLOSED
+            and self.failures >= self.failure_threshold
+        ):
+            self.opened_at = time.monotonic()
+            self._transition(CircuitState.OPEN)
+
+    def get(self, session: aiohttp.ClientSession, url: str, **kwargs):
+        """Makes a GET request through the breaker, like `session.get`."""
+        return self.request(session, "GET", url, **kwargs)
+
+    @contextlib.asynccontextmanager
+    async def request(
+        self, session: aiohttp.ClientSession, method: str, url: str, **kwargs
+    ):
+        """Makes a request through the breaker, like `session.request`.
+
+        Requests are rate limited with `upstream_limiter`.
+        """
+        self.check()
+        try:
+            await upstream_limiter.acquire(url)
+            async with session.request(method, url, **kwargs) as response:
+                if response.status == 429 or response.status >= 500:
+                    self.record_failure()
+                else:
+                    self.record_success()
+                yield response
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            self.record_failure()
+            raise
+        finally:
+            # let another trial through if this one was cancelled
+            self._trial = False
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state.value,
+            "failures": self.failures,
+            "retry_after": round(self.retry_after()),
+            "rejected": self.rejected,
+            "transitions": dict(self.transitions),
+        }
+
+
+macaulay = CircuitBreaker("Macaulay Library")
+ebird = CircuitBreaker("eBird")
@@ -26,8 +26,8 @@ import bot.voice as voice_functions
 from bot.core import better_spellcheck, get_sciname
 from bot.data import (
     alpha_codes,
+    async_database,
     birdListMaster,
-    database,
     format_wiki_url,
     logger,
     sci_screech_owls,
@@ -37,6 +37,8 @@ from bot.data import (
 from bot.data_functions import (
     bird_setup,
     incorrect_increment,
+    load_race_channels,
+    race_channels,
     score_increment,
     session_increment,
     streak_increment,
@@ -44,10 +46,51 @@ from bot.data_functions import (
 )
 from bot.filters import Filter
 from bot.functions import CustomCooldown
+from bot.spellcheck import bird_index
 
 # achievement values
 achievement = [1, 10, 25, 50, 100, 150, 200, 250, 400, 420, 500, 650, 666, 690, 1000]
 
+# for skipping chat messages in races that can't be guesses
+ALPHA_CODES = frozenset(alpha_codes.values())
+GUESS_CUTOFF = 0.6  # get_close_matches default, the most lenient check
+NAME_CHARS = frozenset("".join(bird_index.names) + "".join(bird_index.names).upper())
+MAX_GUESS_LENGTH = int(bird_index.lengths.max()) * 7 // 3
+
+
+def _close_to_bird(text: str) -> bool:
+    # matches can only be characters found in bird names, so with k of
+    # them the ratio is at most 2k / (len + k), which is 0.6 at 3/7 of len
+    known = sum(char in NAME_CHARS for char in text)
+    if known * 7 < len(text) * 3:
+        return False
+    return bool(bird_index.candidates(text.lower(), GUESS_CUTOFF))
+
+
+def might_be_guess(content: str, custom: bool = False) -> bool:
+    """Returns False if a chat message can't be a guess in `race_autocheck`.
+
+    These are upper bounds on the similarity ratios used when checking,
+    so guesses for birds in `birdListMaster` and `sciListMaster` are never
+    skipped. Names in custom lists aren't known here, so if `custom` is True
+    only messages without enough letters are skipped.
+    """
+    stripped = content.strip()
+    if not stripped:
+        return False
+    if len(stripped) == 4 and stripped.upper() in ALPHA_CODES:
+        return True
+    if custom:
+        known = sum(char in NAME_CHARS for char in stripped)
+        return known * 7 >= len(stripped) * 3
+    if len(stripped) > MAX_GUESS_LENGTH:
+        return False
+    # race_autocheck compares both the normalized and raw message
+    normalized = string.capwords(stripped.replace("-", " ")).lower()
+    return _close_to_bird(normalized) or (
+        normalized != content.lower() and _close_to_bird(content)
+    )
+
 
 class Check(commands.Cog):
     def __init__(self, bot: commands.Bot):
@@ -63,7 +106,9 @@ class Check(commands.Cog):
     async def check(self, ctx: commands.Context, *, arg: str):
         logger.info("command: check")
 
-        currentBird = database.hget(f"channel:{ctx.channel.id}", "bird").decode("utf-8")
+        currentBird = (
+            await async_database.hget(f"channel:{ctx.channel.id}", "bird")
+        ).decode("utf-8")
         if currentBird == "":  # no bird
             await ctx.send("You must ask for a bird first!")
             return
@@ -75,58 +120,62 @@ class Check(commands.Cog):
         logger.info("currentBird: " + currentBird)
         logger.info("arg: " + arg)
 
-        bird_setup(ctx, currentBird)
+        await bird_setup(ctx, currentBird)
 
         accepted_answers = [currentBird, sciBird]
         if currentBird == "screech owl":
             accepted_answers += screech_owls
             accepted_answers += sci_screech_owls
 
-        race_in_session = bool(database.exists(f"race.data:{ctx.channel.id}"))
+        race_in_session = bool(
+            await async_database.exists(f"race.data:{ctx.channel.id}")
+        )
         if race_in_session:
             logger.info("race in session")
-            if database.hget(f"race.data:{ctx.channel.id}", "strict"):
+            if await async_database.hget(f"race.data:{ctx.channel.id}", "strict"):
                 logger.info("strict spelling")
                 correct = arg in accepted_answers
             else:
                 logger.info("spelling leniency")
-                correct = better_spellcheck(
-                    arg, accepted_answers, birdListMaster + sciListMaster
-                )
+                correct = better_spellcheck(arg, accepted_answers)
 
-            if not correct and database.hget(f"race.data:{ctx.channel.id}", "alpha"):
+            if not correct and await async_database.hget(
+                f"race.data:{ctx.channel.id}", "alpha"
+            ):
                 logger.info("checking alpha codes")
                 correct = arg.upper() == alpha_code
         else:
             logger.info("no race")
-            if database.hget(f"session.data:{ctx.author.id}", "strict"):
+            if await async_database.hget(f"session.data:{ctx.author.id}", "strict"):
                 logger.info("strict spelling")
                 correct = arg in accepted_answers
             else:
                 logger.info("spelling leniency")
                 correct = (
-                    better_spellcheck(
-                        arg, accepted_answers, birdListMaster + sciListMaster
-                    )
+                    better_spellcheck(arg, accepted_answers)
                     or arg.upper() == alpha_code
                 )
 
         if correct:
             logger.info("correct")
 
-            database.hset(f"channel:{ctx.channel.id}", "bird", "")
-            database.hset(f"channel:{ctx.channel.id}", "answered", "1")
+            await async_database.hset(f"channel:{ctx.channel.id}", "bird", "")
+            await async_database.hset(f"channel:{ctx.channel.id}", "answered", "1")
 
-            session_increment(ctx, "correct", 1)
-            streak_increment(ctx, 1)
-            database.zincrby(
+            await session_increment(ctx, "correct", 1)
+            await streak_increment(ctx, 1)
+            await async_database.zincrby(
                 f"correct.user:{ctx.author.id}", 1, string.capwords(str(currentBird))
             )
 
             if (
                 race_in_session
                 and Filter.from_int(
-                    int(database.hget(f"race.data:{ctx.channel.id}", "filter"))
+                    int(
+                        await async_database.hget(
+                            f"race.data:{ctx.channel.id}", "filter"
+                        )
+                    )
                 ).vc
             ):
                 await voice_functions.stop(ctx, silent=True)
@@ -138,30 +187,39 @@ class Check(commands.Cog):
             )
             url = format_wiki_url(ctx, currentBird)
             await ctx.send(url)
-            score_increment(ctx, 1)
-            if int(database.zscore("users:global", str(ctx.author.id))) in achievement:
-                number = str(int(database.zscore("users:global", str(ctx.author.id))))
+            await score_increment(ctx, 1)
+            if (
+                int(await async_database.zscore("users:global", str(ctx.author.id)))
+                in achievement
+            ):
+                number = str(
+                    int(await async_database.zscore("users:global", str(ctx.author.id)))
+                )
                 await ctx.send(f"Wow! You have answered {number} birds correctly!")
                 filename = f"bot/media/achievements/{number}.PNG"
                 with open(filename, "rb") as img:
                     await ctx.send(file=discord.File(img, filename="award.png"))
 
             if race_in_session:
-                media = database.hget(f"race.data:{ctx.channel.id}", "media").decode(
-                    "utf-8"
-                )
+                media = (
+                    await async_database.hget(f"race.data:{ctx.channel.id}", "media")
+                ).decode("utf-8")
 
-                limit = int(database.hget(f"race.data:{ctx.channel.id}", "limit"))
-                first = database.zrevrange(f"race.scores:{ctx.channel.id}", 0, 0, True)[
-                    0
-                ]
+                limit = int(
+                    await async_database.hget(f"race.data:{ctx.channel.id}", "limit")
+                )
+                first = (
+                    await async_database.zrevrange(
+                        f"race.scores:{ctx.channel.id}", 0, 0, True
+                    )
+                )[0]
                 if int(first[1]) >= limit:
                     logger.info("race ending")
                     race = self.bot.get_cog("Race")
                     await race.stop_race_(ctx)
                 else:
                     logger.info(f"auto sending next bird {media}")
-                    filter_int, taxon, state = database.hmget(
+                    filter_int, taxon, state = await async_database.hmget(
                         f"race.data:{ctx.channel.id}", ["filter", "taxon", "state"]
                     )
                     birds = self.bot.get_cog("Birds")
@@ -176,32 +234,38 @@ class Check(commands.Cog):
         else:
             logger.info("incorrect")
 
-            streak_increment(ctx, None)  # reset streak
-            session_increment(ctx, "incorrect", 1)
-            incorrect_increment(ctx, str(currentBird), 1)
+            await streak_increment(ctx, None)  # reset streak
+            await session_increment(ctx, "incorrect", 1)
+            await incorrect_increment(ctx, str(currentBird), 1)
 
             if race_in_session:
                 await ctx.send("Sorry, that wasn't the right answer.")
             else:
-                database.hset(f"channel:{ctx.channel.id}", "bird", "")
-                database.hset(f"channel:{ctx.channel.id}", "answered", "1")
+                await async_database.hset(f"channel:{ctx.channel.id}", "bird", "")
+                await async_database.hset(f"channel:{ctx.channel.id}", "answered", "1")
                 await ctx.send("Sorry, the bird was actually **" + currentBird + "**.")
                 url = format_wiki_url(ctx, currentBird)
                 await ctx.send(url)
 
     async def race_autocheck(self, message: discord.Message):
-        if not database.exists(f"race.data:{message.channel.id}"):
+        custom = race_channels.get(message.channel.id)
+        if custom is None or not might_be_guess(message.content, custom):
+            return
+        if not await async_database.exists(f"race.data:{message.channel.id}"):
+            race_channels.pop(message.channel.id, None)
             return
 
-        currentBird = database.hget(f"channel:{message.channel.id}", "bird").decode(
-            "utf-8"
-        )
+        currentBird = (
+            await async_database.hget(f"channel:{message.channel.id}", "bird")
+        ).decode("utf-8")
         if currentBird == "":  # no bird
             return
 
         find_custom_role = {
             i if i.startswith("CUSTOM:") else ""
-            for i in database.hget(f"race.data:{message.channel.id}", "state")
+            for i in (
+                await async_database.hget(f"race.data:{message.channel.id}", "state")
+            )
             .decode("utf-8")
             .split(" ")
         }
@@ -212,19 +276,21 @@ class Check(commands.Cog):
         custom_list = []
         if (
             user_id
-            and database.exists(f"custom.list:{user_id}")
-            and not database.exists(f"custom.confirm:{user_id}")
+            and await async_database.exists(f"custom.list:{user_id}")
+            and not await async_database.exists(f"custom.confirm:{user_id}")
         ):
             custom_list = [
                 bird.decode("utf-8")
-                for bird in database.smembers(f"custom.list:{user_id}")
+                for bird in await async_database.smembers(f"custom.list:{user_id}")
             ]
 
         if (
             (
                 len(message.content.strip()) == 4
-                and message.content.strip().upper() in alpha_codes.values()
-                and database.hget(f"race.data:{message.channel.id}", "alpha")
+                and message.content.strip().upper() in ALPHA_CODES
+                and await async_database.hget(
+                    f"race.data:{message.channel.id}", "alpha"
+                )
             )
             or len(
                 get_close_matches(
@@ -236,7 +302,7 @@ class Check(commands.Cog):
             or better_spellcheck(
                 message.content,
                 [(await get_sciname(currentBird)).lower().replace("-", " ")],
-                birdListMaster + sciListMaster + custom_list,
+                custom_list,
             )
         ):
             logger.info("race autocheck found: checking")
@@ -251,6 +317,7 @@ class Check(commands.Cog):
 
 
 async def setup(bot):
+    await load_race_channels()
     cog = Check(bot)
     bot.add_message_handler(cog.race_autocheck)
     await bot.add_cog(cog)
@@ -23,10 +23,10 @@ from discord.ext import commands
 
 import bot.voice as voice_functions
 from bot.core import send_bird
-from bot.data import GenericError, database, goatsuckers, logger, states, taxons
+from bot.data import GenericError, async_database, goatsuckers, logger, states, taxons
 from bot.data_functions import bird_setup, session_increment
 from bot.filters import Filter, MediaType, arg_autocomplete
-from bot.functions import CustomCooldown, build_id_list, check_state_role
+from bot.functions import CustomCooldown, build_id_list_async, check_state_role
 
 BASE_MESSAGE = (
     "*Here you go!* \n**Use `b!{new_cmd}` again to get a new {media} of the same bird, "
@@ -58,18 +58,18 @@ class Birds(commands.Cog):
         self.bot = bot
 
     async def _send_next_race_media(self, ctx):
-        if database.exists(f"race.data:{ctx.channel.id}"):
+        if await async_database.exists(f"race.data:{ctx.channel.id}"):
             if Filter.from_int(
-                int(database.hget(f"race.data:{ctx.channel.id}", "filter"))
+                int(await async_database.hget(f"race.data:{ctx.channel.id}", "filter"))
             ).vc:
                 await voice_functions.stop(ctx, silent=True)
 
-            media = database.hget(f"race.data:{ctx.channel.id}", "media").decode(
-                "utf-8"
-            )
+            media = (
+                await async_database.hget(f"race.data:{ctx.channel.id}", "media")
+            ).decode("utf-8")
 
             logger.info(f"auto sending next bird {media}")
-            filter_int, taxon, state = database.hmget(
+            filter_int, taxon, state = await async_database.hmget(
                 f"race.data:{ctx.channel.id}", ["filter", "taxon", "state"]
             )
 
@@ -97,8 +97,8 @@ class Birds(commands.Cog):
             nonlocal retries
 
             # skip current bird
-            database.hset(f"channel:{ctx.channel.id}", "bird", "")
-            database.hset(f"channel:{ctx.channel.id}", "answered", "1")
+            await async_database.hset(f"channel:{ctx.channel.id}", "bird", "")
+            await async_database.hset(f"channel:{ctx.channel.id}", "answered", "1")
 
             if retries >= 2:  # only retry twice
                 await ctx.send("**Too many retries.**\n*Please try again.*")
@@ -123,16 +123,16 @@ class Birds(commands.Cog):
             # pylint: disable=unused-argument
 
             # skip current bird
-            database.hset(f"channel:{ctx.channel.id}", "bird", "")
-            database.hset(f"channel:{ctx.channel.id}", "answered", "1")
+            await async_database.hset(f"channel:{ctx.channel.id}", "bird", "")
+            await async_database.hset(f"channel:{ctx.channel.id}", "answered", "1")
             await ctx.send("*Please try again.*")
 
         return inner
 
     @staticmethod
-    def increment_bird_frequency(ctx, bird):
-        bird_setup(ctx, bird)
-        database.zincrby("frequency.bird:global", 1, string.capwords(bird))
+    async def increment_bird_frequency(ctx, bird):
+        await bird_setup(ctx, bird)
+        await async_database.zincrby("frequency.bird:global", 1, string.capwords(bird))
 
     async def send_bird_(
         self,
@@ -156,7 +156,7 @@ class Birds(commands.Cog):
             raise GenericError("Invalid media type", code=990)
 
         if media_type is MediaType.SONG and filters.vc:
-            current_voice = database.get(f"voice.server:{ctx.guild.id}")
+            current_voice = await async_database.get(f"voice.server:{ctx.guild.id}")
             if current_voice is not None and current_voice.decode("utf-8") != str(
                 ctx.channel.id
             ):
@@ -176,17 +176,23 @@ class Birds(commands.Cog):
 
         logger.info(
             "bird: "
-            + database.hget(f"channel:{ctx.channel.id}", "bird").decode("utf-8")
+            + (await async_database.hget(f"channel:{ctx.channel.id}", "bird")).decode(
+                "utf-8"
+            )
         )
 
-        currently_in_race = bool(database.exists(f"race.data:{ctx.channel.id}"))
-        new_user = database.zscore("users:global", str(ctx.author.id)) < 10
+        currently_in_race = bool(
+            await async_database.exists(f"race.data:{ctx.channel.id}")
+        )
+        new_user = await async_database.zscore("users:global", str(ctx.author.id)) < 10
 
-        answered = int(database.hget(f"channel:{ctx.channel.id}", "answered"))
+        answered = int(
+            await async_database.hget(f"channel:{ctx.channel.id}", "answered")
+        )
         logger.info(f"answered: {answered}")
         # check to see if previous bird was answered
         if answered:  # if yes, give a new bird
-            session_increment(ctx, "total", 1)
+            await session_increment(ctx, "total", 1)
 
             logger.info(f"filters: {filters}; taxon: {taxon}; roles: {roles}")
 
@@ -201,18 +207,18 @@ class Birds(commands.Cog):
             find_custom_role = {i if i.startswith("CUSTOM:") else "" for i in roles}
             find_custom_role.discard("")
             if (
-                database.exists(f"race.data:{ctx.channel.id}")
+                await async_database.exists(f"race.data:{ctx.channel.id}")
                 and len(find_custom_role) == 1
             ):
                 custom_role = find_custom_role.pop()
                 roles.remove(custom_role)
                 roles.append("CUSTOM")
                 user_id = custom_role.split(":")[1]
-                birds = build_id_list(
+                birds = await build_id_list_async(
                     user_id=user_id, taxon=taxon, state=roles, media_type=media_type
                 )
             else:
-                birds = build_id_list(
+                birds = await build_id_list_async(
                     user_id=ctx.author.id,
                     taxon=taxon,
                     state=roles,
@@ -235,15 +241,21 @@ class Birds(commands.Cog):
                 return
 
             currentBird = random.choice(birds)
-            self.increment_bird_frequency(ctx, currentBird)
+            await self.increment_bird_frequency(ctx, currentBird)
 
-            prevB = database.hget(f"channel:{ctx.channel.id}", "prevB").decode("utf-8")
+            prevB = (
+                await async_database.hget(f"channel:{ctx.channel.id}", "prevB")
+            ).decode("utf-8")
             while currentBird == prevB and len(birds) > 1:
                 currentBird = random.choice(birds)
-            database.hset(f"channel:{ctx.channel.id}", "prevB", str(currentBird))
-            database.hset(f"channel:{ctx.channel.id}", "bird", str(currentBird))
+            await async_database.hset(
+                f"channel:{ctx.channel.id}", "prevB", str(currentBird)
+            )
+            await async_database.hset(
+                f"channel:{ctx.channel.id}", "bird", str(currentBird)
+            )
             logger.info("currentBird: " + str(currentBird))
-            database.hset(f"channel:{ctx.channel.id}", "answered", "0")
+            await async_database.hset(f"channel:{ctx.channel.id}", "answered", "0")
             await send_bird(
                 ctx,
                 currentBird,
@@ -252,23 +264,29 @@ class Birds(commands.Cog):
                 on_error=self.error_handle(
                     ctx, media_type, filters, taxon_str, role_str, retries
                 ),
-                message=(SONG_MESSAGE if media_type is MediaType.SONG else BIRD_MESSAGE)
-                if not currently_in_race and new_user
-                else "*Here you go!*",
+                message=(
+                    (SONG_MESSAGE if media_type is MediaType.SONG else BIRD_MESSAGE)
+                    if not currently_in_race and new_user
+                    else "*Here you go!*"
+                ),
             )
         else:  # if no, give the same bird
             await ctx.send(f"**Active Filters**: `{'`, `'.join(filters.display())}`")
             await send_bird(
                 ctx,
-                database.hget(f"channel:{ctx.channel.id}", "bird").decode("utf-8"),
+                (await async_database.hget(f"channel:{ctx.channel.id}", "bird")).decode(
+                    "utf-8"
+                ),
                 media_type,
                 filters,
                 on_error=self.error_handle(
                     ctx, media_type, filters, taxon_str, role_str, retries
                 ),
-                message=(SONG_MESSAGE if media_type is MediaType.SONG else BIRD_MESSAGE)
-                if not currently_in_race and new_user
-                else "*Here you go!*",
+                message=(
+                    (SONG_MESSAGE if media_type is MediaType.SONG else BIRD_MESSAGE)
+                    if not currently_in_race and new_user
+                    else "*Here you go!*"
+                ),
             )
 
     @staticmethod
@@ -278,7 +296,7 @@ class Birds(commands.Cog):
         args = args_str.split(" ")
         logger.info(f"args: {args}")
 
-        if not database.exists(f"race.data:{ctx.channel.id}"):
+        if not await async_database.exists(f"race.data:{ctx.channel.id}"):
             roles = check_state_role(ctx)
 
             taxon_args = set(taxons.keys()).intersection({arg.lower() for arg in args})
@@ -293,12 +311,16 @@ class Birds(commands.Cog):
             else:
                 state = ""
 
-            if database.exists(f"session.data:{ctx.author.id}"):
+            if await async_database.exists(f"session.data:{ctx.author.id}"):
                 logger.info("session parameters")
 
                 if taxon_args:
                     current_taxons = set(
-                        database.hget(f"session.data:{ctx.author.id}", "taxon")
+                        (
+                            await async_database.hget(
+                                f"session.data:{ctx.author.id}", "taxon"
+                            )
+                        )
                         .decode("utf-8")
                         .split(" ")
                     )
@@ -309,12 +331,18 @@ class Birds(commands.Cog):
                     logger.info(f"new taxons: {taxon_args}")
                     taxon = " ".join(taxon_args).strip()
                 else:
-                    taxon = database.hget(
-                        f"session.data:{ctx.author.id}", "taxon"
+                    taxon = (
+                        await async_database.hget(
+                            f"session.data:{ctx.author.id}", "taxon"
+                        )
                     ).decode("utf-8")
 
                 roles = (
-                    database.hget(f"session.data:{ctx.author.id}", "state")
+                    (
+                        await async_database.hget(
+                            f"session.data:{ctx.author.id}", "state"
+                        )
+                    )
                     .decode("utf-8")
                     .split(" ")
                 )
@@ -325,7 +353,7 @@ class Birds(commands.Cog):
                     roles = check_state_role(ctx)
 
                 session_filter = int(
-                    database.hget(f"session.data:{ctx.author.id}", "filter")
+                    await async_database.hget(f"session.data:{ctx.author.id}", "filter")
                 )
                 filters = Filter.parse(args_str, defaults=False)
                 if filters.vc:
@@ -357,12 +385,12 @@ class Birds(commands.Cog):
                 state = " ".join(roles).strip()
 
             if "CUSTOM" in state.upper().split(" "):
-                if not database.exists(f"custom.list:{ctx.author.id}"):
+                if not await async_database.exists(f"custom.list:{ctx.author.id}"):
                     await ctx.send("**You don't have a custom list set!**")
                     state_list = state.split(" ")
                     state_list.remove("CUSTOM")
                     state = " ".join(state_list)
-                elif database.exists(f"custom.confirm:{ctx.author.id}"):
+                elif await async_database.exists(f"custom.confirm:{ctx.author.id}"):
                     await ctx.send(
                         "**Please verify or confirm your custom list before using!**"
                     )
@@ -373,7 +401,9 @@ class Birds(commands.Cog):
         else:
             logger.info("race parameters")
 
-            race_filter = int(database.hget(f"race.data:{ctx.channel.id}", "filter"))
+            race_filter = int(
+                await async_database.hget(f"race.data:{ctx.channel.id}", "filter")
+            )
             filters = Filter.parse(args_str, defaults=False)
             if filters.vc:
                 filters.vc = False
@@ -388,12 +418,12 @@ class Birds(commands.Cog):
                 filters ^= Filter()  # clear defaults
             filters ^= race_filter
 
-            taxon = database.hget(f"race.data:{ctx.channel.id}", "taxon").decode(
-                "utf-8"
-            )
-            state = database.hget(f"race.data:{ctx.channel.id}", "state").decode(
-                "utf-8"
-            )
+            taxon = (
+                await async_database.hget(f"race.data:{ctx.channel.id}", "taxon")
+            ).decode("utf-8")
+            state = (
+                await async_database.hget(f"race.data:{ctx.channel.id}", "state")
+            ).decode("utf-8")
 
         logger.info(f"args: filters: {filters}; taxon: {taxon}; state: {state}")
 
@@ -418,10 +448,10 @@ class Birds(commands.Cog):
 
         filters, taxon, state = await self.parse(ctx, args_str)
         media = "images"
-        if database.exists(f"race.data:{ctx.channel.id}"):
-            media = database.hget(f"race.data:{ctx.channel.id}", "media").decode(
-                "utf-8"
-            )
+        if await async_database.exists(f"race.data:{ctx.channel.id}"):
+            media = (
+                await async_database.hget(f"race.data:{ctx.channel.id}", "media")
+            ).decode("utf-8")
         await self.send_bird_(ctx, media, filters, taxon, state)
 
     # picks a random bird call to send
@@ -441,10 +471,10 @@ class Birds(commands.Cog):
 
         filters, taxon, state = await self.parse(ctx, args_str)
         media = "songs"
-        if database.exists(f"race.data:{ctx.channel.id}"):
-            media = database.hget(f"race.data:{ctx.channel.id}", "media").decode(
-                "utf-8"
-            )
+        if await async_database.exists(f"race.data:{ctx.channel.id}"):
+            media = (
+                await async_database.hget(f"race.data:{ctx.channel.id}", "media")
+            ).decode("utf-8")
         await self.send_bird_(ctx, media, filters, taxon, state)
 
     # goatsucker command - no args
@@ -454,20 +484,24 @@ class Birds(commands.Cog):
     async def goatsucker(self, ctx: commands.Context):
         logger.info("command: goatsucker")
 
-        if database.exists(f"race.data:{ctx.channel.id}"):
+        if await async_database.exists(f"race.data:{ctx.channel.id}"):
             await ctx.send("This command is disabled during races.")
             return
 
-        answered = int(database.hget(f"channel:{ctx.channel.id}", "answered"))
+        answered = int(
+            await async_database.hget(f"channel:{ctx.channel.id}", "answered")
+        )
         # check to see if previous bird was answered
         if answered:  # if yes, give a new bird
-            session_increment(ctx, "total", 1)
+            await session_increment(ctx, "total", 1)
 
-            database.hset(f"channel:{ctx.channel.id}", "answered", "0")
+            await async_database.hset(f"channel:{ctx.channel.id}", "answered", "0")
             currentBird = random.choice(goatsuckers)
-            self.increment_bird_frequency(ctx, currentBird)
+            await self.increment_bird_frequency(ctx, currentBird)
 
-            database.hset(f"channel:{ctx.channel.id}", "bird", str(currentBird))
+            await async_database.hset(
+                f"channel:{ctx.channel.id}", "bird", str(currentBird)
+            )
             logger.info("currentBird: " + str(currentBird))
             await send_bird(
                 ctx,
@@ -480,7 +514,9 @@ class Birds(commands.Cog):
         else:  # if no, give the same bird
             await send_bird(
                 ctx,
-                database.hget(f"channel:{ctx.channel.id}", "bird").decode("utf-8"),
+                (await async_database.hget(f"channel:{ctx.channel.id}", "bird")).decode(
+                    "utf-8"
+                ),
                 MediaType.IMAGE,
                 Filter(),
                 on_error=self.error_skip(ctx),
@@ -21,7 +21,7 @@ from discord import app_commands
 from discord.ext import commands
 from discord.utils import escape_markdown as esc
 
-from bot.data import database, logger
+from bot.data import async_database, logger
 from bot.functions import CustomCooldown, send_leaderboard
 
 
@@ -122,16 +122,21 @@ class Meta(commands.Cog):
         if channels is not None:
             logger.info(f"ignored channels: {[c.name for c in channels]}")
             for channel in channels:
-                if database.zscore("ignore:global", str(channel.id)) is None:
+                if (
+                    await async_database.zscore("ignore:global", str(channel.id))
+                    is None
+                ):
                     added.append(
                         f"`#{esc(channel.name)}` (`{esc(channel.category.name) if channel.category else 'No Category'}`)\n"
                     )
-                    database.zadd("ignore:global", {str(channel.id): ctx.guild.id})
+                    await async_database.zadd(
+                        "ignore:global", {str(channel.id): ctx.guild.id}
+                    )
                 else:
                     removed.append(
                         f"`#{esc(channel.name)}` (`{esc(channel.category.name) if channel.category else 'No Category'}`)\n"
                     )
-                    database.zrem("ignore:global", str(channel.id))
+                    await async_database.zrem("ignore:global", str(channel.id))
         else:
             await ctx.send("**No valid channels were passed.**")
 
@@ -140,7 +145,7 @@ class Meta(commands.Cog):
                 f"`#{esc(channel.name)}` (`{esc(channel.category.name) if channel.category else 'No Category'}`)\n"
                 for channel in map(
                     lambda c: ctx.guild.get_channel(int(c)),
-                    database.zrangebyscore(
+                    await async_database.zrangebyscore(
                         "ignore:global", ctx.guild.id - 0.1, ctx.guild.id + 0.1
                     ),
                 )
@@ -173,16 +178,18 @@ class Meta(commands.Cog):
 
         channel_or_guild = ctx.channel.id if ctx.guild is None else ctx.guild.id
 
-        if not database.sismember("noholiday:global", str(channel_or_guild)):
+        if not await async_database.sismember(
+            "noholiday:global", str(channel_or_guild)
+        ):
             await ctx.send(
                 f"**Holidays are now disabled in this {'DM' if ctx.guild is None else 'server'}.**"
             )
-            database.sadd("noholiday:global", str(channel_or_guild))
+            await async_database.sadd("noholiday:global", str(channel_or_guild))
         else:
             await ctx.send(
                 f"**Holidays are now enabled in this {'DM' if ctx.guild is None else 'server'}.**"
             )
-            database.srem("noholiday:global", str(channel_or_guild))
+            await async_database.srem("noholiday:global", str(channel_or_guild))
 
     # leave command - removes itself from guild
     @commands.hybrid_command(
@@ -199,21 +206,21 @@ class Meta(commands.Cog):
     ):
         logger.info("command: leave")
 
-        if database.exists(f"leave:{ctx.guild.id}"):
+        if await async_database.exists(f"leave:{ctx.guild.id}"):
             logger.info("confirming")
             if confirm:
                 logger.info(f"confirmed. Leaving {ctx.guild}")
-                database.delete(f"leave:{ctx.guild.id}")
+                await async_database.delete(f"leave:{ctx.guild.id}")
                 await ctx.send("**Ok, bye!**")
                 await ctx.guild.leave()
                 return
             logger.info("confirm failed. leave canceled")
-            database.delete(f"leave:{ctx.guild.id}")
+            await async_database.delete(f"leave:{ctx.guild.id}")
             await ctx.send("**Leave canceled.**")
             return
 
         logger.info("not confirmed")
-        database.set(f"leave:{ctx.guild.id}", 0, ex=60)
+        await async_database.set(f"leave:{ctx.guild.id}", 0, ex=60)
         await ctx.send(
             "**Are you sure you want to remove me from the guild?**\n"
             + "Use `b!leave yes` to confirm, `b!leave no` to cancel. "
@@ -235,7 +242,7 @@ class Meta(commands.Cog):
             await ctx.send("Invalid User!")
             return
         logger.info(f"user-id: {user.id}")
-        database.zadd("banned:global", {str(user.id): 0})
+        await async_database.zadd("banned:global", {str(user.id): 0})
         await ctx.send(f"Ok, {esc(user.name)} cannot use the bot anymore!")
 
     # unban command - prevents certain users from using the bot
@@ -253,7 +260,7 @@ class Meta(commands.Cog):
             await ctx.send("Invalid User!")
             return
         logger.info(f"user-id: {user.id}")
-        database.zrem("banned:global", str(user.id))
+        await async_database.zrem("banned:global", str(user.id))
         await ctx.send(f"Ok, {esc(user.name)} can use the bot!")
 
     # unban command - prevents certain users from using the bot
@@ -14,34 +14,44 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
-# import contextlib
-# import os
+import asyncio
+import concurrent.futures
 import random
 import string
 from difflib import get_close_matches
+from typing import Literal
 
-import aiohttp
 import discord
 import wikipedia
 from discord import app_commands
 from discord.ext import commands
 
-from bot.core import better_spellcheck, get_sciname, send_bird
+from bot.breaker import ebird, macaulay
+from bot.core import better_spellcheck, get_sciname, get_taxon, send_bird
 from bot.data import (
     alpha_codes,
     birdListMaster,
+    database,
     get_wiki_url,
     logger,
     memeList,
     sciListMaster,
     states,
     taxons,
+    upstream_url,
 )
 from bot.filters import Filter, MediaType, state_autocomplete, taxon_autocomplete
-from bot.functions import CustomCooldown, build_id_list, cache, decrypt_chacha
+from bot.functions import CustomCooldown, build_id_list_async, cache, decrypt_chacha
+from bot.hot_cache import hot_cache
+from bot.http_client import http_client
+from bot.manifest import migrate_cache_keys, rebuild_manifest, total_size
+from bot.prefetch import prefetcher
+from bot.ratelimit import upstream_limiter
+from bot.scanner import scanner
 
 # Discord max message length is 2000 characters, leave some room just in case
 MAX_MESSAGE = 1900
+ASSET_PAGE_URL = upstream_url("https://www.macaulaylibrary.org/asset/{}/embed")
 
 
 class Other(commands.Cog):
@@ -146,19 +156,19 @@ class Other(commands.Cog):
     @staticmethod
     @cache()
     async def bird_from_asset(asset_id: str):
-        url = f"https://www.macaulaylibrary.org/asset/{asset_id}/embed"
-
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url) as resp:
-                content = await resp.text()
-                currentBird = (
-                    content.split("<title>")[1]
-                    .split("</title>")[0]
-                    .split(" - ")[1]
-                    .lower()
-                    .replace("-", " ")
-                    .strip()
-                )
+        url = ASSET_PAGE_URL.format(asset_id)
+
+        session = await http_client.session()
+        async with macaulay.get(session, url) as resp:
+            content = await resp.text()
+            currentBird = (
+                content.split("<title>")[1]
+                .split("</title>")[0]
+                .split(" - ")[1]
+                .lower()
+                .replace("-", " ")
+                .strip()
+            )
         logger.info(f"asset found for {asset_id}: {currentBird}")
         return currentBird
 
@@ -194,9 +204,7 @@ class Other(commands.Cog):
         alpha_code = alpha_codes.get(string.capwords(currentBird), "")
         sciBird = (await get_sciname(currentBird)).lower().replace("-", " ")
         correct = (
-            better_spellcheck(
-                guess, [currentBird, sciBird], birdListMaster + sciListMaster
-            )
+            better_spellcheck(guess, [currentBird, sciBird])
             or guess.upper() == alpha_code
         )
         if correct or ((await self.bot.is_owner(ctx.author)) and guess == "please"):
@@ -260,12 +268,14 @@ class Other(commands.Cog):
             await ctx.typing()
 
         state_birdlist = sorted(
-            build_id_list(
+            await build_id_list_async(
                 user_id=ctx.author.id, state=state, media_type=MediaType.IMAGE
             )
         )
         state_songlist = sorted(
-            build_id_list(user_id=ctx.author.id, state=state, media_type=MediaType.SONG)
+            await build_id_list_async(
+                user_id=ctx.author.id, state=state, media_type=MediaType.SONG
+            )
         )
 
         birdLists = self.broken_join(state_birdlist)
@@ -330,7 +340,7 @@ class Other(commands.Cog):
             await ctx.typing()
 
         bird_list = sorted(
-            build_id_list(
+            await build_id_list_async(
                 user_id=ctx.author.id,
                 taxon=taxon,
                 state=state,
@@ -338,7 +348,7 @@ class Other(commands.Cog):
             )
         )
         song_bird_list = sorted(
-            build_id_list(
+            await build_id_list_async(
                 user_id=ctx.author.id,
                 taxon=taxon,
                 state=state,
@@ -419,22 +429,60 @@ class Other(commands.Cog):
         await channel.send(message)
         await ctx.send("Ok, sent!")
 
-    # # Test command - for testing purposes only
-    # @commands.command(help="- test command", hidden=True)
-    # @commands.is_owner()
-    # async def cache(self, ctx: commands.Context):
-    #     logger.info("command: cache stats")
-    #     items = []
-    #     with contextlib.suppress(FileNotFoundError):
-    #         items += os.listdir("bot_files/cache/images/")
-    #     with contextlib.suppress(FileNotFoundError):
-    #         items += os.listdir("bot_files/cache/songs/")
-    #     stats = {
-    #         "sciname_cache": get_sciname.cache_info(),
-    #         "taxon_cache": get_taxon.cache_info(),
-    #         "num_downloaded_birds": len(items),
-    #     }
-    #     await ctx.send(f"```python\n{stats}```")
+    # Cache command - for managing the media cache
+    @commands.command(help="- cache command", name="cache", hidden=True)
+    @commands.is_owner()
+    async def media_cache(
+        self,
+        ctx: commands.Context,
+        action: Literal["stats", "rebuild", "migrate"] = "stats",
+    ):
+        logger.info("command: cache")
+        logger.info(f"action: {action}")
+
+        if action == "rebuild":
+            await ctx.send("Rebuilding the media manifest from disk...")
+            event_loop = asyncio.get_running_loop()
+            with concurrent.futures.ThreadPoolExecutor(1) as executor:
+                items, entries = await event_loop.run_in_executor(
+                    executor, rebuild_manifest
+                )
+            await ctx.send(f"Ok, found {items} items with {entries} files.")
+            return
+
+        if action == "migrate":
+            await ctx.send("Migrating media cache keys...")
+            event_loop = asyncio.get_running_loop()
+            with concurrent.futures.ThreadPoolExecutor(1) as executor:
+                migrated = await event_loop.run_in_executor(
+                    executor, migrate_cache_keys
+                )
+            await ctx.send(f"Ok, migrated {migrated} items.")
+            return
+
+        def database_stats():
+            # these scan the keyspace, so they're run in an executor
+            return {
+                "sciname_cache": get_sciname.cache_info(),
+                "taxon_cache": get_taxon.cache_info(),
+                "num_downloaded_birds": sum(
+                    1 for _ in database.scan_iter(match="media.manifest:*", count=1000)
+                ),
+                "cache_bytes": total_size(),
+            }
+
+        event_loop = asyncio.get_running_loop()
+        stats = {
+            **await event_loop.run_in_executor(None, database_stats),
+            "prefetch": prefetcher.stats(),
+            "scanner": dict(scanner.stats),
+            "hot_cache": hot_cache.stats(),
+            "breakers": {
+                breaker.name: breaker.stats() for breaker in (macaulay, ebird)
+            },
+            "upstream_waits": upstream_limiter.stats(),
+        }
+        await ctx.send(f"```python\n{stats}```")
 
     # # Test command - for testing purposes only
     # @commands.command(help="- test command", hidden=True)
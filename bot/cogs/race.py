@@ -23,9 +23,11 @@ from discord.ext import commands
 from discord.utils import escape_markdown as esc
 
 import bot.voice as voice_functions
-from bot.data import database, logger, states, taxons
+from bot.data import async_database, logger, states, taxons
+from bot.data_functions import race_channels
 from bot.filters import Filter, arg_autocomplete
 from bot.functions import CustomCooldown, fetch_get_user
+from bot.prefetch import plan_race, prefetcher
 
 
 class Race(commands.Cog):
@@ -33,9 +35,11 @@ class Race(commands.Cog):
         self.bot = bot
 
     async def _get_options(self, ctx: commands.Context):
-        filter_int, state, media, limit, taxon, strict, alpha = database.hmget(
-            f"race.data:{ctx.channel.id}",
-            ["filter", "state", "media", "limit", "taxon", "strict", "alpha"],
+        filter_int, state, media, limit, taxon, strict, alpha = (
+            await async_database.hmget(
+                f"race.data:{ctx.channel.id}",
+                ["filter", "state", "media", "limit", "taxon", "strict", "alpha"],
+            )
         )
         filters = Filter.from_int(int(filter_int))
         options = (
@@ -52,15 +56,15 @@ class Race(commands.Cog):
     async def _send_stats(self, ctx: commands.Context, preamble):
         placings = 5
         database_key = f"race.scores:{ctx.channel.id}"
-        if database.zcard(database_key) == 0:
+        if await async_database.zcard(database_key) == 0:
             logger.info(f"no users in {database_key}")
             await ctx.send("There are no users in the database.")
             return
 
-        if placings > database.zcard(database_key):
-            placings = database.zcard(database_key)
+        if placings > await async_database.zcard(database_key):
+            placings = await async_database.zcard(database_key)
 
-        leaderboard_list = database.zrevrangebyscore(
+        leaderboard_list = await async_database.zrevrangebyscore(
             database_key, "+inf", "-inf", 0, placings, True
         )
         embed = discord.Embed(
@@ -88,7 +92,7 @@ class Race(commands.Cog):
 
             leaderboard.append(f"{i+1}. {user_info} - {int(stats[1])}\n")
 
-        start = int(database.hget(f"race.data:{ctx.channel.id}", "start"))
+        start = int(await async_database.hget(f"race.data:{ctx.channel.id}", "start"))
         elapsed = str(datetime.timedelta(seconds=round(time.time()) - start))
 
         embed.add_field(
@@ -100,8 +104,14 @@ class Race(commands.Cog):
         embed.add_field(name="Leaderboard", value="".join(leaderboard), inline=False)
 
         if ctx.author:
-            if database.zscore(database_key, str(ctx.author.id)) is not None:
-                placement = int(database.zrevrank(database_key, str(ctx.author.id))) + 1
+            if (
+                await async_database.zscore(database_key, str(ctx.author.id))
+                is not None
+            ):
+                placement = (
+                    int(await async_database.zrevrank(database_key, str(ctx.author.id)))
+                    + 1
+                )
                 embed.add_field(
                     name="You:", value=f"You are #{placement}.", inline=False
                 )
@@ -114,12 +124,14 @@ class Race(commands.Cog):
 
     async def stop_race_(self, ctx: commands.Context):
         if Filter.from_int(
-            int(database.hget(f"race.data:{ctx.channel.id}", "filter"))
+            int(await async_database.hget(f"race.data:{ctx.channel.id}", "filter"))
         ).vc:
             await voice_functions.disconnect(ctx, silent=True)
-            database.delete(f"voice.server:{ctx.guild.id}")
+            await async_database.delete(f"voice.server:{ctx.guild.id}")
 
-        first = database.zrevrange(f"race.scores:{ctx.channel.id}", 0, 0, True)[0]
+        first = (
+            await async_database.zrevrange(f"race.scores:{ctx.channel.id}", 0, 0, True)
+        )[0]
         if ctx.guild is not None:
             user = await fetch_get_user(int(first[0]), ctx=ctx, member=True)
         else:
@@ -140,15 +152,18 @@ class Race(commands.Cog):
             + "*Way to go!*"
         )
 
-        database.hset(f"race.data:{ctx.channel.id}", "stop", round(time.time()))
+        await async_database.hset(
+            f"race.data:{ctx.channel.id}", "stop", round(time.time())
+        )
 
         await self._send_stats(ctx, "**Race stopped.**")
-        database.delete(f"race.data:{ctx.channel.id}")
-        database.delete(f"race.scores:{ctx.channel.id}")
+        await async_database.delete(f"race.data:{ctx.channel.id}")
+        await async_database.delete(f"race.scores:{ctx.channel.id}")
+        race_channels.pop(ctx.channel.id, None)
 
         logger.info("race end: skipping last bird")
-        database.hset(f"channel:{ctx.channel.id}", "bird", "")
-        database.hset(f"channel:{ctx.channel.id}", "answered", "1")
+        await async_database.hset(f"channel:{ctx.channel.id}", "bird", "")
+        await async_database.hset(f"channel:{ctx.channel.id}", "answered", "1")
 
     @commands.hybrid_group(
         brief="- Base race command",
@@ -192,7 +207,7 @@ class Race(commands.Cog):
             )
             return
 
-        if database.exists(f"race.data:{ctx.channel.id}"):
+        if await async_database.exists(f"race.data:{ctx.channel.id}"):
             logger.info("already race")
             await ctx.send(
                 "**There is already a race in session.** *Change settings/view stats with `b!race view`*"
@@ -201,7 +216,7 @@ class Race(commands.Cog):
 
         filters = Filter.parse(args_str, use_numbers=False)
         if filters.vc:
-            if database.get(f"voice.server:{ctx.guild.id}") is not None:
+            if await async_database.get(f"voice.server:{ctx.guild.id}") is not None:
                 logger.info("already vc race")
                 await ctx.send(
                     "**There is already a VC race in session in this server!**"
@@ -210,7 +225,9 @@ class Race(commands.Cog):
             client = await voice_functions.get_voice_client(ctx, connect=True)
             if client is None:
                 return
-            database.set(f"voice.server:{ctx.guild.id}", str(ctx.channel.id))
+            await async_database.set(
+                f"voice.server:{ctx.guild.id}", str(ctx.channel.id)
+            )
 
         args = args_str.split(" ")
         logger.info(f"args: {args}")
@@ -234,9 +251,11 @@ class Race(commands.Cog):
         states_args = set(states.keys()).intersection({arg.upper() for arg in args})
         if states_args:
             if {"CUSTOM"}.issubset(states_args):
-                if database.exists(
+                if await async_database.exists(
                     f"custom.list:{ctx.author.id}"
-                ) and not database.exists(f"custom.confirm:{ctx.author.id}"):
+                ) and not await async_database.exists(
+                    f"custom.confirm:{ctx.author.id}"
+                ):
                     states_args.discard("CUSTOM")
                     states_args.add(f"CUSTOM:{ctx.author.id}")
                 else:
@@ -288,7 +307,7 @@ class Race(commands.Cog):
             f"adding filters: {filters}; state: {state}; media: {media}; limit: {limit}"
         )
 
-        database.hset(
+        await async_database.hset(
             f"race.data:{ctx.channel.id}",
             mapping={
                 "start": round(time.time()),
@@ -302,19 +321,25 @@ class Race(commands.Cog):
                 "alpha": alpha,
             },
         )
+        race_channels[ctx.channel.id] = "CUSTOM:" in state
 
-        database.zadd(f"race.scores:{ctx.channel.id}", {str(ctx.author.id): 0})
+        await async_database.zadd(
+            f"race.scores:{ctx.channel.id}", {str(ctx.author.id): 0}
+        )
+        prefetcher.put(plan_race(ctx.channel.id))
         await ctx.send(
             f"**Race started with options:**\n{await self._get_options(ctx)}"
         )
 
-        media = database.hget(f"race.data:{ctx.channel.id}", "media").decode("utf-8")
+        media = (
+            await async_database.hget(f"race.data:{ctx.channel.id}", "media")
+        ).decode("utf-8")
         logger.info("clearing previous bird")
-        database.hset(f"channel:{ctx.channel.id}", "bird", "")
-        database.hset(f"channel:{ctx.channel.id}", "answered", "1")
+        await async_database.hset(f"channel:{ctx.channel.id}", "bird", "")
+        await async_database.hset(f"channel:{ctx.channel.id}", "answered", "1")
 
         logger.info(f"auto sending next bird {media}")
-        filter_int, taxon, state = database.hmget(
+        filter_int, taxon, state = await async_database.hmget(
             f"race.data:{ctx.channel.id}", ["filter", "taxon", "state"]
         )
         birds = self.bot.get_cog("Birds")
@@ -334,7 +359,7 @@ class Race(commands.Cog):
     async def view(self, ctx: commands.Context):
         logger.info("command: view race")
 
-        if database.exists(f"race.data:{ctx.channel.id}"):
+        if await async_database.exists(f"race.data:{ctx.channel.id}"):
             await self._send_stats(ctx, "**Race In Progress**")
         else:
             await ctx.send(
@@ -346,7 +371,7 @@ class Race(commands.Cog):
     async def stop(self, ctx: commands.Context):
         logger.info("command: stop race")
 
-        if database.exists(f"race.data:{ctx.channel.id}"):
+        if await async_database.exists(f"race.data:{ctx.channel.id}"):
             await self.stop_race_(ctx)
         else:
             await ctx.send(
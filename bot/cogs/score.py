@@ -23,7 +23,7 @@ from discord import app_commands
 from discord.ext import commands
 from discord.utils import escape_markdown as esc
 
-from bot.data import GenericError, database, logger
+from bot.data import GenericError, async_database, database, logger
 from bot.functions import CustomCooldown, send_leaderboard, fetch_get_user
 
 
@@ -104,7 +104,7 @@ class Score(commands.Cog):
         page = max(1, page)
 
         user_amount = (
-            int(database.zcard(database_key))
+            int(await async_database.zcard(database_key))
             if database_key is not None
             else data.count()
         )
@@ -120,7 +120,7 @@ class Score(commands.Cog):
 
         users_per_page = 10
         leaderboard_list = (
-            database.zrevrangebyscore(
+            await async_database.zrevrangebyscore(
                 database_key, "+inf", "-inf", page, users_per_page, True
             )
             if database_key is not None
@@ -153,17 +153,22 @@ class Score(commands.Cog):
         embed.add_field(name=title, value="".join(leaderboard), inline=False)
 
         user_score = (
-            database.zscore(database_key, str(ctx.author.id))
+            await async_database.zscore(database_key, str(ctx.author.id))
             if database_key is not None
             else data.get(str(ctx.author.id))
         )
 
         if user_score is not None:
             if database_key is not None:
-                placement = int(database.zrevrank(database_key, str(ctx.author.id))) + 1
+                placement = (
+                    int(await async_database.zrevrank(database_key, str(ctx.author.id)))
+                    + 1
+                )
                 distance = int(
-                    database.zrevrange(
-                        database_key, placement - 2, placement - 2, True
+                    (
+                        await async_database.zrevrange(
+                            database_key, placement - 2, placement - 2, True
+                        )
                     )[0][1]
                 ) - int(user_score)
             else:
@@ -215,7 +220,9 @@ class Score(commands.Cog):
                 + "Good job everyone!"
             )
         else:
-            total_correct = int(database.zscore("score:global", str(ctx.channel.id)))
+            total_correct = int(
+                await async_database.zscore("score:global", str(ctx.channel.id))
+            )
             await ctx.send(
                 f"Wow, looks like a total of `{total_correct}` birds have been answered correctly in this **channel**!\n"
                 + "Good job everyone!"
@@ -244,7 +251,7 @@ class Score(commands.Cog):
                 return
             usera = user.id
             logger.info(usera)
-            score = database.zscore("users:global", str(usera))
+            score = await async_database.zscore("users:global", str(usera))
             if score is not None:
                 score = int(score)
                 user = f"<@{usera}>"
@@ -255,7 +262,7 @@ class Score(commands.Cog):
                 return
         else:
             user = f"<@{ctx.author.id}>"
-            score = int(database.zscore("users:global", str(ctx.author.id)))
+            score = int(await async_database.zscore("users:global", str(ctx.author.id)))
 
         embed = discord.Embed(type="rich", colour=discord.Color.blurple())
         embed.set_author(name="Bird ID - An Ornithology Bot")
@@ -288,8 +295,8 @@ class Score(commands.Cog):
                 return
             usera = user.id
             logger.info(usera)
-            streak = database.zscore("streak:global", str(usera))
-            max_streak = database.zscore("streak.max:global", str(usera))
+            streak = await async_database.zscore("streak:global", str(usera))
+            max_streak = await async_database.zscore("streak.max:global", str(usera))
             if streak is not None and max_streak is not None:
                 streak = int(streak)
                 max_streak = int(max_streak)
@@ -301,8 +308,12 @@ class Score(commands.Cog):
                 return
         else:
             user = f"<@{ctx.author.id}>"
-            streak = int(database.zscore("streak:global", str(ctx.author.id)))
-            max_streak = int(database.zscore("streak.max:global", str(ctx.author.id)))
+            streak = int(
+                await async_database.zscore("streak:global", str(ctx.author.id))
+            )
+            max_streak = int(
+                await async_database.zscore("streak.max:global", str(ctx.author.id))
+            )
 
         embed = discord.Embed(
             type="rich", colour=discord.Color.blurple(), title="**User Streaks**"
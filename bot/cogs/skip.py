@@ -17,7 +17,7 @@
 from discord.ext import commands
 
 import bot.voice as voice_functions
-from bot.data import database, format_wiki_url, logger
+from bot.data import async_database, format_wiki_url, logger
 from bot.data_functions import streak_increment
 from bot.filters import Filter
 from bot.functions import CustomCooldown
@@ -33,28 +33,34 @@ class Skip(commands.Cog):
     async def skip(self, ctx: commands.Context):
         logger.info("command: skip")
 
-        currentBird = database.hget(f"channel:{ctx.channel.id}", "bird").decode("utf-8")
-        database.hset(f"channel:{ctx.channel.id}", "bird", "")
-        database.hset(f"channel:{ctx.channel.id}", "answered", "1")
+        currentBird = (
+            await async_database.hget(f"channel:{ctx.channel.id}", "bird")
+        ).decode("utf-8")
+        await async_database.hset(f"channel:{ctx.channel.id}", "bird", "")
+        await async_database.hset(f"channel:{ctx.channel.id}", "answered", "1")
         if currentBird != "":  # check if there is bird
             url = format_wiki_url(ctx, currentBird)
             await ctx.send(f"Ok, skipping {currentBird.lower()}")
             await ctx.send(url)  # sends wiki page
 
-            streak_increment(ctx, None)  # reset streak
+            await streak_increment(ctx, None)  # reset streak
 
-            if database.exists(f"race.data:{ctx.channel.id}"):
+            if await async_database.exists(f"race.data:{ctx.channel.id}"):
                 if Filter.from_int(
-                    int(database.hget(f"race.data:{ctx.channel.id}", "filter"))
+                    int(
+                        await async_database.hget(
+                            f"race.data:{ctx.channel.id}", "filter"
+                        )
+                    )
                 ).vc:
                     await voice_functions.stop(ctx, silent=True)
 
-                media = database.hget(f"race.data:{ctx.channel.id}", "media").decode(
-                    "utf-8"
-                )
+                media = (
+                    await async_database.hget(f"race.data:{ctx.channel.id}", "media")
+                ).decode("utf-8")
 
                 logger.info(f"auto sending next bird {media}")
-                filter_int, taxon, state = database.hmget(
+                filter_int, taxon, state = await async_database.hmget(
                     f"race.data:{ctx.channel.id}", ["filter", "taxon", "state"]
                 )
                 birds = self.bot.get_cog("Birds")
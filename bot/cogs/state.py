@@ -15,21 +15,25 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 import asyncio
+import contextlib
 import re
 import string
 import time
 from typing import Literal, Optional
 
-import aiohttp
 import discord
 from discord import app_commands
 from discord.ext import commands
 from sentry_sdk import capture_message
 
-from bot.core import valid_bird, cookies
-from bot.data import database, logger, states
+from bot.core import valid_bird
+from bot.data import async_database, logger, states
 from bot.filters import state_autocomplete
 from bot.functions import CustomCooldown, auto_decode, handle_error
+from bot.http_client import http_client
+
+VALIDATION_CONCURRENCY = 5  # birds validated at once
+VALIDATION_PROGRESS_INTERVAL = 3  # seconds between progress updates
 
 
 class States(commands.Cog):
@@ -74,8 +78,8 @@ class States(commands.Cog):
         args = args.upper().split(" ")
 
         if "CUSTOM" in args and (
-            not database.exists(f"custom.list:{ctx.author.id}")
-            or database.exists(f"custom.confirm:{ctx.author.id}")
+            not await async_database.exists(f"custom.list:{ctx.author.id}")
+            or await async_database.exists(f"custom.confirm:{ctx.author.id}")
         ):
             await ctx.send(
                 "Sorry, you don't have a custom list! Use `b!custom` to set your custom list.",
@@ -174,7 +178,7 @@ class States(commands.Cog):
         if (
             "replace" not in command
             and attachment
-            and database.exists(f"custom.list:{ctx.author.id}")
+            and await async_database.exists(f"custom.list:{ctx.author.id}")
         ):
             await ctx.send(
                 "Woah there. You already have a custom list. "
@@ -183,19 +187,25 @@ class States(commands.Cog):
             )
             return
 
-        if "delete" in command and database.exists(f"custom.list:{ctx.author.id}"):
+        if "delete" in command and await async_database.exists(
+            f"custom.list:{ctx.author.id}"
+        ):
             if (
-                database.exists(f"custom.confirm:{ctx.author.id}")
-                and database.get(f"custom.confirm:{ctx.author.id}").decode("utf-8")
+                await async_database.exists(f"custom.confirm:{ctx.author.id}")
+                and (
+                    await async_database.get(f"custom.confirm:{ctx.author.id}")
+                ).decode("utf-8")
                 == "delete"
             ):
-                database.delete(
+                await async_database.delete(
                     f"custom.list:{ctx.author.id}", f"custom.confirm:{ctx.author.id}"
                 )
                 await ctx.send("Ok, your list was deleted.")
                 return
 
-            database.set(f"custom.confirm:{ctx.author.id}", "delete", ex=86400)
+            await async_database.set(
+                f"custom.confirm:{ctx.author.id}", "delete", ex=86400
+            )
             await ctx.send(
                 "Are you sure you want to permanently delete your list? "
                 + "Use `b!custom delete` again within 24 hours to clear your custom list."
@@ -204,15 +214,17 @@ class States(commands.Cog):
 
         if (
             "confirm" in command
-            and database.exists(f"custom.confirm:{ctx.author.id}")
-            and database.get(f"custom.confirm:{ctx.author.id}").decode("utf-8")
+            and await async_database.exists(f"custom.confirm:{ctx.author.id}")
+            and (await async_database.get(f"custom.confirm:{ctx.author.id}")).decode(
+                "utf-8"
+            )
             == "confirm"
         ):
             # list was validated by server and user, making permanent
             logger.info("user confirmed")
-            database.persist(f"custom.list:{ctx.author.id}")
-            database.delete(f"custom.confirm:{ctx.author.id}")
-            database.set(f"custom.cooldown:{ctx.author.id}", 0, ex=86400)
+            await async_database.persist(f"custom.list:{ctx.author.id}")
+            await async_database.delete(f"custom.confirm:{ctx.author.id}")
+            await async_database.set(f"custom.cooldown:{ctx.author.id}", 0, ex=86400)
             await ctx.send(
                 "Ok, your custom bird list is now available. Use `b!custom view` "
                 + "to view your list. You can change your list again in 24 hours."
@@ -221,20 +233,26 @@ class States(commands.Cog):
 
         if (
             "validate" in command
-            and database.exists(f"custom.confirm:{ctx.author.id}")
-            and database.get(f"custom.confirm:{ctx.author.id}").decode("utf-8")
+            and await async_database.exists(f"custom.confirm:{ctx.author.id}")
+            and (await async_database.get(f"custom.confirm:{ctx.author.id}")).decode(
+                "utf-8"
+            )
             == "valid"
         ):
             # list was validated, now for user confirm
             logger.info("valid list, user needs to confirm")
-            database.expire(f"custom.list:{ctx.author.id}", 86400)
-            database.set(f"custom.confirm:{ctx.author.id}", "confirm", ex=86400)
+            await async_database.expire(f"custom.list:{ctx.author.id}", 86400)
+            await async_database.set(
+                f"custom.confirm:{ctx.author.id}", "confirm", ex=86400
+            )
             birdlist = "\n".join(
                 bird.decode("utf-8")
-                for bird in database.smembers(f"custom.list:{ctx.author.id}")
+                for bird in await async_database.smembers(
+                    f"custom.list:{ctx.author.id}"
+                )
             )
             await ctx.send(
-                f"**Please confirm the following list.** ({int(database.scard(f'custom.list:{ctx.author.id}'))} items)"
+                f"**Please confirm the following list.** ({int(await async_database.scard(f'custom.list:{ctx.author.id}'))} items)"
             )
             await self.broken_send(ctx, birdlist, between="```\n")
             await ctx.send(
@@ -246,7 +264,7 @@ class States(commands.Cog):
             return
 
         if "view" in command:
-            if not database.exists(f"custom.list:{ctx.author.id}"):
+            if not await async_database.exists(f"custom.list:{ctx.author.id}"):
                 await ctx.send(
                     "You don't have a custom list. To add a custom list, "
                     + "upload a txt file with a bird's name on each line to this DM "
@@ -255,19 +273,24 @@ class States(commands.Cog):
                 return
             birdlist = "\n".join(
                 bird.decode("utf-8")
-                for bird in database.smembers(f"custom.list:{ctx.author.id}")
+                for bird in await async_database.smembers(
+                    f"custom.list:{ctx.author.id}"
+                )
             )
             birdlist = f"{birdlist}"
             await ctx.send(
-                f"**Your Custom Bird List** ({int(database.scard(f'custom.list:{ctx.author.id}'))} items)"
+                f"**Your Custom Bird List** ({int(await async_database.scard(f'custom.list:{ctx.author.id}'))} items)"
             )
             await self.broken_send(ctx, birdlist, between="```\n")
             return
 
-        if not database.exists(f"custom.list:{ctx.author.id}") or "replace" in command:
+        if (
+            not await async_database.exists(f"custom.list:{ctx.author.id}")
+            or "replace" in command
+        ):
             # user inputted bird list, now validating
             start = time.perf_counter()
-            if database.exists(f"custom.cooldown:{ctx.author.id}"):
+            if await async_database.exists(f"custom.cooldown:{ctx.author.id}"):
                 await ctx.send(
                     "Sorry, you'll have to wait 24 hours between changing lists."
                 )
@@ -314,7 +337,7 @@ class States(commands.Cog):
                         f"Error on line starting with `{item[:100]}`, position {search.span()[0]}"
                     )
                     return
-            database.delete(
+            await async_database.delete(
                 f"custom.list:{ctx.author.id}", f"custom.confirm:{ctx.author.id}"
             )
             await self.validate(ctx, parsed_birdlist)
@@ -327,8 +350,10 @@ class States(commands.Cog):
             )
             return
 
-        if database.exists(f"custom.confirm:{ctx.author.id}"):
-            next_step = database.get(f"custom.confirm:{ctx.author.id}").decode("utf-8")
+        if await async_database.exists(f"custom.confirm:{ctx.author.id}"):
+            next_step = (
+                await async_database.get(f"custom.confirm:{ctx.author.id}")
+            ).decode("utf-8")
             if next_step == "valid":
                 await ctx.send(
                     "You need to validate your list. Use `b!custom validate` to do so. "
@@ -360,34 +385,55 @@ class States(commands.Cog):
 
     async def validate(self, ctx, parsed_birdlist):
         validated_birdlist = []
-        async with aiohttp.ClientSession(cookie_jar=(await cookies())) as session:
-            logger.info("starting validation")
-            await ctx.send("**Validating bird list...**\n*This may take a while.*")
-            invalid_output = []
-            valid_output = []
-            validity = []
-            for x in range(0, len(parsed_birdlist), 10):
-                validity += await asyncio.gather(
-                    *(valid_bird(bird, session) for bird in parsed_birdlist[x : x + 10])
-                )
-                logger.info("sleeping during validation...")
-                await asyncio.sleep(5)
-            logger.info("checking validation")
-            for item in validity:
-                if item[1]:
-                    validated_birdlist.append(
-                        string.capwords(
-                            item[3].split(" - ")[0].strip().replace("-", " ")
-                        )
-                    )
-                    valid_output.append(
-                        f"Item `{item[0]}`: Detected as **{item[3]}**\n"
-                    )
-                else:
-                    invalid_output.append(
-                        f"Item `{item[0]}`: **{item[2]}** {f'(Detected as *{item[3]}*)' if item[3] else ''}\n"
+        session = await http_client.session()
+        logger.info("starting validation")
+        progress = await ctx.send(
+            f"**Validating bird list...** (0/{len(parsed_birdlist)})\n"
+            + "*This may take a while.*"
+        )
+        invalid_output = []
+        valid_output = []
+        semaphore = asyncio.Semaphore(VALIDATION_CONCURRENCY)
+        done = 0
+
+        async def _valid_bird(bird):
+            nonlocal done
+            async with semaphore:
+                result = await valid_bird(bird, session)
+            done += 1
+            return result
+
+        async def _report_progress():
+            while True:
+                await asyncio.sleep(VALIDATION_PROGRESS_INTERVAL)
+                with contextlib.suppress(discord.HTTPException):
+                    await progress.edit(
+                        content=f"**Validating bird list...** ({done}/{len(parsed_birdlist)})"
                     )
-            logger.info("done validating")
+
+        reporter = asyncio.create_task(_report_progress())
+        try:
+            validity = await asyncio.gather(
+                *(_valid_bird(bird) for bird in parsed_birdlist)
+            )
+        finally:
+            reporter.cancel()
+        with contextlib.suppress(discord.HTTPException):
+            await progress.edit(
+                content=f"**Validated bird list.** ({done}/{len(parsed_birdlist)})"
+            )
+        logger.info("checking validation")
+        for item in validity:
+            if item[1]:
+                validated_birdlist.append(
+                    string.capwords(item[3].split(" - ")[0].strip().replace("-", " "))
+                )
+                valid_output.append(f"Item `{item[0]}`: Detected as **{item[3]}**\n")
+            else:
+                invalid_output.append(
+                    f"Item `{item[0]}`: **{item[2]}** {f'(Detected as *{item[3]}*)' if item[3] else ''}\n"
+                )
+        logger.info("done validating")
 
         if valid_output:
             logger.info("sending validation success")
@@ -405,9 +451,9 @@ class States(commands.Cog):
             return False
 
         await ctx.send("**Saving bird list...**")
-        database.sadd(f"custom.list:{ctx.author.id}", *validated_birdlist)
-        database.expire(f"custom.list:{ctx.author.id}", 86400)
-        database.set(f"custom.confirm:{ctx.author.id}", "valid", ex=86400)
+        await async_database.sadd(f"custom.list:{ctx.author.id}", *validated_birdlist)
+        await async_database.expire(f"custom.list:{ctx.author.id}", 86400)
+        await async_database.set(f"custom.confirm:{ctx.author.id}", "valid", ex=86400)
         await ctx.send(
             "**Ok!** Your bird list has been temporarily saved. "
             + "Please use `b!custom validate` to view and confirm your bird list. "
@@ -24,7 +24,7 @@ import pandas as pd
 from discord import app_commands
 from discord.ext import commands
 
-from bot.data import database, logger
+from bot.data import async_database, database, logger
 from bot.functions import CustomCooldown, send_leaderboard, fetch_get_user
 
 
@@ -231,7 +231,7 @@ class Stats(commands.Cog):
             today = today.loc[today != 0]
 
             channels_see = len(list(self.bot.get_all_channels()))
-            channels_used = int(database.zcard("score:global"))
+            channels_used = int(await async_database.zcard("score:global"))
 
             embed.add_field(
                 name="Today (Since midnight UTC)",
@@ -17,7 +17,7 @@
 from discord.ext import commands, tasks
 
 import bot.voice as voice_functions
-from bot.data import logger, database
+from bot.data import async_database, logger
 from bot.functions import CustomCooldown
 
 
@@ -86,7 +86,7 @@ class Voice(commands.Cog):
     @commands.guild_only()
     async def disconnect(self, ctx: commands.Context):
         logger.info("command: disconnect")
-        current_voice = database.get(f"voice.server:{ctx.guild.id}")
+        current_voice = await async_database.get(f"voice.server:{ctx.guild.id}")
         if current_voice is not None:
             race = ctx.bot.get_cog("Race")
             await race.stop_race_(ctx)
@@ -24,66 +24,148 @@ import os
 import random
 import shutil
 import string
+import tempfile
+import time
 import urllib
 from io import BytesIO
-from typing import Iterable, Tuple
+from typing import Dict, Iterable, List, Optional, Tuple
 
 import aiohttp
 import discord
 import eyed3
+import orjson
+import redis
 from PIL import Image
 from sentry_sdk import capture_exception
 
 import bot.voice as voice_functions
-from bot.data import GenericError, birdListMaster, database, logger, screech_owls
+from bot.breaker import backoff, ebird, macaulay
+from bot.data import (
+    GenericError,
+    async_database,
+    birdListMaster,
+    database,
+    logger,
+    screech_owls,
+    taxonomy,
+    taxonomy_key,
+    upstream_url,
+)
 from bot.filters import Filter, MediaType
-from bot.functions import cache, encrypt_chacha
+from bot.functions import NEGATIVE_CACHE_TTL, cache, encrypt_chacha
+from bot.hot_cache import hot_cache
+from bot.http_client import http_client
+from bot.manifest import (
+    TEMP_SUFFIX,
+    ManifestEntry,
+    add_entries,
+    add_variant,
+    cache_directory,
+    cache_item,
+    delete_item,
+    get_entries_async,
+    get_variant,
+    item_from_path,
+    scan_directory,
+    total_size,
+    touch,
+    variant_path,
+    write_atomic,
+)
+from bot.ratelimit import Priority, TokenBucket, request_priority
+from bot.spellcheck import bird_index
 
 # Macaulay URL definitions
-SCINAME_URL = "https://api.ebird.org/v2/ref/taxonomy/ebird?fmt=json&species={}"
-TAXON_CODE_URL = (
+SCINAME_URL = upstream_url(
+    "https://api.ebird.org/v2/ref/taxonomy/ebird?fmt=json&species={}"
+)
+TAXON_CODE_URL = upstream_url(
     "https://taxonomy.api.macaulaylibrary.org/v1/taxonomy?q={}&key=PUB5447877383"
 )
-ASSET_URL = "https://cdn.download.ams.birds.cornell.edu/api/v1/asset/{id}/{size}"
+ASSET_URL = upstream_url(
+    "https://cdn.download.ams.birds.cornell.edu/api/v1/asset/{id}/{size}"
+)
 
 COUNT = 5  # fetch 5 media from macaulay at a time
 
+# assets per catalog query, which are stored in a pool and downloaded COUNT at a time
+CATALOG_PAGE_SIZE = int(os.getenv("SCIOLY_ID_BOT_CATALOG_PAGE_SIZE", "50"))
+CATALOG_REFILL_AT = 2 * COUNT  # fill the pool in the background below this
+CATALOG_EXPIRE = 60 * 60 * 24 * 7  # refresh pools weekly to pick up new assets
+CATALOG_FIELDS = ("assetId", "rating", "ratingCount")  # asset metadata to keep
+
 MAX_FILESIZE = 6000000  # limit media to 6mb
 
+# birds per second checked against Macaulay when validating custom lists
+VALIDATION_RATE = float(os.getenv("SCIOLY_ID_BOT_VALIDATION_RATE", "2"))
+validation_limiter = TokenBucket(VALIDATION_RATE, 10)
 
-class CookieManager:
-    def __init__(self):
-        self._cookies: aiohttp.CookieJar = None
+# re-encode downloaded images to smaller copies for sending
+OPTIMIZE_IMAGES = os.getenv("SCIOLY_ID_BOT_OPTIMIZE_IMAGES") == "true"
+OPTIMIZE_FORMAT = os.getenv("SCIOLY_ID_BOT_OPTIMIZE_FORMAT", "jpeg")  # jpeg or webp
+OPTIMIZE_MAX_DIMENSION = int(os.getenv("SCIOLY_ID_BOT_OPTIMIZE_MAX_DIMENSION", "640"))
+OPTIMIZE_QUALITY = int(os.getenv("SCIOLY_ID_BOT_OPTIMIZE_QUALITY", "80"))
+OPTIMIZED_EXTENSIONS = {"jpeg": "jpg", "webp": "webp"}
 
-    @staticmethod
-    async def _get_cookies():
-        async with aiohttp.ClientSession(
-            headers={
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/98.0.4758.82 Safari/537.36"
-            }
-        ) as session:
-            await session.head("https://search.macaulaylibrary.org/login?path=/catalog")
-            return session.cookie_jar
+# read size when streaming downloads to disk
+DOWNLOAD_BLOCK_SIZE = int(os.getenv("SCIOLY_ID_BOT_DOWNLOAD_BLOCK_SIZE", "65536"))
 
-    async def __call__(self):
-        if self._cookies is None or database.get("cookies.expired:global") is None:
-            database.set("cookies.expired:global", "false")
-            database.expire("cookies.expired:global", 60 * 60 * 24 * 5)  # 5 days
-            self._cookies = await self._get_cookies()
-        return self._cookies
+# limit the media cache to 10gb by default
+CACHE_MAX_BYTES = int(os.getenv("SCIOLY_ID_BOT_CACHE_MAX_BYTES", "10000000000"))
+# each doubling of an item's use counts as an hour more recent when evicting
+FREQUENCY_WEIGHT = 60 * 60
 
-    def clear(self):
-        self._cookies = None
+# share downloads across processes with a redis lock
+DOWNLOAD_LOCK = os.getenv("SCIOLY_ID_BOT_DOWNLOAD_LOCK") == "true"
+DOWNLOAD_LOCK_TIMEOUT = 120  # seconds
 
+# in-flight downloads, keyed by cache item
+_inflight_downloads: Dict[str, asyncio.Future] = {}
+# background catalog fills, keyed by cache item
+_catalog_fills: Dict[str, asyncio.Task] = {}
 
-cookies = CookieManager()
 
+class DownloadActivity:
+    """Tracks user-facing downloads in progress.
+
+    Background downloads (like prefetching) wait for
+    user-facing downloads to finish before starting.
+    """
+
+    def __init__(self):
+        self.active = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    @contextlib.contextmanager
+    def track(self):
+        self.active += 1
+        self._idle.clear()
+        try:
+            yield
+        finally:
+            self.active -= 1
+            if self.active == 0:
+                self._idle.set()
 
-@cache(pre=lambda x: string.capwords(x.strip().replace("-", " ")), local=False)
+    async def wait_idle(self):
+        await self._idle.wait()
+
+
+download_activity = DownloadActivity()
+
+
+@cache(
+    pre=lambda x: string.capwords(x.strip().replace("-", " ")),
+    local=False,
+    maxsize=1024,
+    ttl=3600,
+)
 async def get_sciname(bird: str, session=None, retries=0) -> str:
     """Returns the scientific name of a bird.
 
-    Scientific names are found using the eBird API from the Cornell Lab of Ornithology,
+    Scientific names are found in the bundled taxonomy snapshot (`bot.data.taxonomy`),
+    falling back to the eBird API from the Cornell Lab of Ornithology,
     using `SCINAME_URL` to fetch data.
     Raises a `GenericError` if a scientific name is not found or an HTTP error occurs.
 
@@ -91,52 +173,61 @@ async def get_sciname(bird: str, session=None, retries=0) -> str:
     `session` (optional) - an aiohttp client session
     """
     logger.info(f"getting sciname for {bird}")
-    async with contextlib.AsyncExitStack() as stack:
-        if session is None:
-            session = await stack.enter_async_context(
-                aiohttp.ClientSession(cookie_jar=(await cookies()))
+    entry = taxonomy.get(taxonomy_key(bird))
+    if entry is not None:
+        logger.info(f"sciname from taxonomy: {entry.scientific_name}")
+        return entry.scientific_name
+    if session is None:
+        session = await http_client.session()
+    try:
+        code = (await get_taxon(bird, session))[0]
+    except GenericError as e:
+        if e.code == 111:
+            code = bird
+        else:
+            raise
+
+    sciname_url = SCINAME_URL.format(urllib.parse.quote(code))
+    async with ebird.get(session, sciname_url) as sciname_response:
+        if sciname_response.status != 200:
+            if retries >= 3:
+                logger.info("Retried more than 3 times. Aborting...")
+                raise GenericError(
+                    f"An http error code of {sciname_response.status} occurred"
+                    + f" while fetching {sciname_url} for {bird}",
+                    code=201,
+                )
+            retries += 1
+            delay = backoff(retries)
+            logger.info(
+                f"An HTTP error occurred; Retries: {retries}; Sleeping: {delay:.1f}"
             )
+            await asyncio.sleep(delay)
+            sciname = await get_sciname(bird, session, retries)
+            return sciname
+
+        sciname_data = await sciname_response.json()
         try:
-            code = (await get_taxon(bird, session))[0]
-        except GenericError as e:
-            if e.code == 111:
-                code = bird
-            else:
-                raise
-
-        sciname_url = SCINAME_URL.format(urllib.parse.quote(code))
-        async with session.get(sciname_url) as sciname_response:
-            if sciname_response.status != 200:
-                if retries >= 3:
-                    logger.info("Retried more than 3 times. Aborting...")
-                    raise GenericError(
-                        f"An http error code of {sciname_response.status} occurred"
-                        + f" while fetching {sciname_url} for {bird}",
-                        code=201,
-                    )
-                retries += 1
-                logger.info(
-                    f"An HTTP error occurred; Retries: {retries}; Sleeping: {1.5**retries}"
-                )
-                await asyncio.sleep(1.5**retries)
-                sciname = await get_sciname(bird, session, retries)
-                return sciname
-
-            sciname_data = await sciname_response.json()
-            try:
-                sciname = sciname_data[0]["sciName"]
-            except IndexError as e:
-                raise GenericError(f"No sciname found for {code}", code=111) from e
+            sciname = sciname_data[0]["sciName"]
+        except IndexError as e:
+            raise GenericError(f"No sciname found for {code}", code=111) from e
     logger.info(f"sciname: {sciname}")
     return sciname
 
 
-@cache(pre=lambda x: string.capwords(x.strip().replace("-", " ")), local=False)
+@cache(
+    pre=lambda x: string.capwords(x.strip().replace("-", " ")),
+    local=False,
+    maxsize=1024,
+    ttl=3600,
+    negative=(111,),
+)
 async def get_taxon(bird: str, session=None, retries=0) -> Tuple[str, str]:
     """Returns the taxonomic code of a bird.
 
     Taxonomic codes are used by the Cornell Lab of Ornithology to identify species of birds.
-    This function uses the Macaulay Library's internal API to fetch the taxon code
+    Codes are found in the bundled taxonomy snapshot (`bot.data.taxonomy`), falling
+    back to the Macaulay Library's internal API to fetch the taxon code
     from the common or scientific name, using `TAXON_CODE_URL`.
     Raises a `GenericError` if a code is not found or if an HTTP error occurs.
 
@@ -144,56 +235,58 @@ async def get_taxon(bird: str, session=None, retries=0) -> Tuple[str, str]:
     `session` (optional) - an aiohttp client session
     """
     logger.info(f"getting taxon code for {bird}")
-    async with contextlib.AsyncExitStack() as stack:
-        if session is None:
-            session = await stack.enter_async_context(
-                aiohttp.ClientSession(cookie_jar=(await cookies()))
-            )
-        taxon_code_url = TAXON_CODE_URL.format(
-            urllib.parse.quote(bird.replace("-", " ").replace("'s", ""))
-        )
-        async with session.get(taxon_code_url) as taxon_code_response:
-            if taxon_code_response.status != 200:
-                if retries >= 3:
-                    logger.info("Retried more than 3 times. Aborting...")
-                    raise GenericError(
-                        f"An http error code of {taxon_code_response.status} occurred"
-                        + f" while fetching {taxon_code_url} for {bird}",
-                        code=201,
-                    )
-                retries += 1
-                logger.info(
-                    f"An HTTP error occurred; Retries: {retries}; Sleeping: {1.5**retries}"
+    entry = taxonomy.get(taxonomy_key(bird))
+    if entry is not None:
+        logger.info(f"taxon code from taxonomy: {entry.species_code}")
+        return (entry.species_code, f"{entry.common_name} - {entry.scientific_name}")
+    if session is None:
+        session = await http_client.session()
+    taxon_code_url = TAXON_CODE_URL.format(
+        urllib.parse.quote(bird.replace("-", " ").replace("'s", ""))
+    )
+    async with macaulay.get(session, taxon_code_url) as taxon_code_response:
+        if taxon_code_response.status != 200:
+            if retries >= 3:
+                logger.info("Retried more than 3 times. Aborting...")
+                raise GenericError(
+                    f"An http error code of {taxon_code_response.status} occurred"
+                    + f" while fetching {taxon_code_url} for {bird}",
+                    code=201,
                 )
-                await asyncio.sleep(1.5**retries)
-                return await get_taxon(bird, session, retries)
-
-            taxon_code_data = await taxon_code_response.json()
-            try:
-                logger.info(f"raw data: {taxon_code_data}")
-
-                first_item = taxon_code_data[0]
-                taxon_code = first_item["code"]
-                item_name = first_item["name"]
-                logger.info(f"first item: {first_item}")
-
-                if len(taxon_code_data) > 1:
-                    logger.info("entering check")
-                    for item in taxon_code_data:
-                        logger.info(f"checking: {item}")
-                        common, sci_name = item["name"].split(" - ")
-                        if (  # spellcheck
-                            spellcheck(common, bird, 4) or spellcheck(sci_name, bird, 4)
-                        ) and (  # ensure that it's a species by checking for binomial name
-                            " " in sci_name
-                        ):
-                            logger.info("ok")
-                            taxon_code = item["code"]
-                            item_name = item["name"]
-                            break
-                        logger.info("fail")
-            except IndexError as e:
-                raise GenericError(f"No taxon code found for {bird}", code=111) from e
+            retries += 1
+            delay = backoff(retries)
+            logger.info(
+                f"An HTTP error occurred; Retries: {retries}; Sleeping: {delay:.1f}"
+            )
+            await asyncio.sleep(delay)
+            return await get_taxon(bird, session, retries)
+
+        taxon_code_data = await taxon_code_response.json()
+        try:
+            logger.info(f"raw data: {taxon_code_data}")
+
+            first_item = taxon_code_data[0]
+            taxon_code = first_item["code"]
+            item_name = first_item["name"]
+            logger.info(f"first item: {first_item}")
+
+            if len(taxon_code_data) > 1:
+                logger.info("entering check")
+                for item in taxon_code_data:
+                    logger.info(f"checking: {item}")
+                    common, sci_name = item["name"].split(" - ")
+                    if (  # spellcheck
+                        spellcheck(common, bird, 4) or spellcheck(sci_name, bird, 4)
+                    ) and (  # ensure that it's a species by checking for binomial name
+                        " " in sci_name
+                    ):
+                        logger.info("ok")
+                        taxon_code = item["code"]
+                        item_name = item["name"]
+                        break
+                    logger.info("fail")
+        except IndexError as e:
+            raise GenericError(f"No taxon code found for {bird}", code=111) from e
     logger.info(f"taxon code: {taxon_code}")
     logger.info(f"name: {item_name}")
     return (taxon_code, item_name)
@@ -211,31 +304,45 @@ async def valid_bird(bird: str, session=None) -> ValidatedBird:
     then if the bird is already in one of our lists. If not, then it checks
     if Macaulay has valid images for the bird.
 
+    Results are cached across users, except for network errors.
+
     Returns a tuple: `(input bird, valid bool, reason, detected name (may be empty string))`.
     """
     bird_ = string.capwords(bird.strip().replace("-", " "))
     logger.info(f"checking if {bird} is valid")
-    async with contextlib.AsyncExitStack() as stack:
-        if session is None:
-            session = await stack.enter_async_context(
-                aiohttp.ClientSession(cookie_jar=(await cookies()))
-            )
+    try:
+        valid, reason, name = await _valid_bird(bird_, session)
+    except GenericError as e:
+        if e.code == 201:
+            return ValidatedBird(bird, False, "Network error, please try again", "")
+        raise e
+    return ValidatedBird(bird, valid, reason, name)
+
+
+@cache(
+    local=False,
+    maxsize=512,
+    ttl=3600,
+    redis_ttl=3600,
+    is_negative=lambda result: not result[0],
+)
+async def _valid_bird(bird: str, session=None) -> Tuple[bool, str, str]:
+    # only rate limit birds that aren't resolved locally
+    if not (bird in birdListMaster or taxonomy_key(bird) in taxonomy):
+        await validation_limiter.acquire()
+    if session is None:
+        session = await http_client.session()
+    with request_priority(Priority.VALIDATION):
         try:
-            name = (await get_taxon(bird_, session))[1]
+            name = (await get_taxon(bird, session))[1]
         except GenericError as e:
-            if e.code in (111, 201):
-                return ValidatedBird(bird, False, "No taxon code found", "")
+            if e.code == 111:
+                return (False, "No taxon code found", "")
             raise e
-        if bird_ not in birdListMaster:
-            try:
-                urls = await _get_urls(session, bird_, MediaType.IMAGE, Filter())
-            except GenericError as e:
-                if e.code in (100, 201):
-                    return ValidatedBird(bird, False, "One or less images found", name)
-                raise e
-            if len(urls) < 2:
-                return ValidatedBird(bird, False, "One or less images found", name)
-    return ValidatedBird(bird, True, "All checks passed", name)
+        if bird not in birdListMaster:
+            if await _catalog_size(session, bird, MediaType.IMAGE, Filter()) < 2:
+                return (False, "One or less images found", name)
+    return (True, "All checks passed", name)
 
 
 def _black_and_white(input_image_path) -> BytesIO:
@@ -254,6 +361,88 @@ def _black_and_white(input_image_path) -> BytesIO:
     return final_buffer
 
 
+def black_and_white_variant(entry: ManifestEntry) -> str:
+    """Returns the path to a black and white version of a cached image.
+
+    The image is converted on first use and stored in the media cache,
+    so this is blocking and should be run in an executor.
+    """
+    path = get_variant(entry, "bw")
+    if path is None:
+        path = variant_path(entry, "bw", "png")
+        write_atomic(path, _black_and_white(entry.path).getvalue())
+        add_variant(entry, "bw", path)
+    return path
+
+
+def sanitize_song(entry: ManifestEntry) -> ManifestEntry:
+    """Removes spoilers in the tag metadata of a cached song.
+
+    This rewrites the file, so it is blocking and should be run in an executor.
+    Returns the updated manifest entry.
+    """
+    audio_file = eyed3.load(entry.path)
+    if audio_file is not None and audio_file.tag is not None:
+        audio_file.tag.remove(entry.path)
+        hot_cache.invalidate(entry.path)
+    entry = entry._replace(size=os.stat(entry.path).st_size, sanitized=True)
+    add_entries(item_from_path(entry.path), [entry])
+    return entry
+
+
+def optimize_image(entry: ManifestEntry) -> ManifestEntry:
+    """Stores a smaller, re-encoded copy of a cached image as the "opt" variant.
+
+    Images are scaled down to `OPTIMIZE_MAX_DIMENSION` and saved as
+    progressive JPEG or WebP, depending on `OPTIMIZE_FORMAT`. The copy is
+    only kept if it is smaller than the original.
+
+    This is blocking, so run it in an executor.
+    Returns the updated manifest entry.
+    """
+    with Image.open(entry.path) as image:
+        image = image.convert("RGB")
+        image.thumbnail((OPTIMIZE_MAX_DIMENSION, OPTIMIZE_MAX_DIMENSION))
+        buffer = BytesIO()
+        if OPTIMIZE_FORMAT == "webp":
+            image.save(buffer, "webp", quality=OPTIMIZE_QUALITY)
+        else:
+            image.save(
+                buffer,
+                "jpeg",
+                quality=OPTIMIZE_QUALITY,
+                optimize=True,
+                progressive=True,
+            )
+    if buffer.tell() >= entry.size:
+        logger.info(f"optimized image not smaller, keeping original {entry.path}")
+        return entry
+    path = variant_path(entry, "opt", OPTIMIZED_EXTENSIONS[OPTIMIZE_FORMAT])
+    write_atomic(path, buffer.getvalue())
+    return add_variant(entry, "opt", path)
+
+
+def optimized_variant(
+    entry: ManifestEntry, filters: Filter, webp: bool = True
+) -> Optional[Tuple[str, str, str]]:
+    """Returns the optimized copy of an image to send instead of the original.
+
+    Returns a tuple of `(path, extension, content_type)`, or None if the original
+    should be sent, which is the case for large images.
+
+    `webp` (bool) - whether the client supports WebP images
+    """
+    if filters.large:
+        return None
+    path = get_variant(entry, "opt")
+    if path is None:
+        return None
+    extension = path.rsplit(".", 1)[1]
+    if extension == "webp" and not webp:
+        return None
+    return (path, extension, "image/webp" if extension == "webp" else "image/jpeg")
+
+
 async def send_bird(
     ctx, bird: str, media_type: MediaType, filters: Filter, on_error=None, message=None
 ):
@@ -288,8 +477,10 @@ async def send_bird(
         await ctx.typing()
 
     try:
-        filename, extension = await get_media(ctx, bird, media_type, filters)
-        macaulay_asset_id = filename.split("/")[-1].split(".")[0]
+        entry = await get_media(ctx, bird, media_type, filters)
+        filename = entry.path
+        extension = entry.extension
+        macaulay_asset_id = entry.asset_id
     except GenericError as e:
         if ctx.interaction is None:
             await delete.delete()
@@ -303,8 +494,6 @@ async def send_bird(
             await ctx.send(
                 "**A network error has occurred.**\n*Please try again later.*"
             )
-            database.incrby("cooldown:global", amount=1)
-            database.expire("cooldown:global", 300)
         else:
             capture_exception(e)
             logger.exception(e)
@@ -317,7 +506,7 @@ async def send_bird(
             await ctx.send("*Please try again.*")
         return
 
-    if os.stat(filename).st_size > MAX_FILESIZE:  # another filesize check (4mb)
+    if entry.size > MAX_FILESIZE:  # another filesize check (4mb)
         if ctx.interaction is None:
             await delete.delete()
         await ctx.send(
@@ -329,14 +518,18 @@ async def send_bird(
         if filters.bw:
             # prevent the black and white conversion from blocking
             loop = asyncio.get_running_loop()
-            fn = functools.partial(_black_and_white, filename)
+            fn = functools.partial(black_and_white_variant, entry)
             filename = await loop.run_in_executor(None, fn)
+            extension = "png"
+        else:
+            optimized = optimized_variant(entry, filters)
+            if optimized is not None:
+                filename, extension, _ = optimized
 
-    elif media_type is MediaType.SONG and not filters.vc:
-        # remove spoilers in tag metadata
-        audio_file = eyed3.load(filename)
-        if audio_file is not None and audio_file.tag is not None:
-            audio_file.tag.remove(filename)
+    elif media_type is MediaType.SONG and not entry.sanitized:
+        # songs are sanitized when downloaded, this is for older cached songs
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, sanitize_song, entry)
 
     output_message = ""
     if message is not None:
@@ -353,8 +546,12 @@ async def send_bird(
         await ctx.send(output_message)
         await voice_functions.play(ctx, filename)
     else:
+        data = hot_cache.get(filename)
+        if data is None:
+            loop = asyncio.get_running_loop()
+            data = await loop.run_in_executor(None, hot_cache.load, filename)
         # change filename to avoid spoilers
-        file_obj = discord.File(filename, filename=f"bird.{extension}")
+        file_obj = discord.File(BytesIO(data), filename=f"bird.{extension}")
         await ctx.send(output_message, file=file_obj)
 
     if ctx.interaction is None:
@@ -362,12 +559,12 @@ async def send_bird(
 
 
 async def get_media(ctx, bird: str, media_type: MediaType, filters: Filter):
-    """Chooses media from a list of filenames.
+    """Chooses media from a list of manifest entries.
 
     This function chooses a valid image to pass to send_bird().
     Valid images are based on file extension and size. (8mb discord limit)
 
-    Returns a list containing the file path and extension type.
+    Returns the chosen manifest entry.
 
     `ctx` - Discord context object\n
     `bird` (str) - bird to get media of\n
@@ -381,8 +578,8 @@ async def get_media(ctx, bird: str, media_type: MediaType, filters: Filter):
     except GenericError:
         sciBird = bird
     media = await get_files(sciBird, media_type, filters)
-    logger.info("media: " + str(media))
-    prevJ = int(database.hget(f"channel:{ctx.channel.id}", "prevJ"))
+    logger.info("media: " + str([entry.path for entry in media]))
+    prevJ = int(await async_database.hget(f"channel:{ctx.channel.id}", "prevJ"))
     # Randomize start (choose beginning 4/5ths in case it fails checks)
     if media:
         j = (prevJ + 1) % len(media)
@@ -391,33 +588,32 @@ async def get_media(ctx, bird: str, media_type: MediaType, filters: Filter):
 
         for x in range(0, len(media)):  # check file type and size
             y = (x + j) % len(media)
-            path = media[y]
-            extension = path.split(".")[-1]
-            logger.info("extension: " + str(extension))
-            statInfo = os.stat(path)
-            logger.info("size: " + str(statInfo.st_size))
+            entry = media[y]
+            logger.info("extension: " + str(entry.extension))
+            logger.info("size: " + str(entry.size))
             if (
-                extension.lower() in media_type.types().values()
-                and statInfo.st_size < MAX_FILESIZE
+                entry.extension.lower() in media_type.types().values()
+                and entry.size < MAX_FILESIZE
             ):  # keep files less than 4mb
                 logger.info("found one!")
                 break
+        else:
             raise GenericError(f"No Valid {media_type.name().title()} Found", code=999)
 
-        database.hset(f"channel:{ctx.channel.id}", "prevJ", str(j))
+        await async_database.hset(f"channel:{ctx.channel.id}", "prevJ", str(j))
     else:
         raise GenericError(f"No {media_type.name().title()} Found", code=100)
 
-    return [path, extension]
+    return entry
 
 
 async def get_files(
     sciBird: str, media_type: MediaType, filters: Filter, retries: int = 0
-):
-    """Returns a list of image/song filenames.
+) -> List[ManifestEntry]:
+    """Returns a list of manifest entries for images/songs.
 
     This function also does cache management,
-    looking for files in the cache for media and
+    looking for files in the media manifest and
     downloading images to the cache if not found.
 
     `sciBird` (str) - scientific name of bird\n
@@ -425,40 +621,56 @@ async def get_files(
     `filters` (bot.filters Filter)\n
     """
     logger.info(f"get_files retries: {retries}")
-    directory = f"bot_files/cache/{media_type.name()}/{sciBird}{filters.to_int()}/"
+    item = cache_item(sciBird, media_type, filters)
     # track counts for more accurate eviction
-    database.zincrby(
-        "frequency.media:global",
-        1,
-        f"{media_type.name()}/{sciBird}{filters.to_int()}",
-    )
-    try:
-        logger.info("trying")
-        files_dir = os.listdir(directory)
-        logger.info(directory)
-        if not files_dir:
-            raise GenericError("No Files", code=100)
-        return [f"{directory}{path}" for path in files_dir]
-    except (FileNotFoundError, GenericError):
-        logger.info("fetching files")
-        # if not found, fetch images
-        logger.info("scibird: " + str(sciBird))
-        filenames = await download_media(sciBird, media_type, filters, directory)
-        if not filenames:
-            if retries < 3:
-                retries += 1
-                return await get_files(sciBird, media_type, filters, retries)
-            logger.info("More than 3 retries")
-
-        return filenames
+    await async_database.zincrby("frequency.media:global", 1, item)
+    await touch(item)
+
+    entries = await get_entries_async(item)
+    if entries:
+        return entries
+
+    # fall back to the files on disk if they weren't in the manifest
+    loop = asyncio.get_running_loop()
+    entries = await loop.run_in_executor(None, scan_directory, item)
+    if entries:
+        logger.info("manifest rebuilt from disk")
+        return entries
+
+    logger.info("fetching files")
+    # if not found, fetch images
+    logger.info("scibird: " + str(sciBird))
+    with download_activity.track():
+        entries = await download_media(
+            sciBird, media_type, filters, cache_directory(item)
+        )
+    if not entries:
+        if macaulay.is_open:
+            # retrying won't help until the breaker lets requests through
+            logger.info("upstream unavailable, not retrying")
+            raise GenericError(
+                f"{macaulay.name} is unavailable, "
+                + f"retrying in {macaulay.retry_after():.0f}s",
+                code=201,
+            )
+        if retries < 3:
+            retries += 1
+            return await get_files(sciBird, media_type, filters, retries)
+        logger.info("More than 3 retries")
+
+    return entries
 
 
 async def download_media(
     bird: str, media_type: MediaType, filters: Filter, directory=None, session=None
 ):
-    """Returns a list of filenames downloaded from Macaulay Library.
+    """Returns a list of manifest entries downloaded from Macaulay Library.
 
-    This function manages the download helpers to fetch images from Macaulay.
+    This function manages the download helpers to fetch images from Macaulay,
+    and adds the downloaded files to the media manifest.
+
+    Concurrent calls for the same item share a single download. If
+    `DOWNLOAD_LOCK` is enabled, this is also shared across processes.
 
     `bird` (str) - scientific name of bird\n
     `media_type` (MediaType) - type of media (images/songs)\n
@@ -466,32 +678,85 @@ async def download_media(
     `directory` (str) - relative path to bird directory\n
     `session` (aiohttp ClientSession)
     """
+    item = cache_item(bird, media_type, filters)
     if directory is None:
-        directory = f"bot_files/cache/{media_type.name()}/{bird}{filters.to_int()}/"
+        directory = cache_directory(item)
+
+    inflight = _inflight_downloads.get(item)
+    if inflight is None:
+        inflight = asyncio.ensure_future(
+            _download_media(item, bird, media_type, filters, directory, session)
+        )
+        _inflight_downloads[item] = inflight
+        inflight.add_done_callback(lambda _: _inflight_downloads.pop(item, None))
+    else:
+        logger.info(f"waiting for in-flight download of {item}")
+    # shield so cancelling one caller doesn't cancel the download for the others
+    return await asyncio.shield(inflight)
+
 
+@contextlib.asynccontextmanager
+async def _download_lock(item: str):
+    """Holds a Redis lock for downloading an item.
+
+    Yields True if another process held the lock first.
+    """
+    lock = async_database.lock(f"media.lock:{item}", timeout=DOWNLOAD_LOCK_TIMEOUT)
+    waited = False
+    while not await lock.acquire(blocking=False):
+        waited = True
+        await asyncio.sleep(0.5)
+    try:
+        yield waited
+    finally:
+        with contextlib.suppress(redis.exceptions.LockError):
+            await lock.release()
+
+
+async def _download_media(
+    item: str,
+    bird: str,
+    media_type: MediaType,
+    filters: Filter,
+    directory: str,
+    session=None,
+):
     async with contextlib.AsyncExitStack() as stack:
+        if DOWNLOAD_LOCK:
+            waited = await stack.enter_async_context(_download_lock(item))
+            entries = await get_entries_async(item) if waited else []
+            if entries:
+                logger.info(f"{item} was downloaded by another process")
+                return entries
         if session is None:
-            session = await stack.enter_async_context(
-                aiohttp.ClientSession(cookie_jar=(await cookies()))
-            )
+            session = await http_client.session()
         urls = await _get_urls(session, bird, media_type, filters)
         if not os.path.exists(directory):
             os.makedirs(directory)
         urls = [(f"{directory}{asset_id}", url) for url, asset_id in urls]
         sem = asyncio.BoundedSemaphore(3)
-        filenames = await asyncio.gather(
+        results = await asyncio.gather(
             *(_download_helper(path, url, session, sem) for path, url in urls)
         )
-        fails = filenames.count(None)
-        if None in filenames:
-            filenames = set(filenames)
-            filenames.discard(None)
-            filenames = list(filenames)
+        entries = [entry for entry in results if entry is not None]
+        loop = asyncio.get_running_loop()
+        if media_type is MediaType.SONG:
+            entries = await asyncio.gather(
+                *(loop.run_in_executor(None, sanitize_song, entry) for entry in entries)
+            )
+        elif OPTIMIZE_IMAGES and not filters.large:
+            entries = await asyncio.gather(
+                *(
+                    loop.run_in_executor(None, optimize_image, entry)
+                    for entry in entries
+                )
+            )
+        await loop.run_in_executor(None, add_entries, item, entries)
+        await touch(item)
         logger.info(f"downloaded {media_type.name()} for {bird}")
-        logger.info(f"download check fails: {fails}")
-        logger.info(f"returned filename count: {len(filenames)}")
-        logger.info(f"actual filenames count: {len(os.listdir(directory))}")
-        return filenames
+        logger.info(f"download check fails: {len(results) - len(entries)}")
+        logger.info(f"returned entry count: {len(entries)}")
+        return sorted(entries, key=lambda entry: entry.asset_id)
 
 
 async def _get_urls(
@@ -499,13 +764,14 @@ async def _get_urls(
     bird: str,
     media_type: MediaType,
     filters: Filter,
-    retries: int = 0,
 ):
     """Returns a list of urls to Macaulay Library media.
 
     The amount of urls returned is specified in `COUNT`.
-    Media URLs are fetched using Macaulay Library's internal JSON API,
-    with `CATALOG_URL`. Raises a `GenericError` if fails.\n
+    Media URLs are taken from the asset pool of the item (`media.catalog:`),
+    which is filled with pages of `CATALOG_PAGE_SIZE` assets by `_fill_catalog`.
+    The pool is filled in the background when it runs low.
+    Raises a `GenericError` if fails.\n
     Some urls may return an error code of 476 (because it is still being processed),
     if so, ignore that url.
 
@@ -515,14 +781,100 @@ async def _get_urls(
     `filters` (bot.filters Filter)
     """
     logger.info(f"getting file urls for {bird}")
+    item = cache_item(bird, media_type, filters)
+    catalog_key = f"media.catalog:{item}"
+    if await async_database.llen(catalog_key) < COUNT and item in _catalog_fills:
+        await asyncio.shield(_catalog_fills[item])
+    if await async_database.llen(catalog_key) < COUNT:
+        await _fill_catalog(session, bird, media_type, filters)
+
+    async with async_database.pipeline() as pipe:
+        pipe.lrange(catalog_key, 0, COUNT - 1)
+        pipe.ltrim(catalog_key, COUNT, -1)
+        pipe.llen(catalog_key)
+        page, _, remaining = await pipe.execute()
+    assets = [orjson.loads(asset) for asset in page]
+
+    if remaining < CATALOG_REFILL_AT and item not in _catalog_fills:
+        task = asyncio.create_task(
+            _fill_catalog_background(session, bird, media_type, filters)
+        )
+        _catalog_fills[item] = task
+        task.add_done_callback(lambda _: _catalog_fills.pop(item, None))
+
+    if media_type is MediaType.IMAGE:
+        if filters.large:
+            size = "1200"
+        else:
+            size = "640"
+    else:
+        size = "audio"
+
+    urls = [
+        (ASSET_URL.format(id=asset["assetId"], size=size), asset["assetId"])
+        for asset in assets
+    ]
+    if not urls:
+        raise GenericError("No urls found.", code=100)
+    return urls
+
+
+async def _catalog_size(
+    session: aiohttp.ClientSession,
+    bird: str,
+    media_type: MediaType,
+    filters: Filter,
+) -> int:
+    """Returns the number of assets in the asset pool of an item.
+
+    The pool is filled if it has less than 2 assets, but assets aren't removed.
+    """
+    item = cache_item(bird, media_type, filters)
+    catalog_key = f"media.catalog:{item}"
+    if item in _catalog_fills:
+        await asyncio.shield(_catalog_fills[item])
+    size = await async_database.llen(catalog_key)
+    if size < 2:
+        try:
+            await _fill_catalog(session, bird, media_type, filters)
+        except GenericError as e:
+            if e.code != 100:
+                raise e
+        size = await async_database.llen(catalog_key)
+    return size
+
+
+async def _fill_catalog(
+    session: aiohttp.ClientSession,
+    bird: str,
+    media_type: MediaType,
+    filters: Filter,
+    retries: int = 0,
+    restarted: bool = False,
+) -> int:
+    """Adds a page of assets from the Macaulay catalog to the asset pool of an item.
+
+    Assets are fetched using Macaulay Library's internal JSON API,
+    with `CATALOG_URL`, continuing from the cursor of the last page.
+    When the end of the catalog is reached, the next page starts from the beginning.
+    Raises a `GenericError` if fails. Empty catalogs are remembered for
+    `NEGATIVE_CACHE_TTL` seconds (`media.empty:`), so they aren't fetched again.
+
+    Returns the number of assets added.
+    """
+    logger.info(f"filling asset catalog for {bird}")
+    item = cache_item(bird, media_type, filters)
+    if await async_database.exists(f"media.empty:{item}"):
+        logger.info(f"catalog is known to be empty for {item}")
+        raise GenericError("No urls found.", code=100)
     taxon_code = (await get_taxon(bird, session))[0]
-    database_key = f"{media_type.name()}/{bird}{filters.to_int()}"
-    cursor = (database.get(f"media.cursor:{database_key}") or b"").decode()
-    catalog_url = filters.url(taxon_code, media_type, COUNT, cursor)
+    cursor = (await async_database.get(f"media.cursor:{item}") or b"").decode()
+    catalog_url = filters.url(taxon_code, media_type, CATALOG_PAGE_SIZE, cursor)
 
-    async with session.get(catalog_url) as catalog_response:
+    async with macaulay.get(session, catalog_url) as catalog_response:
         if catalog_response.status != 200:
-            cookies.clear()
+            if catalog_response.status in (401, 403):
+                http_client.clear_cookies()
             if retries >= 3:
                 logger.info("Retried more than 3 times. Aborting...")
                 raise GenericError(
@@ -531,47 +883,65 @@ async def _get_urls(
                     code=201,
                 )
             retries += 1
+            delay = backoff(retries)
             logger.info(
-                f"An HTTP error occurred; Retries: {retries}; Sleeping: {1.5**retries}"
+                f"An HTTP error occurred; Retries: {retries}; Sleeping: {delay:.1f}"
+            )
+            await asyncio.sleep(delay)
+            return await _fill_catalog(
+                session, bird, media_type, filters, retries, restarted
             )
-            await asyncio.sleep(1.5**retries)
-            urls = await _get_urls(session, bird, media_type, filters, retries)
-            return urls
 
         catalog_data = await catalog_response.json()
         if catalog_data and "cursorMark" in catalog_data[-1]:
             cursor_mark = catalog_data[-1]["cursorMark"]
         else:
             cursor_mark = b""
-        database.set(f"media.cursor:{database_key}", cursor_mark)
+        await async_database.set(f"media.cursor:{item}", cursor_mark)
 
-        if media_type is MediaType.IMAGE:
-            if filters.large:
-                size = "1200"
-            else:
-                size = "640"
-        else:
-            size = "audio"
-
-        urls = [
-            (ASSET_URL.format(id=data["assetId"], size=size), data["assetId"])
+        assets = [
+            orjson.dumps(
+                {field: data[field] for field in CATALOG_FIELDS if field in data}
+            )
             for data in catalog_data
         ]
-        if not urls:
-            if retries >= 1:
+        if not assets:
+            if restarted or not cursor:
+                # the catalog is empty from the beginning
+                await async_database.set(
+                    f"media.empty:{item}", 1, ex=NEGATIVE_CACHE_TTL
+                )
                 raise GenericError("No urls found.", code=100)
             logger.info("retrying without cursor")
-            retries += 1
-            urls = await _get_urls(session, bird, media_type, filters, retries)
-            return urls
+            return await _fill_catalog(
+                session, bird, media_type, filters, retries, restarted=True
+            )
+
+        catalog_key = f"media.catalog:{item}"
+        await async_database.rpush(catalog_key, *assets)
+        await async_database.expire(catalog_key, CATALOG_EXPIRE)
+        logger.info(f"added {len(assets)} assets to the catalog for {item}")
+        return len(assets)
 
-        return urls
+
+async def _fill_catalog_background(
+    session: aiohttp.ClientSession, bird: str, media_type: MediaType, filters: Filter
+):
+    try:
+        with request_priority(Priority.PREFETCH):
+            await _fill_catalog(session, bird, media_type, filters)
+    except GenericError as e:
+        logger.info(f"background catalog fill failed for {bird}: {e}")
+    except Exception as e:  # pylint: disable=broad-except
+        logger.exception(e)
+        capture_exception(e)
 
 
 async def _download_helper(path, url, session, sem):
     """Downloads media from the given URL.
 
-    Returns the file path to the downloaded item.
+    Returns a manifest entry for the downloaded item,
+    or None if the download failed.
 
     `path` (str) - path with filename of location to download, no extension\n
     `url` (str) - url to the item to be downloaded\n
@@ -579,7 +949,7 @@ async def _download_helper(path, url, session, sem):
     """
     async with sem:
         try:
-            async with session.get(url) as response:
+            async with macaulay.get(session, url) as response:
                 media_size = response.headers.get("content-length")
                 if (
                     response.status != 200
@@ -613,17 +983,42 @@ async def _download_helper(path, url, session, sem):
                     raise GenericError("Invalid content-type.")
 
                 filename = f"{path}.{ext}"
-                # from https://stackoverflow.com/questions/38358521/alternative-of-urllib-urlretrieve-in-python-3-5
-                with open(filename, "wb") as out_file:
-                    block_size = 1024 * 8
-                    while True:
-                        block = await response.content.read(
-                            block_size
-                        )  # pylint: disable=no-member
-                        if not block:
-                            break
-                        out_file.write(block)
-                return filename
+                # stream to a temp file and rename it when complete,
+                # so the cache never has partially downloaded media
+                fd, temp_filename = tempfile.mkstemp(
+                    suffix=TEMP_SUFFIX, dir=os.path.dirname(filename)
+                )
+                try:
+                    written = 0
+                    with os.fdopen(fd, "wb") as out_file:
+                        async for block in response.content.iter_chunked(
+                            DOWNLOAD_BLOCK_SIZE
+                        ):
+                            out_file.write(block)
+                            written += len(block)
+                        out_file.flush()
+                        os.fsync(out_file.fileno())
+                    # compressed responses don't have a comparable content-length
+                    compressed = "content-encoding" in response.headers
+                    if not compressed and written != int(media_size):
+                        logger.info(
+                            f"FAIL: incomplete download; expected {media_size}, got {written}"
+                        )
+                        logger.info(url)
+                        return None
+                    os.chmod(temp_filename, 0o644)
+                    os.replace(temp_filename, filename)
+                finally:
+                    with contextlib.suppress(FileNotFoundError):
+                        os.remove(temp_filename)
+                return ManifestEntry(
+                    os.path.basename(path),
+                    filename,
+                    ext,
+                    os.stat(filename).st_size,
+                    content_type,
+                    int(time.time()),
+                )
 
         except aiohttp.ClientError as e:
             logger.info(f"Client Error with url {url} and path {path}")
@@ -660,6 +1055,8 @@ def evict_media():
     This prevents media from becoming stale. If the item frequency has
     been incremented more than 2*COUNT times, this function will delete
     the top 3 items.
+
+    This is the freshness policy, see `evict_cold_media` for the size limit.
     """
     logger.info("Updating cached images")
 
@@ -674,10 +1071,59 @@ def evict_media():
         ),
     ):
         database.zadd("frequency.media:global", {item: 0})
-        shutil.rmtree(f"bot_files/cache/{item}/")
+        delete_item(item)
+        shutil.rmtree(cache_directory(item), ignore_errors=True)
+        hot_cache.invalidate_directory(cache_directory(item))
         logger.info(f"{item} removed")
 
 
+def evict_cold_media(max_bytes: int = CACHE_MAX_BYTES):
+    """Deletes the coldest cached items until the cache fits in `max_bytes`.
+
+    Items are ranked by their last access time (`media.access:global`),
+    with frequently used items (`frequency.media:global`) counting
+    as more recently used. Eviction stops at 90% of `max_bytes`
+    so this doesn't run on every call.
+    """
+    total = total_size()
+    logger.info(f"media cache size: {total} bytes")
+    if total <= max_bytes:
+        return
+
+    sizes = {
+        item.decode(): size
+        for item, size in database.zrange("media.bytes:global", 0, -1, withscores=True)
+    }
+    access = {
+        item.decode(): timestamp
+        for item, timestamp in database.zrange(
+            "media.access:global", 0, -1, withscores=True
+        )
+    }
+    frequency = {
+        item.decode(): count
+        for item, count in database.zrange(
+            "frequency.media:global", 0, -1, withscores=True
+        )
+    }
+
+    def coldness(item):
+        return access.get(item, 0) + FREQUENCY_WEIGHT * math.log2(
+            1 + max(frequency.get(item, 0), 0)
+        )
+
+    target = max_bytes * 0.9
+    for item in sorted(sizes, key=coldness):
+        if total <= target:
+            break
+        delete_item(item)
+        shutil.rmtree(cache_directory(item), ignore_errors=True)
+        hot_cache.invalidate_directory(cache_directory(item))
+        total -= sizes[item]
+        logger.info(f"{item} evicted")
+    logger.info(f"media cache size after eviction: {total} bytes")
+
+
 def spellcheck(arg, correct, cutoff=None):
     """Checks if two words are close to each other.
 
@@ -707,15 +1153,13 @@ def spellcheck_list(arg, correct_options, cutoff=None):
 
 
 def better_spellcheck(
-    word: str, correct: Iterable[str], options: Iterable[str]
+    word: str, correct: Iterable[str], extra: Iterable[str] = ()
 ) -> bool:
-    """Allow lenient spelling unless another answer is closer."""
-    all_options = set(list(correct) + list(options))
-    matches = difflib.get_close_matches(
-        word.lower(), map(str.lower, all_options), n=1, cutoff=(2 / 3)
-    )
-    if not matches:
-        return False
-    if matches[0] in map(str.lower, correct):
-        return True
-    return False
+    """Allow lenient spelling unless another answer is closer.
+
+    Answers are compared against `correct`, `extra`, and every bird in
+    `birdListMaster` and `sciListMaster` (`bot.spellcheck.bird_index`).
+    """
+    correct = [answer.lower() for answer in correct]
+    match = bird_index.closest(word, (*correct, *extra))
+    return match is not None and match in correct
@@ -14,15 +14,19 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
+import asyncio
+import collections
 import csv
 import logging
 import logging.handlers
 import os
 import string
 import sys
-from typing import Dict, List
+import weakref
+from typing import Dict, List, Tuple
 
 import redis
+import redis.asyncio
 import sentry_sdk
 import wikipedia
 from discord.ext import commands
@@ -42,8 +46,67 @@ if os.getenv("SCIOLY_ID_BOT_LOCAL_REDIS") == "true":
     if host is None:
         host = "localhost"
     database = redis.Redis(host=host, port=6379, db=0)
+    redis_url = f"redis://{host}:6379/0"
 else:
     database = redis.from_url(os.getenv("REDIS_URL"))
+    redis_url = os.getenv("REDIS_URL")
+
+# max connections to Redis for each event loop
+REDIS_CONNECTIONS = int(os.getenv("SCIOLY_ID_BOT_REDIS_CONNECTIONS", "20"))
+
+
+class AsyncDatabase:
+    """Async Redis client for use in coroutines.
+
+    Commands are forwarded to a redis.asyncio client for the running
+    event loop, since connections can't be shared between loops. Waits
+    for a free connection once `max_connections` are in use.
+
+    Code running in an executor should use the sync `database`.
+    """
+
+    def __init__(self, url: str, max_connections: int = REDIS_CONNECTIONS):
+        self.url = url
+        self.max_connections = max_connections
+        self._clients = weakref.WeakKeyDictionary()
+
+    def client(self) -> redis.asyncio.Redis:
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            pool = redis.asyncio.BlockingConnectionPool.from_url(
+                self.url, max_connections=self.max_connections
+            )
+            client = redis.asyncio.Redis(connection_pool=pool)
+            self._clients[loop] = client
+        return client
+
+    def __getattr__(self, name):
+        return getattr(self.client(), name)
+
+    async def close(self):
+        """Closes the client for the running event loop."""
+        client = self._clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.close()
+            await client.connection_pool.disconnect()
+
+
+async_database = AsyncDatabase(redis_url)
+
+# send Macaulay/eBird requests to a local stand-in (bot.tools.standin) instead
+UPSTREAM_URL = os.getenv("SCIOLY_ID_BOT_UPSTREAM_URL")
+
+
+def upstream_url(url: str) -> str:
+    """Returns `url`, pointed at `UPSTREAM_URL` if it is set.
+
+    The host is kept as the first path segment, so
+    `https://api.ebird.org/v2/...` becomes `{UPSTREAM_URL}/api.ebird.org/v2/...`
+    """
+    if not UPSTREAM_URL:
+        return url
+    return f"{UPSTREAM_URL.rstrip('/')}/{url.split('://', 1)[1]}"
 
 
 def before_sentry_send(event, hint):
@@ -167,16 +230,49 @@ if os.getenv("SCIOLY_ID_BOT_USE_SENTRY") != "false":
 # custom list format (set):
 #   custom.list:user_id : [validated birds, ...]
 
-# cooldown rate limit format:
-#   cooldown:global : 0
-
 # media type, bird, and filter media frequency format:
-# (for media eviction)
+# (for media eviction, filter is Filter.fetch_int() here and in all media keys)
 #   frequency.media:global : ["{type}/{sciname}{filter}", count]
 
 # media cursor format:
 #   media.cursor:{type}/{sciname}{filter} : cursor
 
+# upstream rate limit format:
+# (token bucket per upstream host, shared by all processes)
+#   ratelimit:{host} : {tokens, updated}
+
+# empty media catalog format:
+# (catalogs with no results, expires after NEGATIVE_CACHE_TTL)
+#   media.empty:{type}/{sciname}{filter} : 1
+
+# media asset pool format:
+# (catalog assets waiting to be downloaded, values are json, expires after a week)
+#   media.catalog:{type}/{sciname}{filter} : [{assetId, rating, ratingCount}, ...]
+
+# media manifest format:
+# (one hash per cached bird directory, values are json)
+#   media.manifest:{type}/{sciname}{filter} : {
+#                    asset_id: {asset_id, path, extension, size, content_type, downloaded,
+#                               variants: {name: [path, size]}, sanitized}
+#   }
+
+# media cache size and access format:
+# (for size-bounded eviction)
+#   media.bytes:global : ["{type}/{sciname}{filter}", total bytes]
+#   media.access:global : ["{type}/{sciname}{filter}", last access timestamp]
+
+# media integrity scan format:
+# (last cache item checked by bot.scanner)
+#   media.scan:position : "{type}/{sciname}{filter}"
+
+# media warming progress format:
+# (items finished by bot.tools.warm, run is a hash of the arguments)
+#   warm.progress:{run} : set of "{type}/{sciname}{filter}"
+
+# media download lock format:
+# (only with SCIOLY_ID_BOT_DOWNLOAD_LOCK, expires after 2 minutes)
+#   media.lock:{type}/{sciname}{filter} : lock token
+
 #  states = {
 #          state name:
 #               {
@@ -357,6 +453,37 @@ def _alpha_codes() -> Dict[str, str]:
     return lookup
 
 
+TAXONOMY_FILE = "bot/data/taxonomy.csv"
+
+TaxonomyEntry = collections.namedtuple(
+    "TaxonomyEntry", ["common_name", "scientific_name", "species_code", "alpha_code"]
+)
+
+
+def taxonomy_key(bird: str) -> str:
+    """Returns the lookup key of a bird name in the taxonomy snapshot."""
+    return bird.strip().replace("-", " ").lower()
+
+
+def _taxonomy(path: str = TAXONOMY_FILE) -> Tuple[str, Dict[str, TaxonomyEntry]]:
+    """Loads the bundled eBird taxonomy snapshot.
+
+    The first line of the file is `# version: {version}`, the rest is CSV.
+    Entries are keyed by `taxonomy_key` of their common and scientific names.
+    Regenerate the snapshot with `python -m bot.tools.taxonomy`.
+    """
+    logger.info("Working on taxonomy")
+    lookup = {}
+    with open(path, "r") as f:
+        version = f.readline().partition(":")[2].strip()
+        for row in csv.DictReader(f):
+            entry = TaxonomyEntry(**row)
+            lookup[taxonomy_key(entry.common_name)] = entry
+            lookup[taxonomy_key(entry.scientific_name)] = entry
+    logger.info(f"Done with taxonomy version {version}")
+    return (version, lookup)
+
+
 def _nats_lists() -> List[List[str]]:
     """Converts txt files of national bird data into lists."""
     filenames = ("birdList", "songBirds", "sciListMaster", "memeList")
@@ -445,6 +572,7 @@ birdListMaster = _all_birds()
 taxons = _taxons()
 wikipedia_urls = _wiki_urls()
 alpha_codes = _alpha_codes()
+taxonomy_version, taxonomy = _taxonomy()
 logger.info(f"National Lengths: {len(birdList)}, {len(songBirds)}")
 logger.info(f"Master Lengths: {len(birdListMaster)}, {len(sciListMaster)}")
 logger.info("Done importing data!")
@@ -17,7 +17,7 @@
 import datetime
 import string
 
-from bot.data import database, logger, states
+from bot.data import async_database, logger, states
 
 
 async def channel_setup(ctx):
@@ -26,8 +26,8 @@ async def channel_setup(ctx):
     `ctx` - Discord context object
     """
     logger.info("checking channel setup")
-    if not database.exists(f"channel:{ctx.channel.id}"):
-        database.hset(
+    if not await async_database.exists(f"channel:{ctx.channel.id}"):
+        await async_database.hset(
             f"channel:{ctx.channel.id}",
             mapping={"bird": "", "answered": 1, "prevB": "", "prevJ": 20},
         )
@@ -35,13 +35,13 @@ async def channel_setup(ctx):
         logger.info("channel data added")
         await ctx.send("Ok, setup! I'm all ready to use!")
 
-    if database.zscore("score:global", str(ctx.channel.id)) is None:
-        database.zadd("score:global", {str(ctx.channel.id): 0})
+    if await async_database.zscore("score:global", str(ctx.channel.id)) is None:
+        await async_database.zadd("score:global", {str(ctx.channel.id): 0})
         logger.info("channel score added")
 
     if ctx.guild is not None:
         channels = map(lambda x: str(x.id), ctx.guild.text_channels)
-        database.sadd(f"channels:{ctx.guild.id}", *channels)
+        await async_database.sadd(f"channels:{ctx.guild.id}", *channels)
 
 
 async def user_setup(ctx):
@@ -58,37 +58,37 @@ async def user_setup(ctx):
         guild = ctx.guild
 
     logger.info("checking user data")
-    if database.zscore("users:global", user_id) is None:
-        database.zadd("users:global", {user_id: 0})
+    if await async_database.zscore("users:global", user_id) is None:
+        await async_database.zadd("users:global", {user_id: 0})
         logger.info("user global added")
         if ctx is not None:
             await ctx.send("Welcome <@" + user_id + ">!")
 
     date = str(datetime.datetime.now(datetime.timezone.utc).date())
-    if database.zscore(f"daily.score:{date}", user_id) is None:
-        database.zadd(f"daily.score:{date}", {user_id: 0})
+    if await async_database.zscore(f"daily.score:{date}", user_id) is None:
+        await async_database.zadd(f"daily.score:{date}", {user_id: 0})
         logger.info("user daily added")
 
     # Add streak
-    if (database.zscore("streak:global", user_id) is None) or (
-        database.zscore("streak.max:global", user_id) is None
+    if (await async_database.zscore("streak:global", user_id) is None) or (
+        await async_database.zscore("streak.max:global", user_id) is None
     ):
-        database.zadd("streak:global", {user_id: 0})
-        database.zadd("streak.max:global", {user_id: 0})
+        await async_database.zadd("streak:global", {user_id: 0})
+        await async_database.zadd("streak.max:global", {user_id: 0})
         logger.info("added streak")
 
     if guild is not None:
-        if database.exists(f"users.server:{ctx.guild.id}"):
+        if await async_database.exists(f"users.server:{ctx.guild.id}"):
             users = map(
                 lambda x: x.decode("utf-8"),
-                database.zrange(f"users.server:{ctx.guild.id}", 0, -1),
+                await async_database.zrange(f"users.server:{ctx.guild.id}", 0, -1),
             )
-            database.sadd(f"users.server.id:{ctx.guild.id}", *users)
-            database.delete(f"users.server:{ctx.guild.id}")
-        database.sadd(f"users.server.id:{ctx.guild.id}", str(ctx.author.id))
+            await async_database.sadd(f"users.server.id:{ctx.guild.id}", *users)
+            await async_database.delete(f"users.server:{ctx.guild.id}")
+        await async_database.sadd(f"users.server.id:{ctx.guild.id}", str(ctx.author.id))
         logger.info("synced user to server")
 
-        if not database.exists(f"custom.list:{ctx.author.id}"):
+        if not await async_database.exists(f"custom.list:{ctx.author.id}"):
             role_ids = [role.id for role in ctx.author.roles]
             role_names = [role.name.lower() for role in ctx.author.roles]
             if set(role_names).intersection(set(states["CUSTOM"]["aliases"])):
@@ -100,7 +100,7 @@ async def user_setup(ctx):
                 logger.info("synced roles")
 
 
-def bird_setup(ctx, bird: str):
+async def bird_setup(ctx, bird: str):
     """Sets up a new bird for incorrect tracking.
 
     `ctx` - Discord context object or user id\n
@@ -114,67 +114,90 @@ def bird_setup(ctx, bird: str):
         guild = ctx.guild
 
     logger.info("checking bird data")
-    if database.zscore("incorrect:global", string.capwords(bird)) is not None:
+    if (
+        await async_database.zscore("incorrect:global", string.capwords(bird))
+        is not None
+    ):
         logger.info("bird global ok")
     else:
-        database.zadd("incorrect:global", {string.capwords(bird): 0})
+        await async_database.zadd("incorrect:global", {string.capwords(bird): 0})
         logger.info("bird global added")
 
-    if database.zscore(f"incorrect.user:{user_id}", string.capwords(bird)) is not None:
+    if (
+        await async_database.zscore(f"incorrect.user:{user_id}", string.capwords(bird))
+        is not None
+    ):
         logger.info("incorrect bird user ok")
     else:
-        database.zadd(f"incorrect.user:{user_id}", {string.capwords(bird): 0})
+        await async_database.zadd(
+            f"incorrect.user:{user_id}", {string.capwords(bird): 0}
+        )
         logger.info("incorrect bird user added")
 
-    if database.zscore(f"correct.user:{user_id}", string.capwords(bird)) is not None:
+    if (
+        await async_database.zscore(f"correct.user:{user_id}", string.capwords(bird))
+        is not None
+    ):
         logger.info("correct bird user ok")
     else:
-        database.zadd(f"correct.user:{user_id}", {string.capwords(bird): 0})
+        await async_database.zadd(f"correct.user:{user_id}", {string.capwords(bird): 0})
         logger.info("correct bird user added")
 
     date = str(datetime.datetime.now(datetime.timezone.utc).date())
-    if database.zscore(f"daily.incorrect:{date}", string.capwords(bird)) is not None:
+    if (
+        await async_database.zscore(f"daily.incorrect:{date}", string.capwords(bird))
+        is not None
+    ):
         logger.info("bird daily ok")
     else:
-        database.zadd(f"daily.incorrect:{date}", {string.capwords(bird): 0})
+        await async_database.zadd(f"daily.incorrect:{date}", {string.capwords(bird): 0})
         logger.info("bird daily added")
 
-    if database.zscore("frequency.bird:global", string.capwords(bird)) is not None:
+    if (
+        await async_database.zscore("frequency.bird:global", string.capwords(bird))
+        is not None
+    ):
         logger.info("bird freq global ok")
     else:
-        database.zadd("frequency.bird:global", {string.capwords(bird): 0})
+        await async_database.zadd("frequency.bird:global", {string.capwords(bird): 0})
         logger.info("bird freq global added")
 
     if guild is not None:
         logger.info("no dm")
         if (
-            database.zscore(f"incorrect.server:{ctx.guild.id}", string.capwords(bird))
+            await async_database.zscore(
+                f"incorrect.server:{ctx.guild.id}", string.capwords(bird)
+            )
             is not None
         ):
             logger.info("bird server ok")
         else:
-            database.zadd(
+            await async_database.zadd(
                 f"incorrect.server:{ctx.guild.id}", {string.capwords(bird): 0}
             )
             logger.info("bird server added")
     else:
         logger.info("dm context")
 
-    if database.exists(f"session.data:{user_id}"):
+    if await async_database.exists(f"session.data:{user_id}"):
         logger.info("session in session")
         if (
-            database.zscore(f"session.incorrect:{user_id}", string.capwords(bird))
+            await async_database.zscore(
+                f"session.incorrect:{user_id}", string.capwords(bird)
+            )
             is not None
         ):
             logger.info("bird session ok")
         else:
-            database.zadd(f"session.incorrect:{user_id}", {string.capwords(bird): 0})
+            await async_database.zadd(
+                f"session.incorrect:{user_id}", {string.capwords(bird): 0}
+            )
             logger.info("bird session added")
     else:
         logger.info("no session")
 
 
-def session_increment(ctx, item: str, amount: int):
+async def session_increment(ctx, item: str, amount: int):
     """Increments the value of a database hash field by `amount`.
 
     `ctx` - Discord context object or user id\n
@@ -187,17 +210,17 @@ def session_increment(ctx, item: str, amount: int):
     else:
         user_id = ctx.author.id
 
-    if database.exists(f"session.data:{user_id}"):
+    if await async_database.exists(f"session.data:{user_id}"):
         logger.info("session active")
         logger.info(f"incrementing {item} by {amount}")
-        value = int(database.hget(f"session.data:{user_id}", item))
+        value = int(await async_database.hget(f"session.data:{user_id}", item))
         value += int(amount)
-        database.hset(f"session.data:{user_id}", item, str(value))
+        await async_database.hset(f"session.data:{user_id}", item, str(value))
     else:
         logger.info("session not active")
 
 
-def incorrect_increment(ctx, bird: str, amount: int):
+async def incorrect_increment(ctx, bird: str, amount: int):
     """Increments the value of an incorrect bird by `amount`.
 
     `ctx` - Discord context object or user id\n
@@ -213,26 +236,30 @@ def incorrect_increment(ctx, bird: str, amount: int):
 
     logger.info(f"incrementing incorrect {bird} by {amount}")
     date = str(datetime.datetime.now(datetime.timezone.utc).date())
-    database.zincrby("incorrect:global", amount, string.capwords(str(bird)))
-    database.zincrby(f"incorrect.user:{user_id}", amount, string.capwords(str(bird)))
-    database.zincrby(f"daily.incorrect:{date}", amount, string.capwords(str(bird)))
+    await async_database.zincrby("incorrect:global", amount, string.capwords(str(bird)))
+    await async_database.zincrby(
+        f"incorrect.user:{user_id}", amount, string.capwords(str(bird))
+    )
+    await async_database.zincrby(
+        f"daily.incorrect:{date}", amount, string.capwords(str(bird))
+    )
     if guild is not None:
         logger.info("no dm")
-        database.zincrby(
+        await async_database.zincrby(
             f"incorrect.server:{ctx.guild.id}", amount, string.capwords(str(bird))
         )
     else:
         logger.info("dm context")
-    if database.exists(f"session.data:{user_id}"):
+    if await async_database.exists(f"session.data:{user_id}"):
         logger.info("session in session")
-        database.zincrby(
+        await async_database.zincrby(
             f"session.incorrect:{user_id}", amount, string.capwords(str(bird))
         )
     else:
         logger.info("no session")
 
 
-def score_increment(ctx, amount: int):
+async def score_increment(ctx, amount: int):
     """Increments the score of a user by `amount`.
 
     `ctx` - Discord context object\n
@@ -249,17 +276,17 @@ def score_increment(ctx, amount: int):
 
     logger.info(f"incrementing score by {amount}")
     date = str(datetime.datetime.now(datetime.timezone.utc).date())
-    database.zincrby("score:global", amount, channel_id)
-    database.zincrby("users:global", amount, user_id)
-    database.zincrby(f"daily.score:{date}", amount, user_id)
-    if guild is not None and database.exists(f"race.data:{ctx.channel.id}"):
+    await async_database.zincrby("score:global", amount, channel_id)
+    await async_database.zincrby("users:global", amount, user_id)
+    await async_database.zincrby(f"daily.score:{date}", amount, user_id)
+    if guild is not None and await async_database.exists(f"race.data:{ctx.channel.id}"):
         logger.info("race in session")
-        database.zincrby(f"race.scores:{ctx.channel.id}", amount, user_id)
+        await async_database.zincrby(f"race.scores:{ctx.channel.id}", amount, user_id)
     else:
         logger.info("dm context")
 
 
-def streak_increment(ctx, amount: int):
+async def streak_increment(ctx, amount: int):
     """Increments the streak of a user by `amount`.
 
     `ctx` - Discord context object or user id\n
@@ -273,13 +300,23 @@ def streak_increment(ctx, amount: int):
 
     if amount is not None:
         # increment streak and update max
-        database.zincrby("streak:global", amount, user_id)
-        if database.zscore("streak:global", user_id) > database.zscore(
-            "streak.max:global", user_id
-        ):
-            database.zadd(
-                "streak.max:global",
-                {user_id: database.zscore("streak:global", user_id)},
-            )
+        streak = await async_database.zincrby("streak:global", amount, user_id)
+        if streak > await async_database.zscore("streak.max:global", user_id):
+            await async_database.zadd("streak.max:global", {user_id: streak})
     else:
-        database.zadd("streak:global", {user_id: 0})
+        await async_database.zadd("streak:global", {user_id: 0})
+
+
+# races in progress, kept in memory so chat messages in other channels skip Redis
+# (channel id: whether the race uses a custom list)
+race_channels = {}
+
+
+async def load_race_channels():
+    """Finds races in progress from the database, for when the bot starts."""
+    race_channels.clear()
+    async for key in async_database.scan_iter(match="race.data:*", count=1000):
+        channel_id = int(key.decode("utf-8").split(":")[1])
+        state = (await async_database.hget(key, "state") or b"").decode("utf-8")
+        race_channels[channel_id] = "CUSTOM:" in state
+    logger.info(f"found {len(race_channels)} races in progress")
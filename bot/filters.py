@@ -22,10 +22,12 @@ from collections.abc import Iterable
 import discord
 from discord import app_commands
 
-from bot.data import states, taxons
+from bot.data import states, taxons, upstream_url
 
 # Macaulay Library URLs
-CATALOG_URL = "https://search.macaulaylibrary.org/api/v2/search?sort=rating_rank_desc"
+CATALOG_URL = upstream_url(
+    "https://search.macaulaylibrary.org/api/v2/search?sort=rating_rank_desc"
+)
 
 
 class MediaType(Enum):
@@ -64,6 +66,7 @@ class MediaType(Enum):
 
 class Filter:
     _boolean_options = ("large", "bw", "vc")
+    _presentation_options = ("bw", "vc")
     _default_options: Dict[str, Any] = {}
 
     def __init__(
@@ -249,6 +252,17 @@ class Filter:
                 out[indexes[title][name] - 1] = "1"
         return int("".join(reversed(out)), 2)
 
+    def fetch_int(self):
+        """Convert filters that change what is fetched from Macaulay into an integer.
+
+        This is the same as `to_int()` without presentation-only filters
+        (black & white, voice channel), so media can be shared between them.
+        """
+        presentation = Filter(
+            **{option: True for option in self._presentation_options}
+        ).to_int()
+        return self.to_int() & ~presentation
+
     @classmethod
     def from_int(cls, number: int):
         """Convert an int to a filter object."""
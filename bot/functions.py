@@ -16,6 +16,7 @@
 
 import asyncio
 import base64
+import collections
 import concurrent.futures
 import difflib
 import errno
@@ -25,19 +26,23 @@ import itertools
 import os
 import pickle
 import random
+import time
 from typing import List, Union
 
 import aiohttp
 import chardet
 import discord
+import orjson
 import redis
 import wikipedia
 from Crypto.Cipher import ChaCha20
 from discord.ext import commands
 from sentry_sdk import capture_exception
 
+from bot.breaker import CircuitState, ebird, macaulay
 from bot.data import (
     GenericError,
+    async_database,
     birdList,
     birdListMaster,
     database,
@@ -50,55 +55,167 @@ from bot.data import (
 from bot.data_functions import channel_setup
 from bot.filters import MediaType
 
+CacheInfo = collections.namedtuple(
+    "CacheInfo",
+    (
+        "hits",
+        "misses",
+        "maxsize",
+        "currsize",
+        "local_hits",
+        "local_misses",
+        "local_size",
+        "redis_hits",
+        "redis_misses",
+    ),
+)
+
+
+def _tuples(value):
+    if isinstance(value, list):
+        if any(isinstance(item, (list, dict)) for item in value):
+            return tuple(map(_tuples, value))
+        return tuple(value)
+    if isinstance(value, dict):
+        return {key: _tuples(item) for key, item in value.items()}
+    return value
+
+
+# Serializers for the Redis cache. Stored values are prefixed with
+# `{name}{version}:`, so entries written by a different codec or version
+# are treated as misses and overwritten instead of being mis-decoded.
+# Bump the version when the shape of a cached value changes.
+CacheCodec = collections.namedtuple("CacheCodec", ("name", "version", "dumps", "loads"))
+
+# JSON arrays are decoded as tuples, since cached values are used as immutable
+ORJSON_CODEC = CacheCodec(
+    "json", 1, orjson.dumps, lambda data: _tuples(orjson.loads(data))
+)
+PICKLE_CODEC = CacheCodec(
+    "pickle", 1, functools.partial(pickle.dumps, protocol=4), pickle.loads
+)
+
+
+def _codec_prefix(codec: CacheCodec) -> bytes:
+    return f"{codec.name}{codec.version}:".encode()
+
 
-def cache(pre=None, local=True):
+# seconds to remember failed lookups (see `negative` in `cache`)
+NEGATIVE_CACHE_TTL = int(os.getenv("SCIOLY_ID_BOT_NEGATIVE_CACHE_TTL", "300"))
+NEGATIVE_PREFIX = b"error:"
+
+
+def cache(
+    pre=None,
+    local=True,
+    maxsize=None,
+    ttl=None,
+    redis_ttl=7776000,  # 60*60*24*90
+    codec=ORJSON_CODEC,
+    negative=(),
+    is_negative=None,
+):
     """Cache decorator based on functools.lru_cache.
 
-    This is not a very good cache, but it "works" for our
-    purposes.
+    Results are kept in a local LRU cache. If `local` is False,
+    results are also cached in a Redis database (bot.data.database),
+    which is checked when an item isn't in the local cache.
 
-    This (optionally) caches items into a Redis database
-    (bot.data.database). It does not have a max_size but sets
-    key expiration to 90 days. Items are pickled before storing
-    into the database.
+    `maxsize` limits the number of items in the local cache, and `ttl`
+    expires local items after that many seconds. By default the local
+    cache is unbounded without an expiration in local mode, and holds
+    128 items for 10 minutes in front of Redis so other processes'
+    changes are picked up. A `maxsize` of 0 disables the local cache.
 
-    Cache keys are based on a sha1 hash. Currently, only strings
-    and integers are supported and it will not tell the difference
-    between a string and an integer with the same value.
+    Items in Redis expire after `redis_ttl` seconds, 90 days by default,
+    and are serialized with `codec` before storing into the database.
+    Only strings and integers are supported as keys in Redis, and they
+    are hashed with sha1.
 
-    If multiple functions with the same name are used, colisions
-    will occur.
+    If the function raises a `GenericError` with a code in `negative`,
+    the error is cached for `NEGATIVE_CACHE_TTL` seconds and raised again
+    on later calls, so lookups that failed aren't repeated upstream.
+    Results that `is_negative` returns True for are also only cached
+    for `NEGATIVE_CACHE_TTL` seconds.
+
+    Cache keys include the type of the argument, so `1` and `"1"`
+    are cached separately. If multiple functions with the same name
+    are cached in Redis, colisions will occur.
 
     In addition, results are only cached by the first positional
     argument. If pre is provided, the cache key will be the
     first positional argument transformed by pre.
     """
+    if not local:
+        maxsize = 128 if maxsize is None else maxsize
+        ttl = 600 if ttl is None else ttl
 
     def wrapper(func):
-        _cache = {}
+        _cache = collections.OrderedDict()
         sentinel = object()
-        hits = misses = 0
+        stats = collections.Counter()
+        negative_ttl = min(ttl or NEGATIVE_CACHE_TTL, NEGATIVE_CACHE_TTL)
 
-        def _cache_store(key, value):
-            if local:
-                _cache[key] = value
+        def _local_store(key, value, local_ttl=ttl):
+            if maxsize == 0:
                 return
-            pickled = pickle.dumps(value, protocol=4)
-            database.set(
-                f"cache.{func.__name__}:{key}", pickled, ex=7776000
-            )  # 60*60*24*90
-
-        def _cache_get(key, default=None):
-            if local:
-                return _cache.get(key, default)
-            data = database.get(f"cache.{func.__name__}:{key}")
+            expires = time.monotonic() + local_ttl if local_ttl else None
+            _cache[key] = (expires, value)
+            _cache.move_to_end(key)
+            if maxsize is not None and len(_cache) > maxsize:
+                _cache.popitem(last=False)
+
+        def _local_get(key, default=None):
+            expires, value = _cache.get(key, (None, sentinel))
+            if value is sentinel:
+                return default
+            if expires is not None and expires < time.monotonic():
+                del _cache[key]
+                return default
+            _cache.move_to_end(key)
+            return value
+
+        def _redis_key(item):
+            if not isinstance(item, (str, int)):
+                raise TypeError(
+                    "cache is only available with strings or ints in non-local mode!"
+                )
+            # strings are hashed without a prefix to keep existing keys
+            typed = item if isinstance(item, str) else f"{type(item).__name__}:{item}"
+            return f"cache.{func.__name__}:{hashlib.sha1(typed.encode()).hexdigest()}"
+
+        prefix = _codec_prefix(codec)
+
+        def _ttls(value):
+            """Returns the local and Redis ttl for a result."""
+            if is_negative is not None and is_negative(value):
+                return negative_ttl, min(redis_ttl, NEGATIVE_CACHE_TTL)
+            return ttl, redis_ttl
+
+        async def _redis_store(item, value):
+            data = prefix + codec.dumps(value)
+            await async_database.set(_redis_key(item), data, ex=_ttls(value)[1])
+
+        async def _redis_store_error(item, error):
+            data = NEGATIVE_PREFIX + orjson.dumps([error.code, str(error)])
+            await async_database.set(_redis_key(item), data, ex=NEGATIVE_CACHE_TTL)
+
+        async def _redis_get(item, default=None):
+            data = await async_database.get(_redis_key(item))
             if data is None:
                 return default
-            return pickle.loads(data)
+            if data.startswith(NEGATIVE_PREFIX):
+                code, message = orjson.loads(data[len(NEGATIVE_PREFIX) :])
+                return GenericError(message, code=code)
+            if not data.startswith(prefix):
+                return default
+            return codec.loads(data[len(prefix) :])
+
+        def _raise_cached(error):
+            # raise a copy so tracebacks don't pile up on the cached error
+            raise GenericError(str(error), code=error.code)
 
-        def _cache_len():
-            if local:
-                return _cache.__len__()
+        def _redis_len():
             return sum(
                 1
                 for _ in database.scan_iter(
@@ -106,43 +223,62 @@ def cache(pre=None, local=True):
                 )
             )
 
-        def _get_hash(item):
-            if local:
-                return hash(item)
-            if not isinstance(item, (str, int)):
-                raise TypeError(
-                    "cache is only available with strings or ints in non-local mode!"
-                )
-            return hashlib.sha1(str(item).encode()).hexdigest()
-
         def evict():
-            """Evicts a random item from the local cache."""
+            """Evicts the least recently used item from the local cache."""
             if not local:
                 raise ValueError("Cannot evict from Redis cache!")
-            _cache.pop(random.choice((*_cache, object())), 0)
+            if _cache:
+                _cache.popitem(last=False)
 
         @functools.wraps(func)
         async def wrapped(*args, **kwds):
-            # Simple caching without ordering or size limit
-            nonlocal hits, misses
-            if pre:
-                key = _get_hash(pre(args[0]))
-            else:
-                key = _get_hash(args[0])
-            result = _cache_get(key, sentinel)
+            item = pre(args[0]) if pre else args[0]
+            key = (type(item), item)
+            result = _local_get(key, sentinel)
             if result is not sentinel:
-                # print("hit")
-                hits += 1
+                stats["local_hits"] += 1
+                if isinstance(result, GenericError):
+                    _raise_cached(result)
                 return result
-            # print("miss")
-            misses += 1
-            result = await func(*args, **kwds)
-            _cache_store(key, result)
+            stats["local_misses"] += 1
+            if not local:
+                result = await _redis_get(item, sentinel)
+                if result is not sentinel:
+                    stats["redis_hits"] += 1
+                    if isinstance(result, GenericError):
+                        _local_store(key, result, negative_ttl)
+                        _raise_cached(result)
+                    _local_store(key, result, _ttls(result)[0])
+                    return result
+                stats["redis_misses"] += 1
+            try:
+                result = await func(*args, **kwds)
+            except GenericError as e:
+                if e.code not in negative:
+                    raise e
+                logger.info(f"caching failed {func.__name__} for {item}: {e}")
+                if not local:
+                    await _redis_store_error(item, e)
+                _local_store(key, e, negative_ttl)
+                raise e
+            if not local:
+                await _redis_store(item, result)
+            _local_store(key, result, _ttls(result)[0])
             return result
 
         def cache_info():
             """Report cache statistics"""
-            return functools._CacheInfo(hits, misses, None, _cache_len())
+            return CacheInfo(
+                stats["local_hits"] + stats["redis_hits"],
+                stats["redis_misses"] if not local else stats["local_misses"],
+                maxsize,
+                len(_cache) if local else _redis_len(),
+                stats["local_hits"],
+                stats["local_misses"],
+                len(_cache),
+                stats["redis_hits"],
+                stats["redis_misses"],
+            )
 
         wrapped.cache_info = cache_info
         wrapped.evict = evict
@@ -214,7 +350,9 @@ async def send_leaderboard(
         page = 1
 
     entry_count = (
-        int(database.zcard(database_key)) if database_key is not None else data.count()
+        int(await async_database.zcard(database_key))
+        if database_key is not None
+        else data.count()
     )
     page = (page * 10) - 10
 
@@ -229,7 +367,7 @@ async def send_leaderboard(
     leaderboard_list = (
         map(
             lambda x: (x[0].decode("utf-8"), x[1]),
-            database.zrevrangebyscore(
+            await async_database.zrevrangebyscore(
                 database_key, "+inf", "-inf", page, items_per_page, True
             ),
         )
@@ -249,26 +387,52 @@ async def send_leaderboard(
     await ctx.send(embed=embed)
 
 
-def build_id_list(
-    user_id: str = None,
-    taxon: Union[list, str] = None,
-    state: Union[list, str] = None,
-    media_type: MediaType = MediaType.IMAGE,
-) -> list:
-    """Generates an ID list based on given arguments
+def _state_roles(state: Union[list, str, None]) -> List[str]:
+    if isinstance(state, str):
+        state = state.split(" ")
+    return state if isinstance(state, list) else []
 
-    - `user_id`: User ID of custom list
-    - `taxon`: taxon string/list
-    - `state`: state string/list
-    - `media`: images/songs
-    """
+
+def _custom_list(user_id: str, state: Union[list, str]) -> List[str]:
+    """Returns the birds in a user's custom list if it is one of the lists."""
+    if (
+        user_id
+        and "CUSTOM" in _state_roles(state)
+        and database.exists(f"custom.list:{user_id}")
+        and not database.exists(f"custom.confirm:{user_id}")
+    ):
+        return [
+            bird.decode("utf-8") for bird in database.smembers(f"custom.list:{user_id}")
+        ]
+    return []
+
+
+async def _custom_list_async(user_id: str, state: Union[list, str]) -> List[str]:
+    """Returns the birds in a user's custom list, using the async database."""
+    if (
+        user_id
+        and "CUSTOM" in _state_roles(state)
+        and await async_database.exists(f"custom.list:{user_id}")
+        and not await async_database.exists(f"custom.confirm:{user_id}")
+    ):
+        return [
+            bird.decode("utf-8")
+            for bird in await async_database.smembers(f"custom.list:{user_id}")
+        ]
+    return []
+
+
+def _build_id_list(
+    custom_list: List[str],
+    taxon: Union[list, str],
+    state: Union[list, str],
+    media_type: MediaType,
+) -> list:
     logger.info("building id list")
     if isinstance(taxon, str):
         taxon = taxon.split(" ")
-    if isinstance(state, str):
-        state = state.split(" ")
 
-    state_roles: List[str] = state if isinstance(state, list) else []
+    state_roles = _state_roles(state)
     if media_type is MediaType.SONG:
         state_list = "songBirds"
         default = songBirds
@@ -278,17 +442,6 @@ def build_id_list(
     else:
         raise GenericError("Invalid media type", code=990)
 
-    custom_list = []
-    if (
-        user_id
-        and "CUSTOM" in state_roles
-        and database.exists(f"custom.list:{user_id}")
-        and not database.exists(f"custom.confirm:{user_id}")
-    ):
-        custom_list = [
-            bird.decode("utf-8") for bird in database.smembers(f"custom.list:{user_id}")
-        ]
-
     birds = []
     if taxon:
         birds_in_taxon = set(
@@ -317,6 +470,37 @@ def build_id_list(
     return birds
 
 
+def build_id_list(
+    user_id: str = None,
+    taxon: Union[list, str] = None,
+    state: Union[list, str] = None,
+    media_type: MediaType = MediaType.IMAGE,
+) -> list:
+    """Generates an ID list based on given arguments
+
+    This reads custom lists with the sync database, so use
+    `build_id_list_async` in coroutines.
+
+    - `user_id`: User ID of custom list
+    - `taxon`: taxon string/list
+    - `state`: state string/list
+    - `media`: images/songs
+    """
+    return _build_id_list(_custom_list(user_id, state), taxon, state, media_type)
+
+
+async def build_id_list_async(
+    user_id: str = None,
+    taxon: Union[list, str] = None,
+    state: Union[list, str] = None,
+    media_type: MediaType = MediaType.IMAGE,
+) -> list:
+    """Generates an ID list like `build_id_list`, using the async database."""
+    return _build_id_list(
+        await _custom_list_async(user_id, state), taxon, state, media_type
+    )
+
+
 async def drone_attack(ctx):
     logger.info(f"holiday check: invoked command: {str(ctx.command)}")
 
@@ -494,12 +678,14 @@ def backup_all():
 
 async def get_all_users(bot):
     logger.info("Starting user cache")
-    user_ids = map(int, database.zrangebyscore("users:global", "-inf", "+inf"))
+    user_ids = map(
+        int, await async_database.zrangebyscore("users:global", "-inf", "+inf")
+    )
     for user_id in user_ids:
         user = await fetch_get_user(user_id, bot=bot, member=False)
         if user:
             for guild in user.mutual_guilds:
-                database.sadd(f"users.server.id:{guild.id}", str(user.id))
+                await async_database.sadd(f"users.server.id:{guild.id}", str(user.id))
     logger.info("User cache finished")
 
 
@@ -583,7 +769,7 @@ class CustomCooldown:
         race_per = 0.5  # pin check cooldown during races to 0.5 seconds
         rate_limit_per = (
             per * 1.75
-        )  # 75% longer cooldowns on core commands during macaulay issues
+        )  # 75% longer cooldowns on core commands during macaulay/ebird issues
 
         self.default_mapping = commands.CooldownMapping.from_cooldown(rate, per, bucket)
         self.dm_mapping = commands.CooldownMapping.from_cooldown(rate, dm_per, bucket)
@@ -604,8 +790,11 @@ class CustomCooldown:
                 "check",
                 "skip",
             )
-            and database.exists("cooldown:global")
-            and int(database.get("cooldown:global")) > 1
+            # these get media from Macaulay and names from eBird
+            and any(
+                breaker.state is not CircuitState.CLOSED
+                for breaker in (macaulay, ebird)
+            )
         ):
             bucket = self.rate_limit_mapping.get_bucket(ctx.message)
 
@@ -738,7 +927,7 @@ async def handle_error(ctx, error):
     elif isinstance(error, commands.CommandInvokeError):
         if isinstance(error.original, redis.exceptions.ResponseError):
             capture_exception(error.original)
-            if database.exists(f"channel:{ctx.channel.id}"):
+            if await async_database.exists(f"channel:{ctx.channel.id}"):
                 await ctx.send(
                     "**An unexpected ResponseError has occurred.**\n"
                     + "*Please log this message in #support in the support server below, or try again.*\n"
@@ -0,0 +1,100 @@
+# hot_cache.py | in-memory cache of frequently sent media
+# Copyright (C) 2019-2021  EraserBird, person_v1.32, hmmm
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import collections
+import os
+import threading
+from typing import Optional
+
+# memory limit for cached media, set to 0 to disable
+HOT_CACHE_BYTES = int(os.getenv("SCIOLY_ID_BOT_HOT_CACHE_BYTES", "67108864"))
+HOT_CACHE_MAX_ITEM = 8  # files larger than 1/8 of the limit aren't cached
+
+
+class HotMediaCache:
+    """Keeps the bytes of recently sent media files in memory.
+
+    Files are keyed by their path in the media cache and evicted least
+    recently used first once `max_bytes` is exceeded. Call `invalidate` or
+    `invalidate_directory` when files are rewritten, quarantined, or deleted,
+    so removed media isn't sent. `load` reads from disk, so run it in an executor.
+    """
+
+    def __init__(self, max_bytes: int = HOT_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = self.misses = 0
+        self._items: collections.OrderedDict = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path: str) -> Optional[bytes]:
+        with self._lock:
+            data = self._items.get(path)
+            if data is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(path)
+            self.hits += 1
+            return data
+
+    def put(self, path: str, data: bytes):
+        if len(data) > self.max_bytes / HOT_CACHE_MAX_ITEM:
+            return
+        with self._lock:
+            old = self._items.pop(path, None)
+            if old is not None:
+                self.size -= len(old)
+            self._items[path] = data
+            self.size += len(data)
+            while self.size > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self.size -= len(evicted)
+
+    def load(self, path: str) -> bytes:
+        """Returns the bytes of a file, reading it from disk if it isn't cached.
+
+        This doesn't count a hit or miss, since callers check `get` first.
+        """
+        with self._lock:
+            data = self._items.get(path)
+        if data is None:
+            with open(path, "rb") as f:
+                data = f.read()
+            self.put(path, data)
+        return data
+
+    def invalidate(self, path: str):
+        with self._lock:
+            data = self._items.pop(path, None)
+            if data is not None:
+                self.size -= len(data)
+
+    def invalidate_directory(self, directory: str):
+        """Removes every cached file in a directory, like a deleted cache item."""
+        with self._lock:
+            for path in [path for path in self._items if path.startswith(directory)]:
+                self.size -= len(self._items.pop(path))
+
+    def stats(self) -> dict:
+        return {
+            "items": len(self._items),
+            "bytes": self.size,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+hot_cache = HotMediaCache()
@@ -0,0 +1,114 @@
+# http_client.py | shared http client session
+# Copyright (C) 2019-2021  EraserBird, person_v1.32, hmmm
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import asyncio
+import os
+from typing import Optional
+
+import aiohttp
+
+from bot.breaker import macaulay
+from bot.data import GenericError, async_database, logger, upstream_url
+
+LOGIN_URL = upstream_url("https://search.macaulaylibrary.org/login?path=/catalog")
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/98.0.4758.82 Safari/537.36"
+
+# connection pool limits
+CONNECTION_LIMIT = int(os.getenv("SCIOLY_ID_BOT_HTTP_CONNECTIONS", "100"))
+CONNECTION_LIMIT_PER_HOST = int(
+    os.getenv("SCIOLY_ID_BOT_HTTP_CONNECTIONS_PER_HOST", "10")
+)
+DNS_CACHE_TTL = 300  # seconds
+KEEPALIVE_TIMEOUT = 30  # seconds
+COOKIE_EXPIRE = 60 * 60 * 24 * 5  # 5 days
+
+
+class HTTPClient:
+    """Manages a long-lived aiohttp session for Macaulay/eBird requests.
+
+    The session keeps connections alive between requests and holds the
+    Macaulay login cookies, which are refreshed every `COOKIE_EXPIRE` seconds
+    or after `clear_cookies()` is called.
+
+    Call `start()` at startup and `close()` at shutdown. If the session
+    isn't running in the current event loop (like in scripts or tests),
+    `session()` will start a new one.
+    """
+
+    def __init__(self):
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._cookies_fresh = False
+
+    def _running(self) -> bool:
+        return (
+            self._session is not None
+            and not self._session.closed
+            and self._loop is asyncio.get_running_loop()
+        )
+
+    async def start(self):
+        if self._running():
+            return
+        logger.info("starting http client session")
+        connector = aiohttp.TCPConnector(
+            limit=CONNECTION_LIMIT,
+            limit_per_host=CONNECTION_LIMIT_PER_HOST,
+            ttl_dns_cache=DNS_CACHE_TTL,
+            keepalive_timeout=KEEPALIVE_TIMEOUT,
+        )
+        self._session = aiohttp.ClientSession(connector=connector)
+        self._loop = asyncio.get_running_loop()
+        self._cookies_fresh = False
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            logger.info("closing http client session")
+            await self._session.close()
+        self._session = None
+        self._loop = None
+
+    async def session(self) -> aiohttp.ClientSession:
+        """Returns the shared session, with fresh Macaulay cookies."""
+        if not self._running():
+            await self.start()
+        if (
+            not self._cookies_fresh
+            or await async_database.get("cookies.expired:global") is None
+        ):
+            await self._refresh_cookies()
+        return self._session
+
+    async def _refresh_cookies(self):
+        await async_database.set("cookies.expired:global", "false", ex=COOKIE_EXPIRE)
+        self._cookies_fresh = True
+        self._session.cookie_jar.clear()
+        try:
+            async with macaulay.request(
+                self._session, "HEAD", LOGIN_URL, headers={"User-Agent": USER_AGENT}
+            ) as response:
+                logger.info(f"refreshed cookies: status {response.status}")
+        except GenericError as e:
+            # try again next time, so eBird requests aren't blocked
+            logger.info(f"skipped refreshing cookies: {e}")
+            self._cookies_fresh = False
+
+    def clear_cookies(self):
+        """Refreshes cookies before the next request."""
+        self._cookies_fresh = False
+
+
+http_client = HTTPClient()
@@ -0,0 +1,346 @@
+# manifest.py | media cache manifest functions
+# Copyright (C) 2019-2021  EraserBird, person_v1.32, hmmm
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import collections
+import contextlib
+import os
+import re
+import shutil
+import tempfile
+import time
+from typing import Iterable, List, Optional
+
+import orjson
+
+from bot.data import async_database, database, logger
+from bot.filters import Filter, MediaType
+from bot.hot_cache import hot_cache
+
+CACHE_DIR = "bot_files/cache"
+
+# suffix of in-progress downloads, which are renamed when complete
+TEMP_SUFFIX = ".part"
+STALE_TEMP_AGE = 60 * 60  # remove temp files from interrupted downloads after an hour
+
+# `variants` maps variant names to `(path, size)`, like `{"bw": (path, size)}`
+# `sanitized` is True if spoilers have been removed from the file's metadata
+ManifestEntry = collections.namedtuple(
+    "ManifestEntry",
+    [
+        "asset_id",
+        "path",
+        "extension",
+        "size",
+        "content_type",
+        "downloaded",
+        "variants",
+        "sanitized",
+    ],
+    defaults=(None, False),
+)
+
+
+# matches cache item names, `{type}/{sciname}{filter}`
+ITEM_REGEX = re.compile(r"^(images|songs)/(.+?)(\d+)$")
+
+
+def cache_item(bird: str, media_type: MediaType, filters: Filter) -> str:
+    """Returns the cache item name for a bird, media type, and filter.
+
+    This is the same format used by `frequency.media:global`,
+    `{type}/{sciname}{filter}`. Only filters that change what is
+    fetched are included (`Filter.fetch_int()`), so presentation-only
+    filters like black & white share the same media.
+    """
+    return f"{media_type.name()}/{bird}{filters.fetch_int()}"
+
+
+def cache_directory(item: str) -> str:
+    """Returns the relative path to the cache directory of an item."""
+    return f"{CACHE_DIR}/{item}/"
+
+
+def content_type_for(extension: str) -> Optional[str]:
+    """Returns the content type for a file extension."""
+    for media in MediaType:
+        for content, ext in media.types().items():
+            if ext == extension:
+                return content
+    return None
+
+
+def get_entries(item: str) -> List[ManifestEntry]:
+    """Returns the manifest entries of a cache item, sorted by asset id.
+
+    An empty list means the item is not in the manifest.
+    """
+    return _parse_entries(database.hgetall(f"media.manifest:{item}"))
+
+
+async def get_entries_async(item: str) -> List[ManifestEntry]:
+    """Like `get_entries`, but without blocking the event loop."""
+    return _parse_entries(await async_database.hgetall(f"media.manifest:{item}"))
+
+
+def _parse_entries(data: dict) -> List[ManifestEntry]:
+    return sorted(
+        (ManifestEntry(**orjson.loads(value)) for value in data.values()),
+        key=lambda entry: entry.asset_id,
+    )
+
+
+def _entry_size(data: dict) -> int:
+    """Returns the size of a serialized entry, including variants."""
+    return data["size"] + sum(size for _, size in (data.get("variants") or {}).values())
+
+
+def _store_size(item: str):
+    """Updates the total size of a cache item in `media.bytes:global`."""
+    size = sum(
+        _entry_size(orjson.loads(value))
+        for value in database.hvals(f"media.manifest:{item}")
+    )
+    if size:
+        database.zadd("media.bytes:global", {item: size})
+    else:
+        database.zrem("media.bytes:global", item)
+
+
+def add_entries(item: str, entries: Iterable[ManifestEntry]):
+    """Adds entries to the manifest of a cache item."""
+    mapping = {entry.asset_id: orjson.dumps(entry._asdict()) for entry in entries}
+    if mapping:
+        database.hset(f"media.manifest:{item}", mapping=mapping)
+        _store_size(item)
+
+
+def remove_entries(item: str, asset_ids: Iterable[str]):
+    """Removes entries from the manifest of a cache item."""
+    asset_ids = list(asset_ids)
+    if asset_ids:
+        database.hdel(f"media.manifest:{item}", *asset_ids)
+        _store_size(item)
+
+
+def item_from_path(path: str) -> str:
+    """Returns the cache item name of a file in the media cache."""
+    return os.path.dirname(os.path.relpath(path, CACHE_DIR))
+
+
+def variant_path(entry: ManifestEntry, name: str, extension: str) -> str:
+    """Returns the path to store a variant of an entry.
+
+    Variants are stored next to the original as `{asset_id}.{name}.{extension}`.
+    """
+    return f"{os.path.dirname(entry.path)}/{entry.asset_id}.{name}.{extension}"
+
+
+def get_variant(entry: ManifestEntry, name: str) -> Optional[str]:
+    """Returns the path to a variant of an entry, or None if it doesn't exist."""
+    if entry.variants and name in entry.variants:
+        path = entry.variants[name][0]
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def add_variant(entry: ManifestEntry, name: str, path: str) -> ManifestEntry:
+    """Adds a variant to the manifest entry, returning the updated entry."""
+    variants = dict(entry.variants or {})
+    variants[name] = (path, os.stat(path).st_size)
+    entry = entry._replace(variants=variants)
+    add_entries(item_from_path(entry.path), [entry])
+    return entry
+
+
+def write_atomic(path: str, data: bytes):
+    """Writes a file to the media cache through a temp file."""
+    fd, temp_path = tempfile.mkstemp(suffix=TEMP_SUFFIX, dir=os.path.dirname(path))
+    try:
+        with os.fdopen(fd, "wb") as out_file:
+            out_file.write(data)
+            out_file.flush()
+            os.fsync(out_file.fileno())
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, path)
+    finally:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(temp_path)
+
+
+def delete_item(item: str):
+    """Removes a cache item from the manifest."""
+    database.delete(f"media.manifest:{item}")
+    database.zrem("media.bytes:global", item)
+    database.zrem("media.access:global", item)
+
+
+async def touch(item: str):
+    """Records an access of a cache item for eviction."""
+    await async_database.zadd("media.access:global", {item: int(time.time())})
+
+
+def total_size() -> int:
+    """Returns the total size of the media cache in bytes."""
+    return int(
+        sum(
+            size
+            for _, size in database.zrange("media.bytes:global", 0, -1, withscores=True)
+        )
+    )
+
+
+def entry_from_path(path: str) -> Optional[ManifestEntry]:
+    """Builds a manifest entry from a file on disk.
+
+    Returns None if the file doesn't have a valid media extension.
+    """
+    filename = os.path.basename(path)
+    asset_id, _, extension = filename.partition(".")
+    content_type = content_type_for(extension)
+    if content_type is None:
+        return None
+    stat_info = os.stat(path)
+    return ManifestEntry(
+        asset_id,
+        path,
+        extension,
+        stat_info.st_size,
+        content_type,
+        int(stat_info.st_mtime),
+    )
+
+
+def _remove_stale_temp(path: str):
+    """Removes a temp file left behind by an interrupted download."""
+    with contextlib.suppress(FileNotFoundError):
+        if time.time() - os.stat(path).st_mtime > STALE_TEMP_AGE:
+            os.remove(path)
+            logger.info(f"removed stale temp file {path}")
+
+
+def scan_directory(item: str) -> List[ManifestEntry]:
+    """Rebuilds the manifest of a cache item from disk.
+
+    Returns the entries found, which is an empty list
+    if the directory doesn't exist or is empty.
+    """
+    directory = cache_directory(item)
+    entries = []
+    variants = collections.defaultdict(dict)
+    with contextlib.suppress(FileNotFoundError):
+        for filename in os.listdir(directory):
+            path = f"{directory}{filename}"
+            if filename.endswith(TEMP_SUFFIX):
+                _remove_stale_temp(path)
+                continue
+            parts = filename.split(".")
+            if len(parts) == 3:  # variants are `{asset_id}.{name}.{extension}`
+                variants[parts[0]][parts[1]] = (path, os.stat(path).st_size)
+                continue
+            entry = entry_from_path(path)
+            if entry is not None:
+                entries.append(entry)
+    entries = [
+        entry._replace(variants=variants.get(entry.asset_id)) for entry in entries
+    ]
+    database.delete(f"media.manifest:{item}")
+    add_entries(item, entries)
+    if not entries:
+        database.zrem("media.bytes:global", item)
+    return sorted(entries, key=lambda entry: entry.asset_id)
+
+
+def rebuild_manifest():
+    """Rebuilds the entire manifest from the media cache on disk.
+
+    This is slow and blocking, so run it in an executor.
+    Returns a tuple of `(items, entries)` found.
+    """
+    logger.info("Rebuilding media manifest")
+    items = set()
+    for media_type in MediaType:
+        with contextlib.suppress(FileNotFoundError):
+            for directory in os.listdir(f"{CACHE_DIR}/{media_type.name()}"):
+                items.add(f"{media_type.name()}/{directory}")
+
+    for key in database.scan_iter(match="media.manifest:*", count=1000):
+        item = key.decode().split(":", 1)[1]
+        if item not in items:
+            delete_item(item)
+    for key in database.zrange("media.bytes:global", 0, -1):
+        if key.decode() not in items:
+            delete_item(key.decode())
+
+    total = 0
+    for item in items:
+        total += len(scan_directory(item))
+    logger.info(f"Rebuilt manifest with {len(items)} items and {total} entries")
+    return (len(items), total)
+
+
+def _migrate_item(old: str, new: str):
+    """Merges an old cache item into the item with a normalized key."""
+    old_directory = cache_directory(old)
+    new_directory = cache_directory(new)
+    if os.path.exists(new_directory):
+        for filename in os.listdir(old_directory):
+            if not os.path.exists(f"{new_directory}{filename}"):
+                os.replace(f"{old_directory}{filename}", f"{new_directory}{filename}")
+        shutil.rmtree(old_directory, ignore_errors=True)
+    else:
+        os.rename(old_directory, new_directory)
+    hot_cache.invalidate_directory(old_directory)
+
+    frequency = database.zscore("frequency.media:global", old)
+    if frequency:
+        database.zincrby("frequency.media:global", frequency, new)
+    database.zrem("frequency.media:global", old)
+    access = database.zscore("media.access:global", old)
+    if access and access > (database.zscore("media.access:global", new) or 0):
+        database.zadd("media.access:global", {new: access})
+    cursor = database.get(f"media.cursor:{old}")
+    if cursor is not None:
+        database.set(f"media.cursor:{new}", cursor, nx=True)
+        database.delete(f"media.cursor:{old}")
+    delete_item(old)
+    scan_directory(new)
+
+
+def migrate_cache_keys():
+    """Moves cached media to normalized cache item names.
+
+    Cache items used to include presentation-only filters, so this merges
+    items like black & white images into the normal item for the bird.
+    This is slow and blocking, so run it in an executor.
+    Returns the number of items migrated.
+    """
+    logger.info("Migrating media cache keys")
+    migrated = 0
+    for media_type in MediaType:
+        with contextlib.suppress(FileNotFoundError):
+            for directory in os.listdir(f"{CACHE_DIR}/{media_type.name()}"):
+                item = f"{media_type.name()}/{directory}"
+                match = ITEM_REGEX.match(item)
+                if match is None:
+                    continue
+                _, bird, filter_int = match.groups()
+                new = cache_item(bird, media_type, Filter.from_int(int(filter_int)))
+                if new != item:
+                    _migrate_item(item, new)
+                    migrated += 1
+    logger.info(f"Migrated {migrated} cache items")
+    return migrated
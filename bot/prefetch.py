@@ -0,0 +1,271 @@
+# prefetch.py | background media prefetching
+# Copyright (C) 2019-2021  EraserBird, person_v1.32, hmmm
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import asyncio
+import itertools
+import os
+import random
+from typing import List, Optional, Tuple
+
+from sentry_sdk import capture_exception
+
+from bot.breaker import macaulay
+from bot.core import (
+    black_and_white_variant,
+    download_activity,
+    download_media,
+    get_sciname,
+)
+from bot.data import GenericError, database, logger, screech_owls
+from bot.filters import Filter, MediaType
+from bot.functions import build_id_list
+from bot.manifest import (
+    ITEM_REGEX,
+    ManifestEntry,
+    cache_item,
+    get_entries_async,
+    scan_directory,
+)
+from bot.ratelimit import Priority, request_priority
+
+# max number of items (a bird, media type, and filters) to download per planning
+# round, each is a full set of media, failed downloads count too,
+# set to 0 to disable prefetching
+PREFETCH_BUDGET = int(os.getenv("SCIOLY_ID_BOT_PREFETCH_BUDGET", "30"))
+
+POPULAR_COUNT = 25  # number of popular birds/media to consider each round
+LIST_SAMPLE = 8  # number of birds to sample from each race/session list
+
+# priorities, lower numbers are fetched first
+PRIORITY_RACE = 0
+PRIORITY_SESSION = 1
+PRIORITY_POPULAR = 2
+
+PrefetchItem = Tuple[int, str, MediaType, int]
+
+
+def _media_type(media: str) -> MediaType:
+    if media in ("songs", "song", "s", "a"):
+        return MediaType.SONG
+    return MediaType.IMAGE
+
+
+def _list_items(
+    priority: int,
+    media_type: MediaType,
+    filter_int: int,
+    taxon: str,
+    state: str,
+    user_id: Optional[str] = None,
+) -> List[PrefetchItem]:
+    """Samples birds from a race/session list to prefetch."""
+    roles = state.split(" ") if state else []
+    custom_roles = [role for role in roles if role.startswith("CUSTOM:")]
+    if len(custom_roles) == 1:
+        roles.remove(custom_roles[0])
+        roles.append("CUSTOM")
+        user_id = custom_roles[0].split(":")[1]
+    birds = build_id_list(
+        user_id=user_id, taxon=taxon, state=roles, media_type=media_type
+    )
+    birds = random.sample(birds, k=min(LIST_SAMPLE, len(birds)))
+    return [(priority, bird, media_type, filter_int) for bird in birds]
+
+
+def plan_race(channel_id) -> List[PrefetchItem]:
+    """Returns birds to prefetch for a race."""
+    filter_int, taxon, state, media = database.hmget(
+        f"race.data:{channel_id}", ["filter", "taxon", "state", "media"]
+    )
+    if filter_int is None:
+        return []
+    return _list_items(
+        PRIORITY_RACE,
+        _media_type(media.decode("utf-8")),
+        int(filter_int),
+        taxon.decode("utf-8"),
+        state.decode("utf-8"),
+    )
+
+
+def plan_session(user_id) -> List[PrefetchItem]:
+    """Returns birds to prefetch for a session."""
+    filter_int, taxon, state = database.hmget(
+        f"session.data:{user_id}", ["filter", "taxon", "state"]
+    )
+    if filter_int is None:
+        return []
+    return _list_items(
+        PRIORITY_SESSION,
+        MediaType.IMAGE,
+        int(filter_int),
+        (taxon or b"").decode("utf-8"),
+        (state or b"").decode("utf-8"),
+        user_id=str(user_id),
+    )
+
+
+def plan_popular() -> List[PrefetchItem]:
+    """Returns popular birds and media to prefetch."""
+    items = []
+    for item in database.zrevrangebyscore(
+        "frequency.media:global", "+inf", "-inf", start=0, num=POPULAR_COUNT
+    ):
+        match = ITEM_REGEX.match(item.decode("utf-8"))
+        if match is None:
+            continue
+        media, bird, filter_int = match.groups()
+        items.append((PRIORITY_POPULAR, bird, _media_type(media), int(filter_int)))
+    for bird in database.zrevrangebyscore(
+        "frequency.bird:global", "+inf", "-inf", start=0, num=POPULAR_COUNT
+    ):
+        items.append(
+            (PRIORITY_POPULAR, bird.decode("utf-8"), MediaType.IMAGE, Filter().to_int())
+        )
+    return items
+
+
+def plan() -> List[PrefetchItem]:
+    """Returns all birds to prefetch, for races, sessions, and popular birds.
+
+    This scans the database, so run it in an executor.
+    """
+    items = []
+    for key in database.scan_iter(match="race.data:*", count=1000):
+        items += plan_race(key.decode("utf-8").split(":", 1)[1])
+    for key in database.scan_iter(match="session.data:*", count=1000):
+        items += plan_session(key.decode("utf-8").split(":", 1)[1])
+    items += plan_popular()
+    return items
+
+
+class Prefetcher:
+    """Downloads media for likely-next birds in the background.
+
+    Items are fetched in priority order, with at most `budget` download attempts
+    between calls to `refill()`. The worker waits for user-facing downloads
+    to finish before starting each item, so those always go first.
+    """
+
+    def __init__(self, budget: int = PREFETCH_BUDGET):
+        self.budget = budget
+        self.remaining = budget
+        self.queue: asyncio.PriorityQueue = asyncio.PriorityQueue()
+        self._queued = set()
+        self._counter = itertools.count()
+        self._refilled = asyncio.Event()
+        self._worker: Optional[asyncio.Task] = None
+        self.downloaded = self.skipped = self.failed = 0
+
+    def put(self, items: List[PrefetchItem]):
+        """Adds items to the prefetch queue, ignoring duplicates."""
+        if self.budget <= 0:
+            return
+        for priority, bird, media_type, filter_int in items:
+            if bird == "Screech Owl":
+                bird = random.choice(screech_owls)
+            key = (bird, media_type, filter_int)
+            if key in self._queued:
+                continue
+            self._queued.add(key)
+            self.queue.put_nowait((priority, next(self._counter), key))
+
+    def refill(self):
+        """Resets the item budget."""
+        self.remaining = self.budget
+        self._refilled.set()
+
+    def start(self):
+        if self.budget > 0 and (self._worker is None or self._worker.done()):
+            self._worker = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._worker is not None:
+            self._worker.cancel()
+
+    def stats(self) -> dict:
+        return {
+            "queued": self.queue.qsize(),
+            "remaining_budget": self.remaining,
+            "downloaded": self.downloaded,
+            "skipped": self.skipped,
+            "failed": self.failed,
+        }
+
+    async def _run(self):
+        while True:
+            _, _, key = await self.queue.get()
+            self._queued.discard(key)
+            while self.remaining <= 0:
+                self._refilled.clear()
+                await self._refilled.wait()
+            await download_activity.wait_idle()
+            # don't add to the load while Macaulay is having issues
+            while macaulay.is_open:
+                await asyncio.sleep(macaulay.retry_after())
+            # every download attempt uses the budget, even if it fails,
+            # so a failing upstream isn't retried over and over
+            attempted = True
+            try:
+                with request_priority(Priority.PREFETCH):
+                    entries = await self._fetch(*key)
+                if entries is None:
+                    attempted = False
+                    self.skipped += 1
+                elif entries:
+                    self.downloaded += 1
+                else:
+                    logger.info(f"prefetch downloaded no media for {key}")
+                    self.failed += 1
+            except GenericError as e:
+                logger.info(f"prefetch failed for {key}: {e}")
+                self.failed += 1
+            except Exception as e:  # pylint: disable=broad-except
+                logger.exception(e)
+                capture_exception(e)
+                self.failed += 1
+            if attempted:
+                self.remaining -= 1
+
+    @staticmethod
+    async def _fetch(
+        bird: str, media_type: MediaType, filter_int: int
+    ) -> Optional[List[ManifestEntry]]:
+        """Downloads media for a bird if it isn't cached.
+
+        Returns the downloaded manifest entries, or None if the item was cached.
+        """
+        try:
+            sciBird = await get_sciname(bird)
+        except GenericError:
+            sciBird = bird
+        filters = Filter.from_int(filter_int)
+        item = cache_item(sciBird, media_type, filters)
+        loop = asyncio.get_running_loop()
+        if await get_entries_async(item) or await loop.run_in_executor(
+            None, scan_directory, item
+        ):
+            return None
+        logger.info(f"prefetching {item}")
+        entries = await download_media(sciBird, media_type, filters)
+        if media_type is MediaType.IMAGE and filters.bw:
+            loop = asyncio.get_running_loop()
+            for entry in entries:
+                await loop.run_in_executor(None, black_and_white_variant, entry)
+        return entries
+
+
+prefetcher = Prefetcher()
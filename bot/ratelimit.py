@@ -0,0 +1,181 @@
+# ratelimit.py | rate limiting for upstream requests
+# Copyright (C) 2019-2021  EraserBird, person_v1.32, hmmm
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import asyncio
+import collections
+import contextlib
+import contextvars
+import enum
+import hashlib
+import os
+import time
+import urllib.parse
+
+import redis
+
+from bot.data import async_database, logger
+
+# requests per second to each upstream host, shared by all processes
+UPSTREAM_RATE = float(os.getenv("SCIOLY_ID_BOT_UPSTREAM_RATE", "10"))
+# requests that can be made at once after the bucket has filled up
+UPSTREAM_BURST = float(os.getenv("SCIOLY_ID_BOT_UPSTREAM_BURST", "20"))
+
+
+class TokenBucket:
+    """Limits how often something happens, while allowing short bursts.
+
+    Tokens are added at `rate` per second, up to `capacity`.
+    `acquire` takes a token, waiting until one is available. Waiters
+    reserve tokens ahead of time, so they're served in order.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, tokens: float = 1):
+        self._refill()
+        self.tokens -= tokens
+        if self.tokens < 0:
+            await asyncio.sleep(-self.tokens / self.rate)
+
+
+class Priority(enum.IntEnum):
+    INTERACTIVE = 0  # someone is waiting on the result
+    VALIDATION = 1  # checking custom lists
+    PREFETCH = 2  # background downloads and catalog fills
+
+
+# fraction of the bucket that is left for higher priority requests
+PRIORITY_RESERVE = {
+    Priority.INTERACTIVE: 0.0,
+    Priority.VALIDATION: 0.25,
+    Priority.PREFETCH: 0.5,
+}
+
+_priority = contextvars.ContextVar("request_priority", default=Priority.INTERACTIVE)
+
+
+@contextlib.contextmanager
+def request_priority(priority: Priority):
+    """Sets the priority of upstream requests made within the block.
+
+    Tasks created within the block keep the priority.
+    """
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+# Refills and takes tokens atomically, returning seconds to wait if there
+# aren't enough tokens above the reserve for the priority.
+# KEYS: bucket key, ARGV: rate, capacity, reserve, tokens
+TAKE_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local reserve = tonumber(ARGV[3])
+local requested = tonumber(ARGV[4])
+local time = redis.call("TIME")
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local bucket = redis.call("HMGET", KEYS[1], "tokens", "updated")
+local tokens = tonumber(bucket[1]) or capacity
+local updated = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+local wait = 0
+if tokens - requested >= reserve then
+    tokens = tokens - requested
+else
+    wait = (reserve + requested - tokens) / rate
+end
+redis.call("HSET", KEYS[1], "tokens", tokens, "updated", now)
+redis.call("EXPIRE", KEYS[1], math.ceil(capacity / rate) + 1)
+return tostring(wait)
+"""
+
+
+class UpstreamLimiter:
+    """Limits requests to each upstream host across all bot and web processes.
+
+    Each host has a token bucket in Redis (`ratelimit:{host}`). Lower
+    priority requests (see `request_priority`) can't use the last part
+    of the bucket, so they wait while interactive requests go through.
+    Wait times are recorded per priority for this process.
+    """
+
+    def __init__(self, rate: float = UPSTREAM_RATE, capacity: float = UPSTREAM_BURST):
+        self.rate = rate
+        self.capacity = capacity
+        self.waits = collections.defaultdict(collections.Counter)
+        self.max_wait = collections.defaultdict(float)
+        # clients are per event loop, so the script is run by its digest
+        self.script_sha = hashlib.sha1(TAKE_SCRIPT.encode()).hexdigest()
+
+    async def _take(self, host: str, priority: Priority) -> float:
+        args = (
+            f"ratelimit:{host}",
+            self.rate,
+            self.capacity,
+            self.capacity * PRIORITY_RESERVE[priority],
+            1,
+        )
+        try:
+            wait = await async_database.evalsha(self.script_sha, 1, *args)
+        except redis.exceptions.NoScriptError:
+            await async_database.script_load(TAKE_SCRIPT)
+            wait = await async_database.evalsha(self.script_sha, 1, *args)
+        return float(wait)
+
+    async def acquire(self, url: str):
+        """Waits until a request can be made to the host of `url`."""
+        host = urllib.parse.urlsplit(url).netloc
+        priority = _priority.get()
+        # only time spent throttled counts, not the Redis round trips
+        waited = 0.0
+        while (wait := await self._take(host, priority)) > 0:
+            await asyncio.sleep(wait)
+            waited += wait
+
+        stats = self.waits[priority]
+        stats["requests"] += 1
+        if waited > 0:
+            stats["waited"] += 1
+            stats["wait_ms"] += round(waited * 1000)
+            self.max_wait[priority] = max(self.max_wait[priority], waited)
+            if waited > 5:
+                logger.info(f"waited {waited:.1f}s for {host} ({priority.name})")
+
+    def stats(self) -> dict:
+        return {
+            priority.name.lower(): {
+                "requests": stats["requests"],
+                "waited": stats["waited"],
+                "mean_wait_ms": round(stats["wait_ms"] / max(stats["requests"], 1)),
+                "max_wait_ms": round(self.max_wait[priority] * 1000),
+            }
+            for priority, stats in self.waits.items()
+        }
+
+
+upstream_limiter = UpstreamLimiter()
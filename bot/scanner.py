@@ -0,0 +1,201 @@
+# scanner.py | media cache integrity checks
+# Copyright (C) 2019-2021  EraserBird, person_v1.32, hmmm
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import bisect
+import collections
+import contextlib
+import os
+import time
+from typing import List, Optional
+
+import eyed3
+from PIL import Image
+
+from bot.data import database, logger
+from bot.filters import MediaType
+from bot.hot_cache import hot_cache
+from bot.manifest import (
+    CACHE_DIR,
+    STALE_TEMP_AGE,
+    TEMP_SUFFIX,
+    ManifestEntry,
+    add_entries,
+    cache_directory,
+    delete_item,
+    get_entries,
+    remove_entries,
+    scan_directory,
+)
+
+QUARANTINE_DIR = "bot_files/quarantine"
+
+# number of cache items to check each run
+SCAN_BATCH = int(os.getenv("SCIOLY_ID_BOT_SCAN_BATCH", "100"))
+SCAN_FILE_DELAY = 0.01  # seconds to sleep after each file, to limit disk usage
+
+# variants can be formats we don't download
+VARIANT_EXTENSIONS = ("png", "jpg", "webp")
+
+
+def check_file(
+    path: str, media_type: MediaType, variant: bool = False
+) -> Optional[str]:
+    """Checks if a cached file is valid.
+
+    Returns the reason the file is invalid, or None if it is valid.
+    """
+    try:
+        size = os.stat(path).st_size
+    except FileNotFoundError:
+        return "missing file"
+    if size == 0:
+        return "empty file"
+
+    extension = path.rsplit(".", 1)[-1].lower()
+    valid_extensions = (
+        VARIANT_EXTENSIONS if variant else tuple(media_type.types().values())
+    )
+    if extension not in valid_extensions:
+        return f"invalid extension {extension}"
+
+    if media_type is MediaType.IMAGE:
+        try:
+            with Image.open(path) as image:
+                image.verify()
+        except Exception:  # pylint: disable=broad-except
+            return "corrupt image"
+    elif extension == "mp3":
+        try:
+            audio_file = eyed3.load(path)
+        except Exception:  # pylint: disable=broad-except
+            audio_file = None
+        if audio_file is None or audio_file.info is None:
+            return "corrupt song"
+    return None
+
+
+def quarantine(path: str, item: str):
+    """Moves a bad file out of the media cache so it can be inspected later."""
+    directory = f"{QUARANTINE_DIR}/{item}/"
+    os.makedirs(directory, exist_ok=True)
+    hot_cache.invalidate(path)
+    with contextlib.suppress(FileNotFoundError):
+        os.replace(path, f"{directory}{os.path.basename(path)}")
+
+
+def _all_items() -> List[str]:
+    items = []
+    for media_type in MediaType:
+        with contextlib.suppress(FileNotFoundError):
+            items.extend(
+                f"{media_type.name()}/{directory}"
+                for directory in os.listdir(f"{CACHE_DIR}/{media_type.name()}")
+            )
+    return sorted(items)
+
+
+class IntegrityScanner:
+    """Checks cached media a few items at a time.
+
+    Bad files are moved to `QUARANTINE_DIR` and removed from the manifest,
+    and empty cache directories are removed. Each run continues from the
+    item after the last one checked (`media.scan:position`).
+    """
+
+    def __init__(self, batch: int = SCAN_BATCH):
+        self.batch = batch
+        self.stats = collections.Counter()
+
+    def _check_entry(self, item: str, media_type: MediaType, entry: ManifestEntry):
+        """Checks a manifest entry and its variants, returning the valid entry or None."""
+        self.stats["files"] += 1
+        reason = check_file(entry.path, media_type)
+        time.sleep(SCAN_FILE_DELAY)
+        if reason is not None:
+            logger.info(f"quarantining {entry.path}: {reason}")
+            self.stats[reason] += 1
+            self.stats["quarantined"] += 1
+            quarantine(entry.path, item)
+            for path, _ in (entry.variants or {}).values():
+                hot_cache.invalidate(path)
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(path)
+            return None
+
+        variants = dict(entry.variants or {})
+        for name, (path, _) in list(variants.items()):
+            reason = check_file(path, MediaType.IMAGE, variant=True)
+            if reason is not None:
+                logger.info(f"removing variant {path}: {reason}")
+                self.stats["bad_variants"] += 1
+                hot_cache.invalidate(path)
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(path)
+                del variants[name]
+        if variants != (entry.variants or {}):
+            entry = entry._replace(variants=variants or None)
+            add_entries(item, [entry])
+        return entry
+
+    def scan_item(self, item: str):
+        """Checks the files of a cache item."""
+        directory = cache_directory(item)
+        media_type = MediaType.IMAGE if item.startswith("images/") else MediaType.SONG
+        self.stats["items"] += 1
+
+        entries = get_entries(item) or scan_directory(item)
+        bad = [
+            entry.asset_id
+            for entry in entries
+            if self._check_entry(item, media_type, entry) is None
+        ]
+        remove_entries(item, bad)
+
+        with contextlib.suppress(FileNotFoundError):
+            # skip new directories, which may have a download starting
+            recent = time.time() - os.stat(directory).st_mtime < STALE_TEMP_AGE
+            if not recent and not [
+                filename
+                for filename in os.listdir(directory)
+                if not filename.endswith(TEMP_SUFFIX)
+            ]:
+                logger.info(f"removing empty cache directory {directory}")
+                self.stats["empty_directories"] += 1
+                delete_item(item)
+                with contextlib.suppress(OSError):
+                    os.rmdir(directory)
+
+    def run(self) -> dict:
+        """Checks the next batch of cache items.
+
+        This is slow and blocking, so run it in an executor.
+        Returns the total stats.
+        """
+        items = _all_items()
+        position = (database.get("media.scan:position") or b"").decode()
+        start = bisect.bisect_right(items, position)
+        batch = items[start : start + self.batch]
+        logger.info(f"scanning {len(batch)} cache items after '{position}'")
+        for item in batch:
+            self.scan_item(item)
+        # start over once the end of the cache is reached
+        position = batch[-1] if len(batch) == self.batch else ""
+        database.set("media.scan:position", position)
+        logger.info(f"cache scan stats: {dict(self.stats)}")
+        return dict(self.stats)
+
+
+scanner = IntegrityScanner()
@@ -0,0 +1,121 @@
+# spellcheck.py | fast fuzzy matching against bird names
+# Copyright (C) 2019-2021  EraserBird, person_v1.32, hmmm
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import collections
+import difflib
+from typing import Iterable, Optional, Tuple
+
+import numpy as np
+
+from bot.data import birdListMaster, sciListMaster
+
+SPELLCHECK_CUTOFF = 2 / 3
+
+
+class SpellcheckIndex:
+    """A fixed set of lowercase names for finding the closest match to a word.
+
+    Matches are the same as `difflib.get_close_matches(word, names, n=1)`,
+    but most names are ruled out before running `SequenceMatcher`:
+
+    - Matches can't be more than the shared characters of the two strings
+      (`SequenceMatcher.quick_ratio`), found for every name at once from a
+      matrix of character counts.
+    - Matches are also a common subsequence, so they can't be more than the
+      longest common subsequence, found with a bit-parallel algorithm
+      (Hyyrö 2004) across the remaining names.
+    """
+
+    def __init__(self, names: Iterable[str]):
+        self.names = tuple(sorted({name.lower() for name in names}))
+        self.name_set = frozenset(self.names)
+        self.chars = {
+            char: i for i, char in enumerate(sorted(set("".join(self.names))))
+        }
+        self.lengths = np.array([len(name) for name in self.names], dtype=np.int64)
+        self.counts = np.zeros((len(self.names), len(self.chars)), dtype=np.uint8)
+        # padded with a column that never matches
+        self.codes = np.full(
+            (len(self.names), max(self.lengths, default=0)),
+            len(self.chars),
+            dtype=np.int64,
+        )
+        for row, name in enumerate(self.names):
+            for i, char in enumerate(name):
+                self.counts[row, self.chars[char]] += 1
+                self.codes[row, i] = self.chars[char]
+
+    def __contains__(self, name: str) -> bool:
+        return name.lower() in self.name_set
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def _lcs(self, rows: np.ndarray, word: str) -> np.ndarray:
+        """Returns the length of the longest common subsequence of `word` and each name."""
+        masks = np.zeros(len(self.chars) + 1, dtype=np.uint64)
+        for i, char in enumerate(word):
+            column = self.chars.get(char)
+            if column is not None:
+                masks[column] |= np.uint64(1 << i)
+        codes = self.codes[rows, : self.lengths[rows].max()]
+        # zero bits of v are matched positions in word, overflow is intended
+        v = np.full(len(rows), np.iinfo(np.uint64).max, dtype=np.uint64)
+        for column in codes.T:
+            u = v & masks[column]
+            v = (v + u) | (v - u)
+        unmatched = np.unpackbits((v & np.uint64((1 << len(word)) - 1)).view(np.uint8))
+        return len(word) - unmatched.reshape(len(rows), 64).sum(axis=1, dtype=np.int64)
+
+    def candidates(self, word: str, cutoff: float = SPELLCHECK_CUTOFF) -> Tuple[str]:
+        """Returns names that might be at least `cutoff` similar to `word`."""
+        columns = collections.Counter(
+            self.chars[char] for char in word if char in self.chars
+        )
+        # the same arithmetic as SequenceMatcher, so no matches are excluded
+        shared = np.minimum(
+            self.counts[:, list(columns)],
+            np.array(list(columns.values())).clip(max=255).astype(np.uint8),
+        ).sum(axis=1, dtype=np.int64)
+        rows = np.flatnonzero(2.0 * shared / (self.lengths + len(word)) >= cutoff)
+        if rows.size and len(word) <= 64:
+            lcs = self._lcs(rows, word)
+            rows = rows[2.0 * lcs / (self.lengths[rows] + len(word)) >= cutoff]
+        return tuple(self.names[i] for i in rows)
+
+    def closest(
+        self, word: str, extra: Iterable[str] = (), cutoff: float = SPELLCHECK_CUTOFF
+    ) -> Optional[str]:
+        """Returns the closest lowercase name to `word`, or None if none are close enough.
+
+        `extra` names are compared along with the names in the index.
+        """
+        word = word.lower()
+        matcher = difflib.SequenceMatcher()
+        matcher.set_seq2(word)
+        best = None
+        for name in (*self.candidates(word, cutoff), *map(str.lower, extra)):
+            matcher.set_seq1(name)
+            if matcher.real_quick_ratio() < cutoff or matcher.quick_ratio() < cutoff:
+                continue
+            ratio = matcher.ratio()
+            # get_close_matches breaks ties with the larger string
+            if ratio >= cutoff and (best is None or (ratio, name) > best):
+                best = (ratio, name)
+        return best[1] if best else None
+
+
+bird_index = SpellcheckIndex(birdListMaster + sciListMaster)
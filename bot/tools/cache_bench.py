@@ -0,0 +1,87 @@
+# cache_bench.py | compare serializers for the Redis cache
+# Copyright (C) 2019-2021  EraserBird, person_v1.32, hmmm
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Benchmarks the cache codecs on values like the ones we cache.
+
+Usage: python -m bot.tools.cache_bench [--rounds 20]
+
+Values are built from the bird lists: scientific names (`get_sciname`)
+and (species code, title) tuples (`get_taxon`). Redis isn't used.
+"""
+
+import argparse
+import time
+
+from bot.data import birdListMaster, sciListMaster
+from bot.functions import ORJSON_CODEC, PICKLE_CODEC, _codec_prefix
+
+
+def sample_values() -> dict:
+    return {
+        "sciname": list(sciListMaster),
+        "taxon": [
+            (bird.lower().replace(" ", "")[:6], f"{bird} - {sci}")
+            for bird, sci in zip(birdListMaster, sciListMaster)
+        ],
+    }
+
+
+def bench(codec, values: list, rounds: int) -> tuple:
+    """Returns encode and decode time per entry in microseconds, and bytes per entry."""
+    prefix = _codec_prefix(codec)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        encoded = [prefix + codec.dumps(value) for value in values]
+    encode_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        decoded = [codec.loads(data[len(prefix) :]) for data in encoded]
+    decode_time = time.perf_counter() - start
+    if decoded != values:
+        raise ValueError(f"{codec.name} didn't round trip")
+
+    count = rounds * len(values)
+    return (
+        encode_time / count * 1e6,
+        decode_time / count * 1e6,
+        sum(map(len, encoded)) / len(values),
+    )
+
+
+def parse_args(args=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m bot.tools.cache_bench",
+        description="Compare serializers for the Redis cache.",
+    )
+    parser.add_argument(
+        "--rounds", type=int, default=20, help="times to encode each value"
+    )
+    return parser.parse_args(args)
+
+
+def main(args: argparse.Namespace):
+    print(f"{'values':<10}{'codec':<10}{'encode us':>12}{'decode us':>12}{'bytes':>10}")
+    for name, values in sample_values().items():
+        for codec in (PICKLE_CODEC, ORJSON_CODEC):
+            encode, decode, size = bench(codec, values, args.rounds)
+            print(
+                f"{name:<10}{codec.name:<10}{encode:>12.2f}{decode:>12.2f}{size:>10.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main(parse_args())
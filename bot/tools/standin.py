@@ -0,0 +1,252 @@
+# standin.py | local stand-in for the Macaulay Library and eBird APIs
+# Copyright (C) 2019-2021  EraserBird, person_v1.32, hmmm
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Serves fake taxonomy, catalog, and asset endpoints for benchmarks and tests.
+
+Usage: python -m bot.tools.standin [--port 8081] [--latency 50] [--jitter 25]
+       [--error-rate 0.05] [--processing-rate 0.02] [--assets 120]
+
+Then start the bot with `SCIOLY_ID_BOT_UPSTREAM_URL=http://127.0.0.1:8081`
+to send every Macaulay/eBird request here. Request counts are at `/_standin/stats`.
+
+Birds in `fixtures/taxonomy.json` get their real codes and names, and
+any other bird gets a made up code. Each taxon has `--assets` assets per
+media type, served as generated JPEGs and silent MP3s. Asset pages
+(for `b!asset`) work for assets returned by the catalog.
+
+This doesn't import the rest of the bot, so it can be started before
+`SCIOLY_ID_BOT_UPSTREAM_URL` is read.
+"""
+
+import argparse
+import asyncio
+import collections
+import dataclasses
+import functools
+import io
+import json
+import os
+import random
+import re
+import zlib
+
+from aiohttp import web
+from PIL import Image
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "taxonomy.json")
+
+# a silent MPEG-1 layer 3 frame, 128kbps 44.1khz
+MP3_FRAME = b"\xff\xfb\x90\x64" + bytes(413)
+MP3_FRAMES = 200  # about 5 seconds
+
+
+@dataclasses.dataclass
+class StandinConfig:
+    latency: float = 0.0  # milliseconds added to each response
+    jitter: float = 0.0  # up to this many more milliseconds, at random
+    error_rate: float = 0.0  # fraction of responses that are 503s
+    processing_rate: float = 0.0  # fraction of asset responses that are 476s
+    assets: int = 120  # assets per taxon and media type
+    seed: int = None
+
+
+class Taxonomy:
+    """Looks up species by name or code, making up entries for unknown birds."""
+
+    def __init__(self, path: str = FIXTURES):
+        with open(path, "r") as f:
+            entries = json.load(f)
+        self.by_code = {entry["speciesCode"]: entry for entry in entries}
+        self.by_name = {}
+        for entry in entries:
+            self.by_name[self._key(entry["comName"])] = entry
+            self.by_name[self._key(entry["sciName"])] = entry
+
+    @staticmethod
+    def _key(name: str) -> str:
+        return re.sub(r"[^a-z ]", "", name.lower().replace("-", " ")).strip()
+
+    def lookup(self, name: str) -> dict:
+        key = self._key(name)
+        entry = self.by_name.get(key)
+        if entry is None:
+            words = key.split() or ["unknown"]
+            code = f"{words[0][:3]}{words[-1][:3]}{zlib.crc32(key.encode()) % 100}"
+            entry = {
+                "speciesCode": code,
+                "comName": name.strip().title(),
+                "sciName": f"Standin {code}",
+            }
+            self.by_code[code] = entry
+            self.by_name[key] = entry
+        return entry
+
+
+@functools.lru_cache(maxsize=64)
+def _image(shade: int, width: int) -> bytes:
+    image = Image.new("RGB", (width, width * 2 // 3), (shade, 128, 255 - shade))
+    buffer = io.BytesIO()
+    image.save(buffer, "jpeg")
+    return buffer.getvalue()
+
+
+def create_app(config: StandinConfig) -> web.Application:
+    rng = random.Random(config.seed)
+    taxonomy = Taxonomy()
+    stats = collections.Counter()
+    catalog_taxa = {}  # asset id // 1000: taxon code, for asset pages
+
+    @web.middleware
+    async def emulate(request, handler):
+        delay = config.latency + rng.uniform(0, config.jitter)
+        if delay:
+            await asyncio.sleep(delay / 1000)
+        if request.path.startswith("/_standin/"):
+            return await handler(request)
+        if rng.random() < config.error_rate:
+            response = web.Response(status=503)
+        else:
+            response = await handler(request)
+        stats[f"{request.path.split('/')[1]} {response.status}"] += 1
+        return response
+
+    async def ebird_taxonomy(request):
+        code = request.query.get("species", "")
+        entry = taxonomy.by_code.get(code)
+        return web.json_response([entry] if entry else [])
+
+    async def macaulay_taxonomy(request):
+        entry = taxonomy.lookup(request.query.get("q", ""))
+        return web.json_response(
+            [
+                {
+                    "code": entry["speciesCode"],
+                    "name": f"{entry['comName']} - {entry['sciName']}",
+                }
+            ]
+        )
+
+    async def catalog(request):
+        taxon = request.query.get("taxonCode", "")
+        media = request.query.get("mediaType", "photo")
+        count = int(request.query.get("count", "50"))
+        start = int(request.query.get("initialCursorMark") or 0)
+        # asset ids are stable for each taxon and media type
+        base = zlib.crc32(f"{taxon}:{media}".encode()) % 10**6 * 1000
+        catalog_taxa[base // 1000] = taxon
+        return web.json_response(
+            [
+                {
+                    "assetId": base + i,
+                    "rating": round(5 - i / config.assets, 2),
+                    "ratingCount": config.assets - i,
+                    "cursorMark": str(i + 1),
+                }
+                for i in range(start, min(start + count, config.assets))
+            ]
+        )
+
+    async def login(request):
+        response = web.Response()
+        response.set_cookie("standin", "1")
+        return response
+
+    async def asset(request):
+        if rng.random() < config.processing_rate:
+            return web.Response(status=476)
+        asset_id = int(request.match_info["asset_id"])
+        size = request.match_info["size"]
+        if size == "audio":
+            return web.Response(body=MP3_FRAME * MP3_FRAMES, content_type="audio/mpeg")
+        return web.Response(
+            body=_image(
+                asset_id % 256, min(int(size), 1200) if size.isdigit() else 640
+            ),
+            content_type="image/jpeg",
+        )
+
+    async def asset_page(request):
+        taxon = catalog_taxa.get(int(request.match_info["asset_id"]) // 1000)
+        entry = taxonomy.by_code.get(taxon)
+        if entry is None:
+            return web.Response(status=404)
+        return web.Response(
+            text=f"<title>ML{request.match_info['asset_id']} - {entry['comName']}"
+            + " - Macaulay Library</title>",
+            content_type="text/html",
+        )
+
+    async def get_stats(request):
+        return web.json_response(dict(stats))
+
+    app = web.Application(middlewares=[emulate])
+    app.router.add_get("/api.ebird.org/v2/ref/taxonomy/ebird", ebird_taxonomy)
+    app.router.add_get(
+        "/taxonomy.api.macaulaylibrary.org/v1/taxonomy", macaulay_taxonomy
+    )
+    app.router.add_get("/search.macaulaylibrary.org/api/v2/search", catalog)
+    app.router.add_route("*", "/search.macaulaylibrary.org/login", login)
+    app.router.add_get(
+        "/cdn.download.ams.birds.cornell.edu/api/v1/asset/{asset_id}/{size}", asset
+    )
+    app.router.add_get("/www.macaulaylibrary.org/asset/{asset_id}/embed", asset_page)
+    app.router.add_get("/_standin/stats", get_stats)
+    return app
+
+
+def parse_args(args=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m bot.tools.standin",
+        description="Serve a local stand-in for the Macaulay Library and eBird APIs.",
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument(
+        "--latency", type=float, default=0, help="milliseconds added to responses"
+    )
+    parser.add_argument(
+        "--jitter", type=float, default=0, help="random extra milliseconds, up to this"
+    )
+    parser.add_argument(
+        "--error-rate", type=float, default=0, help="fraction of 503 responses"
+    )
+    parser.add_argument(
+        "--processing-rate",
+        type=float,
+        default=0,
+        help="fraction of 476 (still processing) asset responses",
+    )
+    parser.add_argument(
+        "--assets", type=int, default=120, help="assets per taxon and media type"
+    )
+    parser.add_argument("--seed", type=int, help="seed for reproducible runs")
+    return parser.parse_args(args)
+
+
+def main(args: argparse.Namespace):
+    config = StandinConfig(
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        processing_rate=args.processing_rate,
+        assets=args.assets,
+        seed=args.seed,
+    )
+    web.run_app(create_app(config), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main(parse_args())
@@ -0,0 +1,115 @@
+# taxonomy.py | regenerate the bundled eBird taxonomy snapshot
+# Copyright (C) 2019-2021  EraserBird, person_v1.32, hmmm
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Regenerates `bot/data/taxonomy.csv` from an eBird taxonomy CSV.
+
+Usage: python -m bot.tools.taxonomy eBird_Taxonomy_v2023.csv [--version v2023] [--all]
+
+The eBird taxonomy can be downloaded from
+https://www.birds.cornell.edu/clementschecklist/download/ or
+https://api.ebird.org/v2/ref/taxonomy/ebird?fmt=csv
+
+By default only species in our bird lists are kept.
+"""
+
+import argparse
+import csv
+import os
+import string
+
+from bot.data import (
+    TAXONOMY_FILE,
+    TaxonomyEntry,
+    alpha_codes,
+    birdListMaster,
+    sciListMaster,
+)
+
+OUTPUT_FILE = TAXONOMY_FILE
+
+# column names differ between taxonomy versions
+COMMON_NAME_COLUMNS = ("PRIMARY_COM_NAME", "COMMON_NAME", "English name")
+SCI_NAME_COLUMNS = ("SCI_NAME", "SCIENTIFIC_NAME", "scientific name")
+SPECIES_CODE_COLUMNS = ("SPECIES_CODE", "SPECIES CODE", "species_code")
+CATEGORY_COLUMNS = ("CATEGORY", "category")
+
+
+def _column(row: dict, names) -> str:
+    for name in names:
+        if name in row:
+            return row[name].strip()
+    raise KeyError(f"taxonomy is missing a column for {names[0]}")
+
+
+def parse_args(args=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m bot.tools.taxonomy",
+        description="Regenerate the bundled eBird taxonomy snapshot.",
+    )
+    parser.add_argument("taxonomy", help="path to an eBird taxonomy CSV")
+    parser.add_argument(
+        "--version",
+        help="taxonomy version to record, defaults to the file name",
+    )
+    parser.add_argument(
+        "--all",
+        action="store_true",
+        help="keep every species instead of only ones in our lists",
+    )
+    return parser.parse_args(args)
+
+
+def main(args: argparse.Namespace):
+    version = args.version or os.path.splitext(os.path.basename(args.taxonomy))[0]
+    wanted = {bird.lower() for bird in birdListMaster + sciListMaster}
+
+    entries = []
+    with open(args.taxonomy, "r", encoding="utf-8-sig") as f:
+        for row in csv.DictReader(f):
+            if _column(row, CATEGORY_COLUMNS) != "species":
+                continue
+            common_name = _column(row, COMMON_NAME_COLUMNS)
+            scientific_name = _column(row, SCI_NAME_COLUMNS)
+            # our lists are normalized with string.capwords
+            key = string.capwords(common_name.replace("-", " "))
+            if not args.all and not (
+                key.lower() in wanted or scientific_name.lower() in wanted
+            ):
+                continue
+            entries.append(
+                TaxonomyEntry(
+                    common_name,
+                    scientific_name,
+                    _column(row, SPECIES_CODE_COLUMNS),
+                    alpha_codes.get(key, ""),
+                )
+            )
+
+    with open(OUTPUT_FILE, "w", newline="") as f:
+        f.write(f"# version: {version}\n")
+        writer = csv.writer(f)
+        writer.writerow(TaxonomyEntry._fields)
+        writer.writerows(entries)
+    print(f"wrote {len(entries)} species from taxonomy {version} to {OUTPUT_FILE}")
+
+    found = {entry.scientific_name.lower() for entry in entries}
+    missing = [bird for bird in sciListMaster if bird.lower() not in found]
+    if missing:
+        print(f"{len(missing)} birds in sciListMaster weren't found: {missing}")
+
+
+if __name__ == "__main__":
+    main(parse_args())
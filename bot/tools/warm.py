@@ -0,0 +1,196 @@
+# warm.py | pre-download media for whole bird lists
+# Copyright (C) 2019-2021  EraserBird, person_v1.32, hmmm
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Downloads media for every bird in a list, so a new node starts with a full cache.
+
+Usage: python -m bot.tools.warm [--state NATS IN] [--taxon passeriformes]
+       [--media images songs] [--filters "adult male" "large"] [--concurrency 4]
+
+Finished items are recorded in Redis (`warm.progress:{run}`), so running the
+same command again resumes where it stopped. Use `--restart` to start over.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import random
+import time
+from typing import List, Tuple
+
+import aiohttp
+
+from bot.core import download_media, get_sciname
+from bot.data import GenericError, database, logger, screech_owls, states
+from bot.filters import Filter, MediaType
+from bot.functions import build_id_list
+from bot.http_client import http_client
+from bot.manifest import cache_item, get_entries_async, scan_directory
+from bot.ratelimit import Priority, request_priority
+
+PROGRESS_EXPIRE = 60 * 60 * 24 * 7  # keep progress for a week
+REPORT_EVERY = 25  # print progress every 25 items
+
+WarmItem = Tuple[str, MediaType, Filter]
+
+
+def parse_args(args=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m bot.tools.warm",
+        description="Pre-download media for every bird in a list.",
+    )
+    parser.add_argument(
+        "--state",
+        nargs="*",
+        default=["NATS"],
+        help="state lists to use, defaults to NATS",
+    )
+    parser.add_argument(
+        "--taxon", nargs="*", default=[], help="taxons to limit birds to"
+    )
+    parser.add_argument(
+        "--media",
+        nargs="*",
+        choices=("images", "songs"),
+        default=["images", "songs"],
+        help="media types to download",
+    )
+    parser.add_argument(
+        "--filters",
+        nargs="*",
+        default=[""],
+        help='filter sets to download, like "adult male", defaults to no filters',
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=4,
+        help="max number of birds downloading at once",
+    )
+    parser.add_argument(
+        "--restart", action="store_true", help="ignore progress from previous runs"
+    )
+    return parser.parse_args(args)
+
+
+def build_items(args: argparse.Namespace) -> List[WarmItem]:
+    """Returns every bird, media type, and filter combination to download."""
+    for state in args.state:
+        if state not in states:
+            raise GenericError(f"Invalid state {state}", code=990)
+    items = []
+    for media in args.media:
+        media_type = MediaType.IMAGE if media == "images" else MediaType.SONG
+        birds = set(
+            build_id_list(taxon=args.taxon, state=args.state, media_type=media_type)
+        )
+        if "Screech Owl" in birds:
+            birds.remove("Screech Owl")
+            birds.update(screech_owls)
+        for bird in sorted(birds):
+            for filter_string in args.filters:
+                items.append((bird, media_type, Filter.parse(filter_string)))
+    return items
+
+
+class Warmer:
+    """Downloads media for a list of items with bounded concurrency."""
+
+    def __init__(self, items: List[WarmItem], concurrency: int, run: str):
+        self.items = items
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.progress_key = f"warm.progress:{run}"
+        self.downloaded = self.cached = self.resumed = 0
+        self.bytes = 0
+        self.failures: List[Tuple[str, str]] = []
+        self.start = time.perf_counter()
+
+    @property
+    def done(self) -> int:
+        return self.downloaded + self.cached + self.resumed + len(self.failures)
+
+    def report(self):
+        elapsed = time.perf_counter() - self.start
+        print(
+            f"{self.done}/{len(self.items)} items "
+            + f"({self.downloaded} downloaded, {self.cached} cached, "
+            + f"{self.resumed} resumed, {len(self.failures)} failed) "
+            + f"in {elapsed:.0f}s; {self.downloaded / elapsed:.2f} items/s, "
+            + f"{self.bytes / elapsed / 1e6:.2f} MB/s"
+        )
+
+    async def warm(self, bird: str, media_type: MediaType, filters: Filter):
+        async with self.semaphore:
+            try:
+                sciBird = await get_sciname(bird)
+            except GenericError:
+                sciBird = bird
+            item = cache_item(sciBird, media_type, filters)
+            loop = asyncio.get_running_loop()
+            if database.sismember(self.progress_key, item):
+                self.resumed += 1
+            elif await get_entries_async(item) or await loop.run_in_executor(
+                None, scan_directory, item
+            ):
+                self.cached += 1
+            else:
+                try:
+                    entries = await download_media(sciBird, media_type, filters)
+                    if not entries:
+                        # every asset failed or was still processing
+                        raise GenericError("No media downloaded", code=100)
+                    self.downloaded += 1
+                    self.bytes += sum(entry.size for entry in entries)
+                except (GenericError, aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    # failed items aren't recorded, so they're retried next run
+                    logger.info(f"warm failed for {item}: {e}")
+                    self.failures.append((item, str(e)))
+                    item = None
+            if item is not None:
+                database.sadd(self.progress_key, item)
+                database.expire(self.progress_key, PROGRESS_EXPIRE)
+        if self.done % REPORT_EVERY == 0:
+            self.report()
+
+    async def run(self):
+        await asyncio.gather(*(self.warm(*item) for item in self.items))
+        self.report()
+        for item, reason in self.failures:
+            print(f"FAILED {item}: {reason}")
+
+
+async def main(args: argparse.Namespace):
+    items = build_items(args)
+    # runs with the same arguments share progress
+    run = hashlib.sha1(
+        repr(
+            (sorted(args.state), sorted(args.taxon), args.media, args.filters)
+        ).encode()
+    ).hexdigest()[:12]
+    if args.restart:
+        database.delete(f"warm.progress:{run}")
+    random.shuffle(items)  # spread requests across birds
+    print(f"warming {len(items)} items, run {run}")
+
+    await http_client.start()
+    try:
+        with request_priority(Priority.PREFETCH):
+            await Warmer(items, args.concurrency, run).run()
+    finally:
+        await http_client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
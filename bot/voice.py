@@ -20,7 +20,7 @@ from typing import Optional
 import discord
 import discord.utils
 
-from bot.data import logger, database
+from bot.data import async_database, logger
 
 
 async def _send(ctx, silent, message: str):
@@ -42,7 +42,7 @@ async def get_voice_client(
             )
             return None
 
-    current_voice = database.get(f"voice.server:{ctx.guild.id}")
+    current_voice = await async_database.get(f"voice.server:{ctx.guild.id}")
     if current_voice is not None and current_voice.decode("utf-8") != str(
         ctx.channel.id
     ):
@@ -203,7 +203,7 @@ async def cleanup(bot):
     for client in bot.voice_clients:
         if len(client.channel.voice_states) == 1:
             logger.info("found empty")
-            current_voice = database.get(f"voice.server:{client.guild.id}")
+            current_voice = await async_database.get(f"voice.server:{client.guild.id}")
             if current_voice is not None:
                 logger.info("vc race")
                 bound_channel = client.guild.get_channel(int(current_voice))
@@ -0,0 +1,59 @@
+# Runs tests against the local Macaulay/eBird stand-in (bot.tools.standin).
+# Set SCIOLY_ID_BOT_LIVE_UPSTREAM=true to use the real APIs instead.
+# This has to run before bot.data is imported, since the URLs are set on import.
+
+import asyncio
+import json
+import os
+import threading
+import urllib.request
+
+import pytest
+from aiohttp import web
+
+from bot.tools.standin import StandinConfig, create_app
+
+
+def _start_standin() -> str:
+    started = threading.Event()
+    address = []
+
+    async def serve():
+        runner = web.AppRunner(create_app(StandinConfig(seed=0)))
+        await runner.setup()
+        await web.TCPSite(runner, "127.0.0.1", 0).start()
+        address.append(runner.addresses[0])
+        started.set()
+        await asyncio.Event().wait()
+
+    threading.Thread(target=asyncio.run, args=(serve(),), daemon=True).start()
+    started.wait(10)
+    host, port = address[0][:2]
+    return f"http://{host}:{port}"
+
+
+if (
+    os.getenv("SCIOLY_ID_BOT_LIVE_UPSTREAM") != "true"
+    and "SCIOLY_ID_BOT_UPSTREAM_URL" not in os.environ
+):
+    os.environ["SCIOLY_ID_BOT_UPSTREAM_URL"] = _start_standin()
+
+
+class Standin:
+    """The stand-in the tests are running against."""
+
+    def __init__(self, url: str):
+        self.url = url
+
+    def requests(self, host: str) -> int:
+        """Returns the number of requests made to an upstream host."""
+        with urllib.request.urlopen(f"{self.url}/_standin/stats") as response:
+            stats = json.load(response)
+        return sum(count for key, count in stats.items() if key.split()[0] == host)
+
+
+@pytest.fixture
+def standin():
+    if os.getenv("SCIOLY_ID_BOT_LIVE_UPSTREAM") == "true":
+        pytest.skip("needs the upstream stand-in")
+    return Standin(os.environ["SCIOLY_ID_BOT_UPSTREAM_URL"])
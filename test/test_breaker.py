@@ -0,0 +1,164 @@
+import asyncio
+import os
+import time
+from types import SimpleNamespace
+
+import aiohttp
+import pytest
+from discord.ext import commands
+
+from bot.breaker import (
+    BACKOFF_MAX,
+    BREAKER_MAX_RESET,
+    CircuitBreaker,
+    CircuitState,
+    backoff,
+    ebird,
+    macaulay,
+)
+from bot.data import GenericError
+from bot.functions import CustomCooldown
+
+
+class TestCircuitBreaker:
+    def setup(self, failures=2, reset=0.05):
+        # pylint: disable=attribute-defined-outside-init
+        self.breaker = CircuitBreaker("test", failures=failures, reset=reset)
+
+    def open(self):
+        for _ in range(self.breaker.failure_threshold):
+            self.breaker.check()
+            self.breaker.record_failure()
+
+    def test_opens_after_failures(self):
+        self.setup()
+        self.breaker.record_failure()
+        assert self.breaker.state is CircuitState.CLOSED
+        self.breaker.record_failure()
+        assert self.breaker.state is CircuitState.OPEN
+        assert self.breaker.is_open
+        with pytest.raises(GenericError) as error:
+            self.breaker.check()
+        assert error.value.code == 201
+        assert self.breaker.rejected == 1
+
+    def test_successes_reset_failures(self):
+        self.setup()
+        for _ in range(3):
+            self.breaker.record_failure()
+            self.breaker.record_success()
+        assert self.breaker.state is CircuitState.CLOSED
+        assert self.breaker.failures == 0
+
+    def test_half_open_success(self):
+        self.setup()
+        self.open()
+        time.sleep(0.06)
+        assert not self.breaker.is_open
+        self.breaker.check()  # the trial request
+        assert self.breaker.state is CircuitState.HALF_OPEN
+        with pytest.raises(GenericError):
+            self.breaker.check()  # only one trial at a time
+        self.breaker.record_success()
+        assert self.breaker.state is CircuitState.CLOSED
+        self.breaker.check()
+        assert self.breaker.stats()["transitions"] == {
+            "closed->open": 1,
+            "open->half_open": 1,
+            "half_open->closed": 1,
+        }
+
+    def test_half_open_failure(self):
+        self.setup()
+        self.open()
+        time.sleep(0.06)
+        self.breaker.check()
+        self.breaker.record_failure()
+        assert self.breaker.state is CircuitState.OPEN
+        assert self.breaker.reset == 0.1
+        assert 0.05 < self.breaker.retry_after() <= 0.1
+
+        time.sleep(0.11)
+        self.breaker.check()
+        self.breaker.record_success()
+        assert self.breaker.state is CircuitState.CLOSED
+        assert self.breaker.reset == 0.05
+
+    def test_max_reset(self):
+        self.setup(reset=BREAKER_MAX_RESET)
+        self.open()
+        self.breaker.opened_at -= BREAKER_MAX_RESET
+        self.breaker.check()
+        self.breaker.record_failure()
+        assert self.breaker.reset == BREAKER_MAX_RESET
+
+    def test_backoff(self):
+        for retries in range(20):
+            delay = min(BACKOFF_MAX, 1.5**retries)
+            assert delay / 2 <= backoff(retries) <= delay
+
+
+class TestBreakerRequests:
+    def setup(self):
+        # pylint: disable=attribute-defined-outside-init
+        self.breaker = CircuitBreaker("test", failures=2, reset=60)
+
+    async def get(self, url):
+        async with aiohttp.ClientSession() as session:
+            async with self.breaker.get(session, url) as response:
+                return response.status
+
+    def test_success(self):
+        self.setup()
+        if "SCIOLY_ID_BOT_UPSTREAM_URL" not in os.environ:
+            pytest.skip("needs the upstream stand-in")
+        self.breaker.failures = 1
+        url = f"{os.environ['SCIOLY_ID_BOT_UPSTREAM_URL']}/_standin/stats"
+        assert asyncio.run(self.get(url)) == 200
+        assert self.breaker.failures == 0
+
+    def test_connection_errors(self):
+        self.setup()
+        for _ in range(2):
+            with pytest.raises(aiohttp.ClientError):
+                asyncio.run(self.get("http://127.0.0.1:9/"))
+        assert self.breaker.state is CircuitState.OPEN
+        with pytest.raises(GenericError):
+            asyncio.run(self.get("http://127.0.0.1:9/"))
+        assert self.breaker.rejected == 1
+
+
+class TestCooldowns:
+    @pytest.yield_fixture(autouse=True)
+    def test_suite_cleanup_thing(self):
+        yield
+        for breaker in (macaulay, ebird):
+            breaker.state = CircuitState.CLOSED
+
+    @staticmethod
+    def ctx(command="bird"):
+        channel = SimpleNamespace(id=1234, name="general")
+        return SimpleNamespace(
+            command=SimpleNamespace(name=command),
+            message=SimpleNamespace(channel=channel),
+            channel=channel,
+            guild=SimpleNamespace(id=5678),
+        )
+
+    def retry_after(self, command="bird"):
+        cooldown = CustomCooldown(4.0)
+        ctx = self.ctx(command)
+        assert cooldown(ctx)
+        with pytest.raises(commands.CommandOnCooldown) as error:
+            cooldown(ctx)
+        return error.value.retry_after
+
+    def test_closed(self):
+        assert 3.9 < self.retry_after() <= 4.0
+
+    def test_open_breakers(self):
+        for breaker in (macaulay, ebird):
+            breaker.state = CircuitState.OPEN
+            assert 6.9 < self.retry_after() <= 7.0
+            assert 3.9 < self.retry_after("score") <= 4.0
+            breaker.state = CircuitState.CLOSED
@@ -0,0 +1,231 @@
+import asyncio
+import contextlib
+import hashlib
+import time
+
+import pytest
+
+from bot import functions
+from bot.data import GenericError, database
+from bot.functions import (
+    NEGATIVE_CACHE_TTL,
+    ORJSON_CODEC,
+    PICKLE_CODEC,
+    CacheCodec,
+    cache,
+)
+
+
+def counted(**kwargs):
+    """Returns a cached function that records the arguments it is called with."""
+    calls = []
+
+    @cache(**kwargs)
+    async def cached_value(item):
+        calls.append(item)
+        return [item, "value"]
+
+    return cached_value, calls
+
+
+class TestLocalCache:
+    def test_typed_keys(self):
+        func, calls = counted()
+        assert asyncio.run(func(1)) == [1, "value"]
+        assert asyncio.run(func("1")) == ["1", "value"]
+        assert asyncio.run(func(1)) == [1, "value"]
+        assert asyncio.run(func(1.0)) == [1.0, "value"]
+        assert calls == [1, "1", 1.0]
+
+    def test_lru_eviction(self):
+        func, calls = counted(maxsize=2)
+        for item in ("a", "b", "a", "c", "a", "b"):
+            asyncio.run(func(item))
+        # "b" was least recently used when "c" was added
+        assert calls == ["a", "b", "c", "b"]
+        info = func.cache_info()
+        assert (info.hits, info.misses, info.currsize) == (2, 4, 2)
+
+    def test_evict(self):
+        func, calls = counted()
+        asyncio.run(func("a"))
+        asyncio.run(func("b"))
+        func.evict()
+        asyncio.run(func("a"))
+        asyncio.run(func("b"))
+        assert calls == ["a", "b", "a"]
+
+    def test_ttl(self):
+        func, calls = counted(ttl=0.05)
+        asyncio.run(func("a"))
+        asyncio.run(func("a"))
+        assert calls == ["a"]
+        time.sleep(0.1)
+        asyncio.run(func("a"))
+        assert calls == ["a", "a"]
+
+    def test_redis_key_types(self):
+        func, calls = counted(local=False, maxsize=0)
+        with pytest.raises(TypeError):
+            asyncio.run(func(("not", "a", "key")))
+        assert calls == []
+
+
+def redis_key(item):
+    return f"cache._test_cache_redis:{hashlib.sha1(item.encode()).hexdigest()}"
+
+
+@cache(local=False, maxsize=1)
+async def _test_cache_redis(item):
+    _test_cache_redis.calls.append(item)
+    return [item, "value"]
+
+
+class TestRedisCache:
+    @pytest.yield_fixture(autouse=True)
+    def test_suite_cleanup_thing(self):
+        _test_cache_redis.calls = []
+        yield
+        for key in database.scan_iter(match="cache._test_cache_redis:*"):
+            database.delete(key)
+
+    def test_redis_tier(self):
+        asyncio.run(_test_cache_redis("a"))
+        asyncio.run(_test_cache_redis("b"))  # evicts "a" locally
+        # JSON arrays come back as tuples
+        assert asyncio.run(_test_cache_redis("a")) == ("a", "value")
+        assert _test_cache_redis.calls == ["a", "b"]
+        info = _test_cache_redis.cache_info()
+        assert (info.redis_hits, info.local_size, info.currsize) == (1, 1, 2)
+
+    def test_typed_keys(self):
+        asyncio.run(_test_cache_redis(1))
+        asyncio.run(_test_cache_redis("1"))
+        asyncio.run(_test_cache_redis("a"))  # evicts both locally
+        assert asyncio.run(_test_cache_redis(1)) == (1, "value")
+        assert asyncio.run(_test_cache_redis("1")) == ("1", "value")
+        assert _test_cache_redis.calls == [1, "1", "a"]
+
+    def test_codec_prefix(self):
+        asyncio.run(_test_cache_redis("a"))
+        assert database.get(redis_key("a")) == b'json1:["a","value"]'
+
+    def test_old_values_are_misses(self):
+        for data in (b'["a","old"]', b'json0:["a","old"]', b"pickle1:old"):
+            database.set(redis_key("a"), data)
+            asyncio.run(_test_cache_redis("b"))  # evicts "a" locally
+            assert asyncio.run(_test_cache_redis("a")) == ["a", "value"]
+            assert database.get(redis_key("a")) == b'json1:["a","value"]'
+        assert _test_cache_redis.calls == ["b", "a", "a", "a"]
+
+
+class TestCodecs:
+    def test_orjson_tuples(self):
+        value = ("a", 1, (("b", 2), ("c", 3)), {"d": (4, 5)})
+        assert ORJSON_CODEC.loads(ORJSON_CODEC.dumps(value)) == value
+
+    def test_pickle(self):
+        value = {"a", frozenset((1, 2))}
+        assert PICKLE_CODEC.loads(PICKLE_CODEC.dumps(value)) == value
+
+    def test_new_version(self):
+        codec = CacheCodec("json", 2, ORJSON_CODEC.dumps, ORJSON_CODEC.loads)
+
+        @cache(local=False, maxsize=0, codec=codec)
+        async def _test_cache_redis(item):
+            return [item, "new"]
+
+        # values stored by version 1 aren't decoded by version 2
+        database.set(redis_key("a"), b'json1:["a","value"]')
+        try:
+            assert asyncio.run(_test_cache_redis("a")) == ["a", "new"]
+            assert database.get(redis_key("a")) == b'json2:["a","new"]'
+        finally:
+            database.delete(redis_key("a"))
+
+
+def failing(**kwargs):
+    """Returns a cached function that raises the error code it is called with."""
+    calls = []
+
+    @cache(negative=(111,), **kwargs)
+    async def _test_cache_redis(code):
+        calls.append(code)
+        if code == "found":
+            return ["found"]
+        if code == "missing":
+            return []
+        raise GenericError(f"failed with {code}", code=int(code))
+
+    return _test_cache_redis, calls
+
+
+class TestNegativeCache:
+    @pytest.yield_fixture(autouse=True)
+    def test_suite_cleanup_thing(self):
+        yield
+        for key in database.scan_iter(match="cache._test_cache_redis:*"):
+            database.delete(key)
+
+    def test_cached_errors(self):
+        func, calls = failing()
+        for _ in range(2):
+            with pytest.raises(GenericError) as error:
+                asyncio.run(func("111"))
+            assert error.value.code == 111
+            assert str(error.value) == "failed with 111"
+        assert calls == ["111"]
+
+    def test_other_errors(self):
+        func, calls = failing()
+        for _ in range(2):
+            with pytest.raises(GenericError):
+                asyncio.run(func("201"))
+        assert calls == ["201", "201"]
+
+    def test_negative_ttl(self, monkeypatch):
+        monkeypatch.setattr(functions, "NEGATIVE_CACHE_TTL", 0.05)
+        func, calls = failing(is_negative=lambda result: not result)
+        for code in ("111", "missing", "found"):
+            for _ in range(2):
+                with contextlib.suppress(GenericError):
+                    asyncio.run(func(code))
+        time.sleep(0.1)
+        for code in ("111", "missing", "found"):
+            with contextlib.suppress(GenericError):
+                asyncio.run(func(code))
+        # only the positive result outlives the negative ttl
+        assert calls == ["111", "missing", "found", "111", "missing"]
+
+    def test_redis_errors(self):
+        func, calls = failing(local=False, maxsize=0)
+        with pytest.raises(GenericError):
+            asyncio.run(func("111"))
+        key = f"cache._test_cache_redis:{hashlib.sha1(b'111').hexdigest()}"
+        assert database.get(key) == b'error:[111,"failed with 111"]'
+        assert 0 < database.ttl(key) <= NEGATIVE_CACHE_TTL
+
+        # other processes raise the cached error too
+        func, calls = failing(local=False, maxsize=0)
+        with pytest.raises(GenericError) as error:
+            asyncio.run(func("111"))
+        assert error.value.code == 111
+        assert calls == []
+
+    def test_redis_ttl(self):
+        # the local ttl doesn't shorten how long Redis keeps results
+        func, _ = failing(local=False, ttl=3600)
+        asyncio.run(func("found"))
+        found = f"cache._test_cache_redis:{hashlib.sha1(b'found').hexdigest()}"
+        assert 3600 < database.ttl(found) <= 7776000
+
+    def test_redis_negative_ttl(self):
+        func, _ = failing(
+            local=False, redis_ttl=3600, is_negative=lambda result: not result
+        )
+        asyncio.run(func("missing"))
+        asyncio.run(func("found"))
+        missing = f"cache._test_cache_redis:{hashlib.sha1(b'missing').hexdigest()}"
+        found = f"cache._test_cache_redis:{hashlib.sha1(b'found').hexdigest()}"
+        assert 0 < database.ttl(missing) <= NEGATIVE_CACHE_TTL
+        assert NEGATIVE_CACHE_TTL < database.ttl(found) <= 3600
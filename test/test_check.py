@@ -1,11 +1,15 @@
 import asyncio
+import random
+import string
+from difflib import get_close_matches
 
 import pytest
 
 import discord_mock as mock
 from bot.cogs import check
-from bot.data import database
-from bot.data_functions import channel_setup, user_setup
+from bot.data import alpha_codes, birdListMaster, database, sciListMaster
+from bot.data_functions import channel_setup, race_channels, user_setup
+from bot.spellcheck import bird_index
 
 
 class TestCheck:
@@ -84,3 +88,74 @@ class TestCheck:
             self.ctx.messages[2].content
             == f"Sorry, the bird was actually **{test_word.lower()}**."
         )
+
+
+class TestMightBeGuess:
+    names = birdListMaster + sciListMaster
+
+    def would_check(self, content):
+        """Returns True if race_autocheck checks a message for some bird."""
+        return (
+            (len(content.strip()) == 4 and content.strip().upper() in check.ALPHA_CODES)
+            or get_close_matches(
+                string.capwords(content.strip().replace("-", " ")), self.names
+            )
+            or bird_index.closest(content) is not None
+        )
+
+    def messages(self, count=200):
+        rng = random.Random(25)
+        for _ in range(count):
+            chars = list(rng.choice(self.names))
+            for _ in range(rng.randint(0, 6)):
+                i = rng.randrange(len(chars))
+                edit = rng.choice("ids")
+                if edit == "i":
+                    chars.insert(i, rng.choice(string.ascii_letters + " -'?!"))
+                elif edit == "d" and len(chars) > 1:
+                    del chars[i]
+                else:
+                    chars[i] = rng.choice(string.ascii_letters)
+            message = "".join(chars)
+            yield rng.choice(
+                [message, message.upper(), message.lower(), f" {message}  "]
+            )
+
+    def test_never_skips_guesses(self):
+        checked = 0
+        for message in self.messages():
+            if self.would_check(message):
+                checked += 1
+                assert check.might_be_guess(message), message
+                assert check.might_be_guess(message, custom=True), message
+        assert checked > 100
+
+    def test_exact_names(self):
+        for name in random.Random(25).sample(self.names, 200):
+            for message in (name, name.lower(), name.upper(), name.replace(" ", "-")):
+                assert check.might_be_guess(message), message
+
+    def test_alpha_codes(self):
+        for code in random.Random(25).sample(sorted(set(alpha_codes.values())), 50):
+            assert check.might_be_guess(code)
+            assert check.might_be_guess(code.lower())
+
+    @pytest.mark.parametrize(
+        "message",
+        ["", "   ", "gg", "!!!", "12345", "\U0001f426" * 4, "wait " * 40],
+    )
+    def test_chatter(self, message):
+        assert not self.would_check(message)
+        assert not check.might_be_guess(message)
+
+    def test_custom_lists(self):
+        # names in custom lists aren't known, so only symbols are skipped
+        assert check.might_be_guess("Definitely Not A Bird", custom=True)
+        assert not check.might_be_guess("?!?! 123", custom=True)
+
+    def test_not_racing(self):
+        message = mock.Message("Canada Goose")
+        message.channel = mock.Channel()
+        race_channels.pop(message.channel.id, None)
+        cog = check.Check(mock.Bot())
+        assert asyncio.run(cog.race_autocheck(message)) is None
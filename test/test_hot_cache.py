@@ -0,0 +1,37 @@
+from bot.hot_cache import HotMediaCache
+
+
+class TestHotMediaCache:
+    def test_stats(self, tmp_path):
+        path = str(tmp_path / "1.jpg")
+        with open(path, "wb") as f:
+            f.write(b"image")
+        cache = HotMediaCache(max_bytes=1000)
+        # like send_bird, check the cache before loading from disk
+        for _ in range(3):
+            if cache.get(path) is None:
+                assert cache.load(path) == b"image"
+        assert cache.stats() == {"items": 1, "bytes": 5, "hits": 2, "misses": 1}
+
+    def test_lru(self):
+        cache = HotMediaCache(max_bytes=80)
+        for name in "abcdefgh":
+            cache.put(name, b"x" * 10)
+        cache.get("a")
+        cache.put("i", b"x" * 10)
+        assert cache.get("b") is None
+        assert cache.get("a") is not None
+        assert cache.stats()["bytes"] == 80
+        cache.put("j", b"x" * 11)  # files over 1/8 of the limit aren't kept
+        assert cache.get("j") is None
+
+    def test_invalidate(self):
+        cache = HotMediaCache(max_bytes=1000)
+        cache.put("cache/images/bird/1.jpg", b"x" * 10)
+        cache.put("cache/images/bird/1.small.webp", b"x" * 5)
+        cache.put("cache/images/bird 2/1.jpg", b"x" * 3)
+        cache.invalidate("cache/images/bird 2/1.jpg")
+        assert cache.stats()["bytes"] == 15
+        cache.invalidate_directory("cache/images/bird/")
+        assert cache.stats()["items"] == 0
+        assert cache.size == 0
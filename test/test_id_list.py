@@ -0,0 +1,49 @@
+import asyncio
+
+import pytest
+
+from bot.data import GenericError, birdList, database, songBirds, states, taxons
+from bot.filters import MediaType
+from bot.functions import build_id_list, build_id_list_async
+
+USER_ID = "1234567890"
+CUSTOM = ["Definitely A Bird", "Another Bird"]
+
+
+class TestIdList:
+    @pytest.yield_fixture(autouse=True)
+    def test_suite_cleanup_thing(self):
+        database.delete(f"custom.list:{USER_ID}", f"custom.confirm:{USER_ID}")
+        yield
+        database.delete(f"custom.list:{USER_ID}", f"custom.confirm:{USER_ID}")
+
+    def both(self, **kwargs):
+        birds = build_id_list(**kwargs)
+        assert sorted(asyncio.run(build_id_list_async(**kwargs))) == sorted(birds)
+        return sorted(birds)
+
+    def test_defaults(self):
+        assert self.both() == sorted(birdList)
+        assert self.both(media_type=MediaType.SONG) == sorted(songBirds)
+
+    def test_state_and_taxon(self):
+        assert self.both(state="NATS IN") == sorted(
+            set(states["NATS"]["birdList"] + states["IN"]["birdList"])
+        )
+        birds = self.both(taxon="passeriformes", state=["NATS"])
+        assert birds == sorted(
+            set(taxons["passeriformes"]) & set(states["NATS"]["birdList"])
+        )
+
+    def test_custom_list(self):
+        database.sadd(f"custom.list:{USER_ID}", *CUSTOM)
+        birds = self.both(user_id=USER_ID, state="CUSTOM")
+        assert birds == sorted(CUSTOM)
+        # other users and unconfirmed lists don't get the custom birds
+        assert self.both(user_id="1", state="CUSTOM") == []
+        database.set(f"custom.confirm:{USER_ID}", "valid")
+        assert self.both(user_id=USER_ID, state="CUSTOM") == []
+
+    def test_invalid_media(self):
+        with pytest.raises(GenericError):
+            build_id_list(media_type=None)
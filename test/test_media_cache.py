@@ -0,0 +1,105 @@
+import asyncio
+import os
+import shutil
+
+import pytest
+
+from bot.core import COUNT, download_media, evict_cold_media
+from bot.data import database
+from bot.filters import Filter, MediaType
+from bot.http_client import http_client
+from bot.manifest import (
+    cache_directory,
+    cache_item,
+    delete_item,
+    get_entries,
+    scan_directory,
+    total_size,
+)
+
+ASSET_HOST = "cdn.download.ams.birds.cornell.edu"
+IMAGES = ("Cardinalis cardinalis", MediaType.IMAGE, Filter())
+SONGS = ("Turdus migratorius", MediaType.SONG, Filter())
+
+
+def run(coroutine):
+    async def wrapped():
+        try:
+            return await coroutine
+        finally:
+            await http_client.close()
+
+    return asyncio.run(wrapped())
+
+
+def stored_size(entries) -> int:
+    return sum(
+        entry.size + sum(size for _, size in (entry.variants or {}).values())
+        for entry in entries
+    )
+
+
+class TestMediaCache:
+    @pytest.yield_fixture(autouse=True)
+    def test_suite_cleanup_thing(self):
+        self.cleanup()
+        yield
+        self.cleanup()
+
+    @staticmethod
+    def cleanup():
+        for media in (IMAGES, SONGS):
+            item = cache_item(*media)
+            delete_item(item)
+            shutil.rmtree(cache_directory(item), ignore_errors=True)
+            database.zrem("frequency.media:global", item)
+            for key in ("catalog", "cursor", "empty"):
+                database.delete(f"media.{key}:{item}")
+
+    def test_manifest(self, standin):
+        item = cache_item(*IMAGES)
+        entries = run(download_media(*IMAGES))
+        assert len(entries) == COUNT
+        assert sorted(get_entries(item)) == sorted(entries)
+        for entry in entries:
+            assert os.path.getsize(entry.path) == entry.size
+        size = stored_size(entries)
+        assert database.zscore("media.bytes:global", item) == size
+        assert database.zscore("media.access:global", item) is not None
+
+        # the manifest can be rebuilt from the files on disk
+        delete_item(item)
+        assert get_entries(item) == []
+        assert sorted(scan_directory(item)) == sorted(entries)
+        assert database.zscore("media.bytes:global", item) == size
+
+    def test_eviction(self, standin):
+        item = cache_item(*IMAGES)
+        entries = run(download_media(*IMAGES))
+        # make this the coldest item in the cache
+        database.zadd("media.access:global", {item: 0})
+        before = total_size()
+        evict_cold_media(before - 1)
+        assert get_entries(item) == []
+        assert database.zscore("media.bytes:global", item) is None
+        assert database.zscore("media.access:global", item) is None
+        assert not os.path.exists(cache_directory(item))
+        assert total_size() <= before - stored_size(entries)
+
+        evict_cold_media(total_size())  # under the limit, so nothing happens
+        assert run(download_media(*IMAGES))
+
+    def test_single_flight(self, standin):
+        before = standin.requests(ASSET_HOST)
+
+        async def download():
+            return await asyncio.gather(*(download_media(*SONGS) for _ in range(3)))
+
+        results = run(download())
+        assert len(results[0]) == COUNT
+        assert results[0] == results[1] == results[2]
+        assert standin.requests(ASSET_HOST) - before == COUNT
+
+        # later calls download new media
+        run(download_media(*SONGS))
+        assert standin.requests(ASSET_HOST) - before == 2 * COUNT
@@ -0,0 +1,117 @@
+import os
+import shutil
+
+import pytest
+
+from bot.data import database
+from bot.filters import Filter, MediaType
+from bot.manifest import (
+    cache_directory,
+    cache_item,
+    delete_item,
+    get_entries,
+    migrate_cache_keys,
+    scan_directory,
+)
+
+BIRD = "Testus migratus"
+NEW = cache_item(BIRD, MediaType.IMAGE, Filter())
+# black & white used to be part of the item name
+OLD = f"images/{BIRD}{Filter.parse('bw').to_int()}"
+SONGS = cache_item(BIRD, MediaType.SONG, Filter())
+ITEMS = (NEW, OLD, SONGS)
+
+
+def add_files(item, files):
+    os.makedirs(cache_directory(item), exist_ok=True)
+    for filename, data in files.items():
+        with open(f"{cache_directory(item)}{filename}", "wb") as f:
+            f.write(data)
+    scan_directory(item)
+
+
+class TestMigrateCacheKeys:
+    @pytest.yield_fixture(autouse=True)
+    def test_suite_cleanup_thing(self):
+        self.cleanup()
+        yield
+        self.cleanup()
+
+    @staticmethod
+    def cleanup():
+        for item in ITEMS:
+            delete_item(item)
+            shutil.rmtree(cache_directory(item), ignore_errors=True)
+            database.zrem("frequency.media:global", item)
+            database.delete(f"media.cursor:{item}")
+
+    @staticmethod
+    def snapshot():
+        return {
+            item: (
+                (
+                    sorted(os.listdir(cache_directory(item)))
+                    if os.path.exists(cache_directory(item))
+                    else None
+                ),
+                sorted(get_entries(item)),
+                database.zscore("media.bytes:global", item),
+                database.zscore("media.access:global", item),
+                database.zscore("frequency.media:global", item),
+                database.get(f"media.cursor:{item}"),
+            )
+            for item in ITEMS
+        }
+
+    def setup(self):
+        add_files(OLD, {"1.jpg": b"old 1", "2.jpg": b"old 2"})
+        database.zadd("frequency.media:global", {OLD: 3})
+        database.zadd("media.access:global", {OLD: 200})
+        database.set(f"media.cursor:{OLD}", "10")
+
+        add_files(NEW, {"2.jpg": b"new 2", "3.jpg": b"new 3"})
+        database.zadd("frequency.media:global", {NEW: 2})
+        database.zadd("media.access:global", {NEW: 100})
+
+        add_files(SONGS, {"4.mp3": b"song"})
+        database.zadd("frequency.media:global", {SONGS: 1})
+
+    def test_migrate(self):
+        self.setup()
+        songs = self.snapshot()[SONGS]
+        assert migrate_cache_keys() >= 1
+
+        assert not os.path.exists(cache_directory(OLD))
+        assert get_entries(OLD) == []
+        for key in ("media.bytes:global", "media.access:global"):
+            assert database.zscore(key, OLD) is None
+        assert database.zscore("frequency.media:global", OLD) is None
+        assert database.get(f"media.cursor:{OLD}") is None
+
+        # files are merged, keeping the new item's copy of duplicates
+        assert sorted(os.listdir(cache_directory(NEW))) == ["1.jpg", "2.jpg", "3.jpg"]
+        with open(f"{cache_directory(NEW)}2.jpg", "rb") as f:
+            assert f.read() == b"new 2"
+        assert sorted(entry.asset_id for entry in get_entries(NEW)) == ["1", "2", "3"]
+        assert database.zscore("media.bytes:global", NEW) == 15
+        assert database.zscore("frequency.media:global", NEW) == 5
+        assert database.zscore("media.access:global", NEW) == 200
+        assert database.get(f"media.cursor:{NEW}") == b"10"
+
+        # items that were already normalized aren't touched
+        assert self.snapshot()[SONGS] == songs
+
+    def test_rename(self):
+        add_files(OLD, {"1.jpg": b"old 1"})
+        database.zadd("frequency.media:global", {OLD: 3})
+        migrate_cache_keys()
+        assert os.listdir(cache_directory(NEW)) == ["1.jpg"]
+        assert [entry.asset_id for entry in get_entries(NEW)] == ["1"]
+        assert database.zscore("frequency.media:global", NEW) == 3
+
+    def test_idempotent(self):
+        self.setup()
+        migrate_cache_keys()
+        migrated = self.snapshot()
+        assert migrate_cache_keys() == 0
+        assert self.snapshot() == migrated
@@ -0,0 +1,46 @@
+import asyncio
+
+from bot import prefetch
+from bot.data import GenericError
+from bot.filters import MediaType
+
+
+class TestPrefetcher:
+    def run(self, monkeypatch, results, budget=10):
+        """Runs the prefetcher over one item per result from `_fetch`."""
+        results = list(results)
+
+        async def fetch(bird, media_type, filter_int):
+            result = results.pop(0)
+            if isinstance(result, Exception):
+                raise result
+            return result
+
+        monkeypatch.setattr(prefetch.Prefetcher, "_fetch", staticmethod(fetch))
+
+        async def run():
+            prefetcher = prefetch.Prefetcher(budget=budget)
+            prefetcher.put(
+                [(0, f"Bird {i}", MediaType.IMAGE, 0) for i in range(len(results))]
+            )
+            prefetcher.start()
+            while results and prefetcher.remaining > 0:
+                await asyncio.sleep(0.01)
+            await asyncio.sleep(0.01)
+            prefetcher.stop()
+            return prefetcher.stats()
+
+        return asyncio.run(run())
+
+    def test_budget(self, monkeypatch):
+        stats = self.run(monkeypatch, [["entry"], None, ["entry"]])
+        assert stats["remaining_budget"] == 8
+        assert (stats["downloaded"], stats["skipped"], stats["failed"]) == (2, 1, 0)
+
+    def test_failures_use_budget(self, monkeypatch):
+        results = [GenericError("No urls found.", code=100), [], ValueError("bad")]
+        stats = self.run(monkeypatch, results * 2, budget=5)
+        # the sixth item waits for a refill
+        assert stats["remaining_budget"] == 0
+        assert stats["failed"] == 5
+        assert stats["queued"] == 0
@@ -0,0 +1,94 @@
+import asyncio
+import time
+
+import pytest
+
+from bot.data import database
+from bot.ratelimit import Priority, TokenBucket, UpstreamLimiter, request_priority
+
+URL = "https://limiter.test/path"
+
+
+class TestTokenBucket:
+    def test_burst(self):
+        bucket = TokenBucket(rate=10, capacity=5)
+        start = time.monotonic()
+
+        async def run():
+            for _ in range(5):
+                await bucket.acquire()
+
+        asyncio.run(run())
+        assert time.monotonic() - start < 0.05
+
+    def test_waiters_in_order(self):
+        bucket = TokenBucket(rate=20, capacity=2)
+        done = []
+
+        async def waiter(i):
+            await bucket.acquire()
+            done.append(i)
+
+        async def run():
+            await asyncio.gather(*(waiter(i) for i in range(6)))
+
+        start = time.monotonic()
+        asyncio.run(run())
+        # 4 requests over the burst at 20 per second
+        assert 0.19 < time.monotonic() - start < 0.4
+        assert done == list(range(6))
+
+
+class TestUpstreamLimiter:
+    @pytest.yield_fixture(autouse=True)
+    def test_suite_cleanup_thing(self):
+        database.delete("ratelimit:limiter.test")
+        yield
+        database.delete("ratelimit:limiter.test")
+
+    def setup(self):
+        # pylint: disable=attribute-defined-outside-init
+        self.limiter = UpstreamLimiter(rate=10, capacity=4)
+        self.done = []
+
+    async def request(self, priority: Priority):
+        with request_priority(priority):
+            await self.limiter.acquire(URL)
+        self.done.append(priority)
+
+    def requests(self, *priorities: Priority):
+        async def run():
+            await asyncio.gather(*(self.request(priority) for priority in priorities))
+
+        asyncio.run(run())
+
+    def test_reserve(self):
+        self.setup()
+        # prefetching can only use half of the bucket
+        self.requests(*[Priority.PREFETCH] * 3)
+        assert self.limiter.stats()["prefetch"]["waited"] == 1
+        # which is left for interactive requests
+        self.requests(*[Priority.INTERACTIVE] * 2)
+        assert self.limiter.stats()["interactive"]["waited"] == 0
+
+    def test_priority_order(self):
+        self.setup()
+        self.requests(*[Priority.INTERACTIVE] * 4)
+        self.done.clear()
+        # prefetch requests are waiting first, but interactive ones go ahead
+        self.requests(*[Priority.PREFETCH] * 3, *[Priority.INTERACTIVE] * 3)
+        assert self.done == [Priority.INTERACTIVE] * 3 + [Priority.PREFETCH] * 3
+        stats = self.limiter.stats()
+        assert stats["interactive"]["requests"] == 7
+        assert stats["prefetch"]["requests"] == 3
+        assert stats["prefetch"]["max_wait_ms"] > stats["interactive"]["max_wait_ms"]
+
+    def test_hosts(self):
+        self.setup()
+        self.requests(*[Priority.INTERACTIVE] * 4)
+        try:
+            with request_priority(Priority.INTERACTIVE):
+                asyncio.run(self.limiter.acquire("https://other.limiter.test/"))
+        finally:
+            database.delete("ratelimit:other.limiter.test")
+        assert self.limiter.stats()["interactive"]["waited"] == 0
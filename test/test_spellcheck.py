@@ -0,0 +1,93 @@
+import difflib
+import random
+
+import pytest
+
+from bot.core import better_spellcheck
+from bot.data import birdListMaster, sciListMaster
+from bot.spellcheck import SpellcheckIndex, bird_index
+
+
+def difflib_spellcheck(word, correct, options):
+    """The original better_spellcheck, before the index."""
+    all_options = set(list(correct) + list(options))
+    matches = difflib.get_close_matches(
+        word.lower(), map(str.lower, all_options), n=1, cutoff=(2 / 3)
+    )
+    if not matches:
+        return False
+    return matches[0] in map(str.lower, correct)
+
+
+def misspell(rng, word):
+    chars = list(word)
+    for _ in range(rng.randint(0, 4)):
+        i = rng.randrange(len(chars) + 1)
+        edit = rng.choice("ids")
+        if edit == "i" or not chars:
+            chars.insert(i, rng.choice("abcdefghijklmnopqrstuvwxyz -'"))
+        elif edit == "d":
+            del chars[min(i, len(chars) - 1)]
+        else:
+            chars[min(i, len(chars) - 1)] = rng.choice("abcdefghijklmnopqrstuvwxyz")
+    return "".join(chars)
+
+
+class TestSpellcheck:
+    options = birdListMaster + sciListMaster
+
+    def guesses(self, count=500):
+        rng = random.Random(42)
+        for _ in range(count):
+            correct = rng.choice(self.options)
+            guess = misspell(rng, rng.choice([correct, rng.choice(self.options)]))
+            yield guess, [correct, correct.lower()]
+
+    def test_closest_parity(self):
+        for guess, _ in self.guesses():
+            matches = difflib.get_close_matches(
+                guess.lower(), bird_index.names, n=1, cutoff=(2 / 3)
+            )
+            assert bird_index.closest(guess) == (matches[0] if matches else None)
+
+    def test_better_spellcheck_parity(self):
+        for guess, correct in self.guesses():
+            assert better_spellcheck(guess, correct) == difflib_spellcheck(
+                guess, correct, self.options
+            ), guess
+
+    def test_extra_options(self):
+        custom = ["Definitely Not A Bird", "Northern Cardinalis"]
+        for guess in (
+            "definitely not a bir",
+            "northern cardinali",
+            "northern cardinal",
+        ):
+            assert better_spellcheck(
+                guess, ["Northern Cardinal"], custom
+            ) == difflib_spellcheck(guess, ["Northern Cardinal"], self.options + custom)
+
+    @pytest.mark.parametrize(
+        "guess,expected",
+        [
+            ("northern cardinal", True),
+            ("Northern Cardnal", True),
+            ("cardinalis cardinalis", True),
+            ("blue jay", False),
+            ("", False),
+            ("northern cardinal " * 4, False),
+        ],
+    )
+    def test_known_answers(self, guess, expected):
+        assert (
+            better_spellcheck(guess, ["Northern Cardinal", "Cardinalis cardinalis"])
+            == expected
+        )
+
+    def test_small_index(self):
+        index = SpellcheckIndex(["Abc", "abd", "xyz"])
+        assert len(index) == 3
+        assert "ABC" in index
+        assert index.closest("abx") == "abd"  # ties go to the larger name
+        assert index.closest("qqq") is None
+        assert index.closest("qqq", extra=["QQQ"]) == "qqq"
@@ -0,0 +1,93 @@
+import argparse
+import asyncio
+
+import pytest
+
+from bot import core
+from bot.data import _taxonomy
+from bot.tools import taxonomy as taxonomy_tool
+
+SNAPSHOT = """# version: test
+common_name,scientific_name,species_code,alpha_code
+Northern Cardinal,Cardinalis cardinalis,norcar,NOCA
+Black-capped Chickadee,Poecile atricapillus,bkcchi,BCCH
+"""
+
+EBIRD_TAXONOMY = """SCIENTIFIC_NAME,COMMON_NAME,SPECIES_CODE,CATEGORY
+Cardinalis cardinalis,Northern Cardinal,norcar,species
+Cardinalis cardinalis cardinalis,Northern Cardinal (Common),norcar1,issf
+Turdus migratorius,American Robin,amerob,species
+Notabirdus fakeus,Fake Bird,fakbir,species
+"""
+
+UPSTREAM_HOSTS = ("api.ebird.org", "taxonomy.api.macaulaylibrary.org")
+
+
+class NoNetwork:
+    """A session that fails the test if a request is made."""
+
+    def __getattr__(self, name):
+        raise AssertionError(f"network request made with session.{name}")
+
+
+class TestTaxonomy:
+    @pytest.fixture
+    def snapshot(self, tmp_path, monkeypatch):
+        path = tmp_path / "taxonomy.csv"
+        path.write_text(SNAPSHOT)
+        version, lookup = _taxonomy(str(path))
+        monkeypatch.setattr(core, "taxonomy", lookup)
+        return version, lookup
+
+    def test_loader(self, snapshot):
+        version, lookup = snapshot
+        assert version == "test"
+        assert len(lookup) == 4
+        entry = lookup["northern cardinal"]
+        assert lookup["cardinalis cardinalis"] is entry
+        assert entry.species_code == "norcar"
+        assert entry.alpha_code == "NOCA"
+        assert lookup["black capped chickadee"].scientific_name == (
+            "Poecile atricapillus"
+        )
+
+    def test_lookups(self, snapshot, standin):
+        before = [standin.requests(host) for host in UPSTREAM_HOSTS]
+        # the cache decorators use Redis, so call the lookups directly
+        get_sciname = core.get_sciname.__wrapped__
+        get_taxon = core.get_taxon.__wrapped__
+        for bird in ("Northern Cardinal", "northern-cardinal", "CARDINALIS CARDINALIS"):
+            assert asyncio.run(get_sciname(bird, NoNetwork())) == (
+                "Cardinalis cardinalis"
+            )
+            assert asyncio.run(get_taxon(bird, NoNetwork())) == (
+                "norcar",
+                "Northern Cardinal - Cardinalis cardinalis",
+            )
+        assert asyncio.run(get_taxon("Black-capped Chickadee", NoNetwork()))[0] == (
+            "bkcchi"
+        )
+        assert [standin.requests(host) for host in UPSTREAM_HOSTS] == before
+
+    def test_missing_birds_use_network(self, snapshot):
+        with pytest.raises(AssertionError):
+            asyncio.run(core.get_taxon.__wrapped__("Blue Jay", NoNetwork()))
+
+    def test_generate(self, tmp_path, monkeypatch, capsys):
+        source = tmp_path / "eBird_Taxonomy_test.csv"
+        source.write_text(EBIRD_TAXONOMY)
+        output = tmp_path / "taxonomy.csv"
+        monkeypatch.setattr(taxonomy_tool, "OUTPUT_FILE", str(output))
+        taxonomy_tool.main(
+            argparse.Namespace(taxonomy=str(source), version=None, all=False)
+        )
+        assert "wrote 2 species" in capsys.readouterr().out
+
+        version, lookup = _taxonomy(str(output))
+        assert version == "eBird_Taxonomy_test"
+        # subspecies and birds that aren't in our lists are skipped
+        assert sorted({entry.species_code for entry in lookup.values()}) == [
+            "amerob",
+            "norcar",
+        ]
+        assert lookup["american robin"].alpha_code == "AMRO"
@@ -82,7 +82,7 @@ async def update_web_user(request: Request, user_data: dict):
     await user_setup(user_id)
     tempScore = int(database.hget(f"web.session:{session_id}", "tempScore"))
     if tempScore not in (0, -1):
-        score_increment(user_id, tempScore)
+        await score_increment(user_id, tempScore)
         database.zincrby(
             f"daily.webscore:{str(datetime.datetime.now(datetime.timezone.utc).date())}",
             1,
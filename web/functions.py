@@ -20,24 +20,35 @@ import io
 from functools import partial
 from typing import Union
 
-import eyed3
 from fastapi import HTTPException, Request
-from fastapi.responses import FileResponse, StreamingResponse
+from fastapi.responses import FileResponse, Response, StreamingResponse
 from sentry_sdk import capture_exception
-
-from bot.core import _black_and_white, get_files, get_sciname
+from starlette.background import BackgroundTask
+
+from bot.core import (
+    black_and_white_variant,
+    get_files,
+    get_sciname,
+    optimized_variant,
+    sanitize_song,
+)
 from bot.data import GenericError, birdList, database, logger, screech_owls
 from bot.filters import Filter, MediaType
+from bot.hot_cache import hot_cache
 from web.data import get_session_id
 
 
 def send_file(
     fp: Union[str, io.BufferedIOBase], **kwargs
-) -> Union[FileResponse, StreamingResponse]:
+) -> Union[FileResponse, Response, StreamingResponse]:
     kwargs.setdefault("headers", {})
     kwargs["headers"]["Cache-Control"] = "no-cache"
     if isinstance(fp, str):
-        return FileResponse(fp, **kwargs)
+        data = hot_cache.get(fp)
+        if data is not None:
+            return Response(data, **kwargs)
+        # keep the file in memory for next time after it's sent
+        return FileResponse(fp, background=BackgroundTask(hot_cache.load, fp), **kwargs)
     return StreamingResponse(fp, **kwargs)
 
 
@@ -60,31 +71,31 @@ async def send_bird(
         bird = random.choice(screech_owls)
 
     try:
-        filename, ext, content_type = await get_media(
-            request, bird, media_type, filters
-        )
+        entry = await get_media(request, bird, media_type, filters)
     except GenericError as e:
         logger.info(e)
         capture_exception(e)
         raise HTTPException(status_code=503, detail=str(e)) from e
 
+    filename, ext, content_type = entry.path, entry.extension, entry.content_type
     if media_type is MediaType.IMAGE:
         if filters.bw:
             loop = asyncio.get_running_loop()
-            file_stream = await loop.run_in_executor(
-                None, partial(_black_and_white, filename)
+            filename = await loop.run_in_executor(
+                None, partial(black_and_white_variant, entry)
             )
+            ext, content_type = "png", "image/png"
         else:
-            file_stream = filename
-    elif media_type is MediaType.SONG:
-        # remove spoilers in tag metadata
-        audioFile = eyed3.load(filename)
-        if audioFile is not None and audioFile.tag is not None:
-            audioFile.tag.remove(filename)
-
-        file_stream = filename
+            webp = "image/webp" in request.headers.get("accept", "")
+            optimized = optimized_variant(entry, filters, webp=webp)
+            if optimized is not None:
+                filename, ext, content_type = optimized
+    elif media_type is MediaType.SONG and not entry.sanitized:
+        # songs are sanitized when downloaded, this is for older cached songs
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, sanitize_song, entry)
 
-    return file_stream, ext, content_type
+    return filename, ext, content_type
 
 
 async def get_media(
@@ -107,7 +118,7 @@ async def get_media(
     database_key = f"web.session:{session_id}"
 
     media = await get_files(sciBird, media_type, filters)
-    logger.info(f"fetched {media_type.name()}: {media}")
+    logger.info(f"fetched {media_type.name()}: {[entry.path for entry in media]}")
     prevJ = int(database.hget(database_key, "prevJ").decode("utf-8"))
     if media:
         j = (prevJ + 1) % len(media)
@@ -116,10 +127,9 @@ async def get_media(
 
         for x in range(0, len(media)):  # check file type and size
             y = (x + j) % len(media)
-            media_path = media[y]
-            extension = media_path.split(".")[-1]
-            logger.info("extension: " + str(extension))
-            if extension.lower() in media_type.types().values():
+            entry = media[y]
+            logger.info("extension: " + str(entry.extension))
+            if entry.extension.lower() in media_type.types().values():
                 logger.info("found one!")
                 break
             if y == prevJ:
@@ -131,4 +141,4 @@ async def get_media(
     else:
         raise GenericError(f"No {media_type.name().title()} Found", code=100)
 
-    return media_path, extension, MediaType.content_type_lookup(extension)
+    return entry
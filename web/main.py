@@ -20,8 +20,9 @@ import urllib.parse
 from fastapi import Request
 from fastapi.responses import HTMLResponse
 
-from bot.data import birdList
+from bot.data import async_database, birdList
 from bot.filters import Filter, MediaType
+from bot.http_client import http_client
 from web import practice, user
 from web.config import app
 from web.data import logger
@@ -31,6 +32,17 @@ app.include_router(practice.router)
 app.include_router(user.router)
 
 
+@app.on_event("startup")
+async def startup():
+    await http_client.start()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    await http_client.close()
+    await async_database.close()
+
+
 @app.get("/", response_class=HTMLResponse)
 def api_index():
     logger.info("index page accessed")
@@ -24,10 +24,8 @@ from bot.core import better_spellcheck
 from bot.data import (
     alpha_codes,
     birdList,
-    birdListMaster,
     format_wiki_url,
     sci_screech_owls,
-    sciListMaster,
     screech_owls,
     songBirds,
 )
@@ -45,8 +43,8 @@ router = APIRouter(prefix="/practice", tags=["practice"])
 date = lambda: str(datetime.datetime.now(datetime.timezone.utc).date())
 
 
-def increment_bird_frequency(bird, user_id):
-    bird_setup(user_id, bird)
+async def increment_bird_frequency(bird, user_id):
+    await bird_setup(user_id, bird)
     database.zincrby("frequency.bird:global", 1, string.capwords(bird))
 
 
@@ -90,7 +88,7 @@ async def get_bird(
         currentBird = random.choice(id_list)
         user_id = int(database.hget(f"web.session:{session_id}", "user_id"))
         if user_id != 0:
-            increment_bird_frequency(currentBird, user_id)
+            await increment_bird_frequency(currentBird, user_id)
         prevB = database.hget(f"web.session:{session_id}", "prevB").decode("utf-8")
         while currentBird == prevB and len(id_list) > 1:
             currentBird = random.choice(id_list)
@@ -139,17 +137,14 @@ async def check_bird(request: Request, guess: str):
 
     database.zincrby(f"daily.web:{date()}", 1, "check")
     if user_id != 0:
-        bird_setup(user_id, currentBird)
+        await bird_setup(user_id, currentBird)
 
     accepted_answers = [currentBird, sciBird]
     if currentBird == "screech owl":
         accepted_answers += screech_owls
         accepted_answers += sci_screech_owls
 
-    if (
-        better_spellcheck(guess, accepted_answers, birdListMaster + sciListMaster)
-        or guess.upper() == alpha_code
-    ):
+    if better_spellcheck(guess, accepted_answers) or guess.upper() == alpha_code:
         logger.info("correct")
 
         database.hset(f"web.session:{session_id}", "bird", "")
@@ -158,8 +153,8 @@ async def check_bird(request: Request, guess: str):
         tempScore = int(database.hget(f"web.session:{session_id}", "tempScore"))
         if user_id != 0:
             database.zincrby(f"daily.webscore:{date()}", 1, user_id)
-            score_increment(user_id, 1)
-            streak_increment(user_id, 1)
+            await score_increment(user_id, 1)
+            await streak_increment(user_id, 1)
         # elif tempScore >= 10:
         #     logger.info("trial maxed")
         #     raise HTTPException(status_code=403, detail="Sign in to continue")
@@ -181,8 +176,8 @@ async def check_bird(request: Request, guess: str):
     database.zincrby("incorrect:global", 1, currentBird)
 
     if user_id != 0:
-        incorrect_increment(user_id, currentBird, 1)
-        streak_increment(user_id, None)  # reset streak
+        await incorrect_increment(user_id, currentBird, 1)
+        await streak_increment(user_id, None)  # reset streak
 
     url = format_wiki_url(currentBird)
     return {
@@ -207,7 +202,7 @@ async def skip_bird(request: Request):
         database.hset(f"web.session:{session_id}", "bird", "")
         database.hset(f"web.session:{session_id}", "answered", "1")
         if user_id != 0:
-            streak_increment(user_id, None)  # reset streak
+            await streak_increment(user_id, None)  # reset streak
         scibird = await get_sciname(currentBird)
         url = format_wiki_url(currentBird)  # sends wiki page
     else:
@@ -17,10 +17,11 @@
 import urllib.parse
 from io import BytesIO
 
-import aiohttp
 from fastapi import APIRouter, HTTPException
 
 from bot.core import _black_and_white
+from bot.http_client import http_client
+from bot.ratelimit import upstream_limiter
 from web.data import logger
 from web.functions import send_file
 
@@ -46,17 +47,18 @@ async def convert_bw(url: str):
 
 
 async def _bw_helper(url):
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url) as response:
-            if response.status != 200:
-                logger.info("invalid response")
-                raise HTTPException(
-                    status_code=response.status, detail="error fetching url"
-                )
-            if response.content_type not in valid_content_types:
-                logger.info("invalid content type")
-                raise HTTPException(status_code=415, detail="invalid content type")
-            return (
-                _black_and_white(BytesIO(await response.read())),
-                response.content_type,
+    session = await http_client.session()
+    await upstream_limiter.acquire(url)
+    async with session.get(url) as response:
+        if response.status != 200:
+            logger.info("invalid response")
+            raise HTTPException(
+                status_code=response.status, detail="error fetching url"
             )
+        if response.content_type not in valid_content_types:
+            logger.info("invalid content type")
+            raise HTTPException(status_code=415, detail="invalid content type")
+        return (
+            _black_and_white(BytesIO(await response.read())),
+            response.content_type,
+        )